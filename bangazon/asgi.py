@@ -13,4 +13,18 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bangazon.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from django.conf import settings  # pylint: disable=wrong-import-position
+from bangazon_api.event_stream import with_event_stream  # pylint: disable=wrong-import-position
+
+# Serves the server-sent events outside of Django's request handling
+application = with_event_stream(django_application)
+
+if settings.API_DOCS_ENABLED and settings.SCHEMA_PRELOAD:
+    from bangazon import schema  # pylint: disable=wrong-import-position
+    schema.preload()
+
+if settings.WARMUP_ON_START:
+    from bangazon_api.warmup import warm_up  # pylint: disable=wrong-import-position
+    warm_up()
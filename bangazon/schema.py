@@ -0,0 +1,120 @@
+"""The OpenAPI document, generated once per code version
+
+drf_yasg introspects every view to build the schema, which is far too slow
+to do on each request. The rendered documents are written to
+SCHEMA_CACHE_DIR, keyed by the code version, and kept in memory after the
+first read.
+"""
+import hashlib
+import os
+from pathlib import Path
+
+import drf_yasg
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from drf_yasg import openapi
+from drf_yasg.codecs import OpenAPICodecJson, OpenAPICodecYaml
+from drf_yasg.generators import OpenAPISchemaGenerator
+
+API_INFO = openapi.Info(
+    title="Bangazon API",
+    default_version='v1',
+    description="An api for users to buy and sell products",
+)
+
+FORMATS = {
+    '.json': (OpenAPICodecJson, 'application/json'),
+    '.yaml': (OpenAPICodecYaml, 'application/yaml'),
+}
+
+_version = None
+_documents = {}
+
+
+def code_version():
+    """Get the version the cached schema is keyed by
+
+    Uses settings.CODE_VERSION when the deploy sets it, otherwise a hash of
+    the project's python files.
+    """
+    global _version  # pylint: disable=global-statement
+    if _version is None:
+        _version = settings.CODE_VERSION or source_hash()
+    return _version
+
+
+def source_hash():
+    digest = hashlib.sha1(drf_yasg.__version__.encode())
+    for app in settings.SCHEMA_SOURCE_DIRS:
+        for path in sorted(Path(app).rglob('*.py')):
+            digest.update(str(path.relative_to(settings.BASE_DIR)).encode())
+            digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def cache_path(version, extension):
+    return Path(settings.SCHEMA_CACHE_DIR) / f'swagger-{version}{extension}'
+
+
+def build(version=None):
+    """Generate the schema and write every format to the cache directory
+
+    Documents left by older code versions are removed.
+
+    Returns:
+        dict: format extension to the rendered document
+    """
+    version = version or code_version()
+    schema = OpenAPISchemaGenerator(API_INFO).get_schema(request=None, public=True)
+
+    cache_dir = Path(settings.SCHEMA_CACHE_DIR)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    for stale in cache_dir.glob('swagger-*'):
+        if not stale.name.startswith(f'swagger-{version}'):
+            # Another worker starting at the same time may have removed it already
+            stale.unlink(missing_ok=True)
+
+    documents = {}
+    for extension, (codec_class, _) in FORMATS.items():
+        content = codec_class(validators=[]).encode(schema)
+        path = cache_path(version, extension)
+        temp_path = path.with_suffix(f'{extension}.{os.getpid()}.tmp')
+        temp_path.write_bytes(content)
+        os.replace(temp_path, path)
+        documents[extension] = content
+    return documents
+
+
+def get_document(extension):
+    """Get a rendered document and its ETag, building the cache when it is missing
+
+    Returns:
+        tuple: the document bytes and the ETag
+    """
+    if extension not in _documents:
+        path = cache_path(code_version(), extension)
+        if path.exists():
+            content = path.read_bytes()
+        else:
+            content = build()[extension]
+        etag = f'"{code_version()}-{hashlib.sha1(content).hexdigest()[:16]}"'
+        _documents[extension] = (content, etag)
+    return _documents[extension]
+
+
+def preload():
+    """Load every format into memory so the first request doesn't pay for it"""
+    for extension in FORMATS:
+        get_document(extension)
+
+
+def schema_document(request, format):  # pylint: disable=redefined-builtin
+    """Serve the cached schema, answering revalidation requests with a 304
+    """
+    content, etag = get_document(format)
+    response = HttpResponse(content, content_type=FORMATS[format][1])
+    response['ETag'] = etag
+    response['Cache-Control'] = 'public, no-cache'
+    # Compares weakly and parses lists, clients send back the W/ ETag of a compressed response
+    return get_conditional_response(request, etag=etag, response=response)
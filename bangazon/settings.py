@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -27,6 +28,10 @@ DEBUG = True
 
 ALLOWED_HOSTS = []
 
+# Swagger docs at /swagger, turn off in production with BANGAZON_API_DOCS=false
+# so drf_yasg is never imported by the workers
+API_DOCS_ENABLED = os.environ.get('BANGAZON_API_DOCS', 'true').lower() in ('1', 'true', 'yes')
+
 
 INSTALLED_APPS = [
     'django.contrib.admin',
@@ -38,18 +43,24 @@ INSTALLED_APPS = [
     'rest_framework',
     'rest_framework.authtoken',
     'corsheaders',
-    'drf_yasg',
     'bangazon_api',
     'bangazon_reports',
 ]
 
+if API_DOCS_ENABLED:
+    INSTALLED_APPS.append('drf_yasg')
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'bangazon_api.authentication.TimedTokenAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'bangazon_api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 }
 
 SWAGGER_SETTINGS = {
@@ -64,27 +75,138 @@ SWAGGER_SETTINGS = {
     },
     'DEFAULT_MODEL_RENDERING': 'example',
     'USE_SESSION_AUTH': False,
-    'DEFAULT_MODEL_DEPTH':-1
+    'DEFAULT_MODEL_DEPTH':-1,
+    'SPEC_URL': ('schema-json', {'format': '.json'}),
 }
 
+# The generated OpenAPI document is cached on disk per code version,
+# set BANGAZON_CODE_VERSION (ex. the git sha) when deploying to skip hashing the source
+CODE_VERSION = os.environ.get('BANGAZON_CODE_VERSION')
+
+SCHEMA_CACHE_DIR = BASE_DIR / '.schema_cache'
+
+# Load the document when the wsgi/asgi application starts instead of on the first request
+SCHEMA_PRELOAD = True
+
+SCHEMA_SOURCE_DIRS = [
+    BASE_DIR / 'bangazon',
+    BASE_DIR / 'bangazon_api',
+    BASE_DIR / 'bangazon_reports',
+]
+
 CORS_ORIGIN_WHITELIST = (
     'http://localhost:3000',
     'http://127.0.0.1:3000'
 )
 
+# Lets the browser read when to retry a shed request
+CORS_EXPOSE_HEADERS = ['Retry-After']
+
 MIDDLEWARE = [
+    'bangazon_api.middleware.TimingMiddleware',
+    # Before admission, so a shed request's 503 is readable by the browser
+    'corsheaders.middleware.CorsMiddleware',
+    'bangazon_api.middleware.AdmissionMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'bangazon_api.middleware.CompressionMiddleware',
+    'bangazon_api.middleware.InvalidationMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
-    'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'bangazon_api.middleware.ProfilingMiddleware',
 ]
 
+# Requests a worker runs at once, see bangazon_api/middleware/admission.py
+ADMISSION_MAX_IN_FLIGHT = 8
+
+# Route classes, a freed slot goes to the waiting class with the lowest priority.
+# limit: requests of the class run at once, catalog reads leave room for checkout
+# queue: requests that may wait, more are shed straight away
+# wait: seconds a request may wait, counting the time queued in the proxy
+# retry_after: seconds sent in the Retry-After header of a shed request
+ADMISSION_CLASSES = {
+    'checkout': {'priority': 0, 'limit': 8, 'queue': 64, 'wait': 10, 'retry_after': 1},
+    'cart': {'priority': 1, 'limit': 4, 'queue': 16, 'wait': 3, 'retry_after': 1},
+    'writes': {'priority': 2, 'limit': 4, 'queue': 16, 'wait': 3, 'retry_after': 2},
+    'catalog': {'priority': 3, 'limit': 6, 'queue': 32, 'wait': 1, 'retry_after': 2},
+}
+
+# Views of the checkout and cart classes, other reads are catalog and other writes are writes
+ADMISSION_ROUTES = {
+    'OrderView.complete': 'checkout',
+    'ProductView.add_to_order': 'cart',
+    'ProductView.remove_from_order': 'cart',
+    'OrderView.destroy': 'cart',
+}
+
+# Views that aren't admitted themselves, each sub-request of a batch is
+# admitted on its own and holding a slot for the batch could starve them
+ADMISSION_EXEMPT = ('batch.post',)
+
+# Responses smaller than this many bytes are sent uncompressed
+COMPRESSION_MIN_SIZE = 1024
+
+COMPRESSION_CONTENT_TYPES = (
+    'application/json',
+    'application/javascript',
+    'text/css',
+    'text/html',
+    'text/plain',
+)
+
+COMPRESSION_GZIP_LEVEL = 6
+
+COMPRESSION_BROTLI_QUALITY = 5
+
+# Requests from staff tokens with the X-Profile: 1 header are profiled,
+# along with this fraction of all other requests
+PROFILING_SAMPLE_RATE = 0.0
+
+PROFILING_DIR = BASE_DIR / 'profiles'
+
+# cprofile for exact call counts and times, sampler for the low overhead
+# collapsed stacks, a staff request picks one with X-Profile: cprofile or sampler
+PROFILER = 'sampler'
+
+# Seconds between stack samples for the collapsed stacks file
+PROFILING_SAMPLE_INTERVAL = 0.001
+
+# Every request is written to this file as a json line with its timings,
+# to stdout when it isn't set
+ACCESS_LOG_PATH = os.environ.get('BANGAZON_ACCESS_LOG')
+
+if ACCESS_LOG_PATH:
+    ACCESS_LOG_HANDLER = {
+        'class': 'logging.handlers.WatchedFileHandler',
+        'filename': ACCESS_LOG_PATH,
+        'delay': True,
+    }
+else:
+    ACCESS_LOG_HANDLER = {'class': 'logging.StreamHandler', 'stream': 'ext://sys.stdout'}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'access': ACCESS_LOG_HANDLER,
+    },
+    'loggers': {
+        'bangazon_api.access': {
+            'handlers': ['access'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
 ROOT_URLCONF = 'bangazon.urls'
 
+# Keeps the access log of the test requests out of the test output
+TEST_RUNNER = 'tests.runner.TestRunner'
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -104,6 +226,21 @@ TEMPLATES = [
 WSGI_APPLICATION = 'bangazon.wsgi.application'
 
 
+# Task queue, see bangazon_api/task_queue.py
+
+TASK_MAX_ATTEMPTS = 5
+
+# Seconds before the first retry, doubled on every attempt up to the max
+TASK_RETRY_BACKOFF = 10
+
+TASK_RETRY_BACKOFF_MAX = 60 * 60
+
+# Running tasks older than this are assumed to belong to a dead worker
+TASK_LOCK_TIMEOUT = 60 * 10
+
+TASK_POLL_INTERVAL = 1
+
+
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
@@ -115,6 +252,124 @@ DATABASES = {
 }
 
 
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Seconds a user's open order id is cached for the cart endpoints
+OPEN_ORDER_CACHE_TIMEOUT = 60 * 5
+
+# Seconds the per-worker caches of products, categories and tokens keep an
+# entry, entries are dropped sooner when the rows change, see bangazon_api/changes.py
+LOCAL_CACHE_TIMEOUT = 60 * 60
+
+# Most entries each of those caches keeps, the least recently used are dropped first
+LOCAL_CACHE_MAX_SIZE = 10000
+
+# Seconds between a worker's reads of the change log, 0 reads it on every request
+INVALIDATION_POLL_INTERVAL = 0
+
+# Seconds change events are kept, a worker idle for longer clears its caches
+INVALIDATION_EVENT_TTL = 60 * 60
+
+# Fill the catalog caches when the wsgi/asgi application starts, see bangazon_api/warmup.py
+WARMUP_ON_START = True
+
+# Seconds a worker may spend warming up
+WARMUP_TIME_BUDGET = 2
+
+# Most product pages loaded, the hottest ones from the access log, then the best sellers
+WARMUP_PRODUCT_LIMIT = 200
+
+# Bytes read from the end of the access log to find the hottest pages
+WARMUP_LOG_BYTES = 4 * 1024 * 1024
+
+# Seconds the tombstones of deleted rows are kept for the change feeds, see
+# bangazon_api/sync.py, a client whose cursor is older has to sync from 0 again
+SYNC_TOMBSTONE_TTL = 60 * 60 * 24 * 30
+
+# Seconds between the prunes of old tombstones
+SYNC_PRUNE_INTERVAL = 60 * 60 * 24
+
+# Seconds the response to a request with an Idempotency-Key is replayed for,
+# see bangazon_api/idempotency.py
+IDEMPOTENCY_TTL = 60 * 60 * 24
+
+# Seconds a retry waits for the first request with its key to finish, then gets a 409
+IDEMPOTENCY_WAIT = 10
+
+# Seconds between the checks of a retry waiting on a request in another worker
+IDEMPOTENCY_POLL_INTERVAL = 0.05
+
+# Seconds after which a key whose request never finished can be claimed again
+IDEMPOTENCY_LOCK_TIMEOUT = 60
+
+# Seconds between the prunes of expired keys
+IDEMPOTENCY_PRUNE_INTERVAL = 60 * 60
+
+# Path of the server-sent events stream, only served by the asgi application,
+# see bangazon_api/event_stream.py
+EVENTS_PATH = '/api/events'
+
+# Seconds between keepalive comments on an idle stream
+EVENTS_KEEPALIVE = 15
+
+# Seconds between reads of the change log for writes made by other workers
+EVENTS_POLL_INTERVAL = 1
+
+# Products one stream may subscribe to
+EVENTS_MAX_PRODUCTS = 100
+
+# Events queued for a slow client before it is sent a reset instead
+EVENTS_QUEUE_SIZE = 100
+
+# Suggestions returned by the product autocomplete when the request doesn't set a limit
+AUTOCOMPLETE_LIMIT = 10
+
+# Seconds a product added to a cart is held for the order
+RESERVATION_TTL = 60 * 15
+
+# Seconds between the sweeps that delete expired holds, and holds deleted per statement
+RESERVATION_SWEEP_INTERVAL = 60
+
+RESERVATION_SWEEP_BATCH_SIZE = 5000
+
+# Seconds a store's dashboard figures are cached, they are dropped sooner on sales and product edits
+STORE_STATS_CACHE_TIMEOUT = 60 * 60
+
+# Completed orders older than this are moved to the archive tables by archive_orders
+ORDER_ARCHIVE_AFTER_DAYS = 365
+
+ORDER_ARCHIVE_BATCH_SIZE = 500
+
+# Most failed rows a product import reports, the rest are only counted
+PRODUCT_IMPORT_MAX_ERRORS = 100
+
+# Products of stores with more followers than this are read on demand
+# instead of being copied into every follower's feed
+FEED_FANOUT_LIMIT = 5000
+
+FEED_FANOUT_BATCH_SIZE = 1000
+
+FEED_POPULAR_STORES_CACHE_TIMEOUT = 60 * 5
+
+# Most users a product can be recommended to in one request
+RECOMMEND_MAX_USERNAMES = 100
+
+# Most sub-requests in one /api/batch request
+BATCH_MAX_REQUESTS = 20
+
+# Threads running the GETs of batches sent with parallel
+BATCH_WORKERS = 4
+
+# Default and largest page of the cursor paginated lists, see bangazon_api/pagination.py
+PAGE_SIZE = 20
+
+MAX_PAGE_SIZE = 100
+
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -153,6 +408,29 @@ USE_TZ = False
 
 STATIC_URL = '/static/'
 
+# Uploaded product images and their resized variants. Django only serves
+# them for development, in production the web server serves MEDIA_ROOT at
+# MEDIA_URL, with the Cache-Control headers of bangazon_api/views/media_view.py
+
+MEDIA_ROOT = BASE_DIR / 'media'
+
+MEDIA_URL = '/media/'
+
+# Seconds browsers keep a variant, originals are revalidated
+MEDIA_CACHE_MAX_AGE = 60 * 60 * 24 * 365
+
+THUMBNAIL_VARIANTS = {
+    'thumbnail': (150, 150),
+    'web': (800, 800),
+}
+
+THUMBNAIL_FORMAT = 'JPEG'
+
+THUMBNAIL_QUALITY = 82
+
+# Size of the process pool that renders variants, 0 renders them in the request
+THUMBNAIL_WORKERS = 2
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -13,30 +13,36 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
 from django.conf.urls import url
-from django.urls import path, include
+from django.urls import path, re_path, include
 from rest_framework import permissions
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
+from bangazon_api.views import serve_media
 
 
-schema_view = get_schema_view(
-    openapi.Info(
-        title="Bangazon API",
-        default_version='v1',
-        description="An api for users to buy and sell products",
-    ),
-    public=True,
-    permission_classes=[permissions.AllowAny],
-)
-
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('bangazon_api.urls')),
     path('reports/', include('bangazon_reports.urls')),
-    url(r'^swagger(?P<format>\.json|\.yaml)$',
-        schema_view.without_ui(cache_timeout=0), name='schema-json'),
-    url(r'^swagger/$', schema_view.with_ui('swagger',
-        cache_timeout=0), name='schema-swagger-ui'),
+    re_path(r'^media/(?P<path>.*)$', serve_media, name='media'),
 ]
+
+if settings.API_DOCS_ENABLED:
+    # pylint: disable=ungrouped-imports,wrong-import-position
+    from drf_yasg.views import get_schema_view
+    from bangazon.schema import API_INFO, schema_document
+
+    # The ui page only renders the shell, the document itself comes from the
+    # cached schema-json route, see SWAGGER_SETTINGS['SPEC_URL']
+    schema_view = get_schema_view(
+        API_INFO,
+        public=True,
+        permission_classes=[permissions.AllowAny],
+    )
+
+    urlpatterns += [
+        url(r'^swagger(?P<format>\.json|\.yaml)$', schema_document, name='schema-json'),
+        url(r'^swagger/$', schema_view.with_ui('swagger',
+            cache_timeout=0), name='schema-swagger-ui'),
+    ]
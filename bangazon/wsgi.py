@@ -14,3 +14,13 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bangazon.settings')
 
 application = get_wsgi_application()
+
+from django.conf import settings  # pylint: disable=wrong-import-position
+
+if settings.API_DOCS_ENABLED and settings.SCHEMA_PRELOAD:
+    from bangazon import schema  # pylint: disable=wrong-import-position
+    schema.preload()
+
+if settings.WARMUP_ON_START:
+    from bangazon_api.warmup import warm_up  # pylint: disable=wrong-import-position
+    warm_up()
@@ -1,6 +1,15 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class BangazonApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'bangazon_api'
+
+    def ready(self):
+        # Registers the task queue handlers and the signal receivers
+        # pylint: disable=import-outside-toplevel,unused-import
+        from bangazon_api import category_counts, signals, sync, tasks
+
+        post_migrate.connect(sync.install_triggers, sender=self)
+        post_migrate.connect(category_counts.install_triggers, sender=self)
@@ -0,0 +1,71 @@
+"""Moving old completed orders out of the Order and OrderProduct tables
+
+Orders are moved in small batches, each in its own transaction, so writers
+are never blocked for longer than one batch takes.
+
+Archiving deletes the orders, so it looks like any other delete to the
+readers of orders: /api/orders/changes lists their ids in deleted, and the
+event stream sends a 'deleted' status to their customers. Both mean the
+order left the current orders, it is in /api/orders/history now.
+"""
+from datetime import datetime, timedelta
+from django.db import transaction
+from bangazon_api.models import ArchivedOrder, ArchivedOrderProduct, Order, OrderProduct
+
+
+def archivable_orders(days):
+    """Get the completed orders older than the given number of days"""
+    cutoff = datetime.now() - timedelta(days=days)
+    return Order.objects.filter(completed_on__lt=cutoff)
+
+
+def archive_batch(order_ids):
+    """Copy a batch of orders and their line items to the archive and delete them
+
+    Returns:
+        int: the number of orders archived
+    """
+    with transaction.atomic():
+        # Read again inside the transaction, a batch could have been archived by another run
+        orders = list(Order.objects.filter(id__in=order_ids, completed_on__isnull=False))
+        if not orders:
+            return 0
+        ids = [order.id for order in orders]
+        items = OrderProduct.objects.filter(order_id__in=ids).values_list(
+            'order_id', 'product_id', 'product__name', 'product__price')
+
+        ArchivedOrder.objects.bulk_create([
+            ArchivedOrder(
+                id=order.id,
+                user_id=order.user_id,
+                payment_type_id=order.payment_type_id,
+                created_on=order.created_on,
+                completed_on=order.completed_on,
+            )
+            for order in orders
+        ])
+        ArchivedOrderProduct.objects.bulk_create([
+            ArchivedOrderProduct(order_id=order_id, product_id=product_id, name=name, price=price)
+            for order_id, product_id, name, price in items
+        ])
+
+        OrderProduct.objects.filter(order_id__in=ids).delete()
+        Order.objects.filter(id__in=ids).delete()
+    return len(ids)
+
+
+def archive_orders(days, batch_size=500):
+    """Archive every completed order older than the given number of days
+
+    Returns:
+        int: the number of orders archived
+    """
+    archived = 0
+    last_id = 0
+    while True:
+        order_ids = list(archivable_orders(days).filter(id__gt=last_id).order_by(
+            'id').values_list('id', flat=True)[:batch_size])
+        if not order_ids:
+            return archived
+        archived += archive_batch(order_ids)
+        last_id = order_ids[-1]
@@ -0,0 +1,33 @@
+import copy
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from bangazon_api.changes import LocalCache
+from bangazon_api.timing import measure
+
+tokens = LocalCache('tokens', timeout=settings.LOCAL_CACHE_TIMEOUT)
+
+
+class TimedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication that reports its time in the Server-Timing header
+
+    Tokens are cached per worker until the token or its user changes. Each
+    request gets its own copy of the cached user, so a view changing
+    request.user can't leak the change into other requests.
+    """
+
+    def authenticate(self, request):
+        with measure('auth'):
+            return super().authenticate(request)
+
+    def authenticate_credentials(self, key):
+        credentials = tokens.get(key)
+        if credentials is not None:
+            return copy.deepcopy(credentials)
+        credentials = super().authenticate_credentials(key)
+        user, token = credentials
+        tokens.set(key, copy.deepcopy(credentials), depends_on=[(Token, token.pk), (User, user.pk)])
+        return credentials
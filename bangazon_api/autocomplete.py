@@ -0,0 +1,153 @@
+"""Product name autocomplete served from memory
+
+Every word of every product name is kept in a sorted list of
+(word, product id) pairs, so the products with a word starting with a
+prefix are one bisect and a short scan away. The index registers with the
+change bus like a LocalCache: a changed product is marked dirty and
+reloaded on the next query, in every worker.
+"""
+import heapq
+import re
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+
+from bangazon_api import changes
+from bangazon_api.models import Product
+
+SORTS = ['sales', 'rating']
+
+WORD = re.compile(r'\w+')
+
+
+def normalize(text):
+    """Split text into lowercase words without accents, ex. 'Crème Brûlée' -> ['creme', 'brulee']"""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return WORD.findall(text.lower())
+
+
+class PrefixIndex:
+    name = 'autocomplete'
+
+    def __init__(self):
+        self.words = []
+        self.products = {}
+        self.dirty = set()
+        self.built = False
+        self.lock = threading.Lock()
+        # Guards dirty, invalidate runs in the threads writing the products
+        self.dirty_lock = threading.Lock()
+        changes.caches.append(self)
+
+    def __len__(self):
+        return len(self.products)
+
+    def build(self):
+        """Load every product, replacing the index"""
+        # Taken before the query, products changed after it are reloaded by the next refresh
+        with self.dirty_lock:
+            self.dirty = set()
+        rows = Product.objects.values_list(
+            'id', 'name', 'purchase_count', 'rating_sum', 'rating_count')
+        with self.lock:
+            self.words = []
+            self.products = {}
+            for row in rows.iterator():
+                self.products[row[0]] = self.entry(*row)
+            self.words = sorted(
+                (word, product_id)
+                for product_id, entry in self.products.items() for word in entry['words'])
+            self.built = True
+
+    @staticmethod
+    def entry(product_id, name, purchase_count, rating_sum, rating_count):
+        return {
+            'id': product_id,
+            'name': name,
+            'words': sorted(set(normalize(name))),
+            'sales': purchase_count,
+            'rating': rating_sum / rating_count if rating_count else 0,
+        }
+
+    def invalidate(self, model, pk=None):
+        """Called by the change bus, reloads a changed product on the next query"""
+        if changes.label(model) != changes.label(Product):
+            return
+        if pk is None:
+            self.clear()
+        else:
+            with self.dirty_lock:
+                self.dirty.add(int(pk))
+
+    def clear(self):
+        self.built = False
+
+    def refresh(self):
+        """Apply the products changed since the last query"""
+        if not self.built:
+            self.build()
+            return
+        with self.dirty_lock:
+            dirty, self.dirty = self.dirty, set()
+        if not dirty:
+            return
+        rows = Product.objects.filter(id__in=dirty).values_list(
+            'id', 'name', 'purchase_count', 'rating_sum', 'rating_count')
+        with self.lock:
+            for product_id in dirty:
+                self.remove(product_id)
+            for row in rows:
+                entry = self.entry(*row)
+                self.products[entry['id']] = entry
+                for word in entry['words']:
+                    insort(self.words, (word, entry['id']))
+
+    def remove(self, product_id):
+        entry = self.products.pop(product_id, None)
+        if entry is None:
+            return
+        for word in entry['words']:
+            index = bisect_left(self.words, (word, product_id))
+            if index < len(self.words) and self.words[index] == (word, product_id):
+                del self.words[index]
+
+    def matching(self, prefix):
+        """Get the ids of the products with a word starting with prefix"""
+        ids = set()
+        index = bisect_left(self.words, (prefix,))
+        while index < len(self.words) and self.words[index][0].startswith(prefix):
+            ids.add(self.words[index][1])
+            index += 1
+        return ids
+
+    def search(self, query, limit=10, sort='sales'):
+        """Get the best products whose words start with every word of the query
+
+        Returns:
+            list: dicts with the id and name of each product, best first
+        """
+        if sort not in SORTS:
+            raise ValueError(f'sort must be one of {", ".join(SORTS)}')
+        prefixes = normalize(query)
+        if not prefixes:
+            return []
+
+        self.refresh()
+        with self.lock:
+            # Start from the longest prefix, it matches the fewest words
+            prefixes.sort(key=len, reverse=True)
+            ids = self.matching(prefixes[0])
+            for prefix in prefixes[1:]:
+                ids = {
+                    product_id for product_id in ids
+                    if any(word.startswith(prefix) for word in self.products[product_id]['words'])
+                }
+            other = 'rating' if sort == 'sales' else 'sales'
+            best = heapq.nlargest(
+                limit, (self.products[product_id] for product_id in ids),
+                key=lambda entry: (entry[sort], entry[other], -entry['id']))
+            return [{'id': entry['id'], 'name': entry['name']} for entry in best]
+
+
+index = PrefixIndex()
@@ -0,0 +1,131 @@
+"""Running several api requests inside one http request
+
+Each sub-request runs through the same middleware as an http request, so
+it is admitted, timed and profiled on its own, and is authenticated with
+the batch request's Authorization header.
+"""
+import io
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.handlers.base import BaseHandler
+from django.db import close_old_connections
+from django.http import HttpRequest, QueryDict
+from rest_framework import status
+
+_executor = None
+_handler = None
+_handler_lock = threading.Lock()
+
+# Headers copied from the batch request to every sub-request
+COPIED_META = (
+    'SERVER_NAME', 'SERVER_PORT', 'REMOTE_ADDR', 'HTTP_HOST', 'HTTP_AUTHORIZATION',
+    'wsgi.url_scheme')
+
+
+def get_executor():
+    """Lazily start the thread pool shared by every batch request in this process"""
+    global _executor  # pylint: disable=global-statement
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.BATCH_WORKERS)
+    return _executor
+
+
+def get_handler():
+    """Lazily load the middleware chain sub-requests run through"""
+    global _handler  # pylint: disable=global-statement
+    with _handler_lock:
+        if _handler is None:
+            handler = BaseHandler()
+            handler.load_middleware()
+            _handler = handler
+    return _handler
+
+
+def build_request(request, method, path, body):
+    """Build the HttpRequest of a sub-request, with the batch request's credentials"""
+    url = urlsplit(path)
+    sub_request = HttpRequest()
+    sub_request.method = method
+    sub_request.path = sub_request.path_info = url.path
+    sub_request.GET = QueryDict(url.query)
+    sub_request.META = {key: request.META[key] for key in COPIED_META if key in request.META}
+    sub_request.META['QUERY_STRING'] = url.query
+    sub_request.META['REQUEST_METHOD'] = method
+
+    content = json.dumps(body).encode() if body is not None else b''
+    # What WSGIRequest sets up for reading the body
+    sub_request._stream = io.BytesIO(content)  # pylint: disable=protected-access
+    sub_request._read_started = False  # pylint: disable=protected-access
+    sub_request.META['CONTENT_TYPE'] = 'application/json'
+    sub_request.META['CONTENT_LENGTH'] = str(len(content))
+    return sub_request
+
+
+def dispatch(request, sub_request):
+    """Run one sub-request
+
+    Returns:
+        dict: the status code and the response data
+    """
+    method, path, body = sub_request['method'], sub_request['path'], sub_request.get('body')
+    if not path.startswith('/api/') or urlsplit(path).path == '/api/batch':
+        return {'status': status.HTTP_400_BAD_REQUEST,
+                'body': {'message': 'Only api endpoints other than batch can be batched'}}
+
+    # The handler turns exceptions into error responses, and logs them, like for any request
+    response = get_handler().get_response(build_request(request, method, path, body))
+    body = parse_body(response)
+    if body is None and response.status_code == status.HTTP_404_NOT_FOUND:
+        body = {'message': 'Not found'}
+    elif body is None and response.status_code >= 500:
+        body = {'message': 'Server error'}
+    return {'status': response.status_code, 'body': body}
+
+
+def parse_body(response):
+    """Get the data of a DRF response, or the JSON body of a plain one, ex. a shed request's 503"""
+    if hasattr(response, 'data'):
+        return response.data
+    if response.get('Content-Type', '').startswith('application/json') and not response.streaming:
+        return json.loads(response.content)
+    return None
+
+
+def dispatch_in_thread(request, sub_request):
+    # Each pool thread has its own database connection, handled like a request's
+    close_old_connections()
+    try:
+        return dispatch(request, sub_request)
+    finally:
+        close_old_connections()
+
+
+def run_batch(request, sub_requests, parallel=False):
+    """Run the sub-requests in order
+
+    With parallel, each run of consecutive GETs is sent to the thread pool
+    together. Writes still run one at a time in their place.
+
+    Returns:
+        list: a status and body for each sub-request
+    """
+    responses = []
+    index = 0
+    while index < len(sub_requests):
+        gets = []
+        while (parallel and index + len(gets) < len(sub_requests)
+               and sub_requests[index + len(gets)]['method'] == 'GET'):
+            gets.append(sub_requests[index + len(gets)])
+
+        if len(gets) > 1:
+            responses.extend(get_executor().map(
+                lambda sub_request: dispatch_in_thread(request, sub_request), gets))
+            index += len(gets)
+        else:
+            responses.append(dispatch(request, sub_requests[index]))
+            index += 1
+    return responses
@@ -0,0 +1,44 @@
+"""Lookup of a user's open order
+
+Every user has at most one open order, enforced by the
+order_one_open_per_user constraint. Its id is cached per user so the cart
+endpoints don't have to look it up on each click, the entry is dropped in
+every worker when the order is completed or deleted.
+"""
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from bangazon_api.changes import LocalCache
+from bangazon_api.models import Order
+
+open_orders = LocalCache('open orders', timeout=settings.OPEN_ORDER_CACHE_TIMEOUT)
+
+
+def open_order_id(user, create=False):
+    """Get the id of the user's open order
+
+    Args:
+        user (User): the customer
+        create (bool): start a new order when the user doesn't have one
+
+    Returns:
+        int: the order id, or None when there is no open order and create is False
+    """
+    order_id = open_orders.get(user.id)
+    if order_id is not None:
+        return order_id
+
+    order_id = Order.objects.filter(
+        user=user, completed_on=None).values_list('id', flat=True).first()
+
+    if order_id is None and create:
+        try:
+            with transaction.atomic():
+                order_id = Order.objects.create(user=user).id
+        except IntegrityError:
+            # Another request opened the order first
+            order_id = Order.objects.filter(
+                user=user, completed_on=None).values_list('id', flat=True).get()
+
+    if order_id is not None:
+        open_orders.set(user.id, order_id, depends_on=[(Order, order_id)])
+    return order_id
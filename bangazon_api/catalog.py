@@ -0,0 +1,109 @@
+"""Cached reads of the catalog endpoints
+
+The serialized product details, category list and store list are kept in LocalCaches,
+so they are dropped in every worker when the rows they were built from
+change.
+"""
+from django.conf import settings
+from django.contrib.auth.models import User
+from bangazon_api.changes import LocalCache
+from bangazon_api.models import Category, Product, Store
+from bangazon_api.serializers import CategorySerializer, ProductSerializer, StoreSerializer
+
+product_details = LocalCache('product details', timeout=settings.LOCAL_CACHE_TIMEOUT)
+category_lists = LocalCache('categories', timeout=settings.LOCAL_CACHE_TIMEOUT)
+store_lists = LocalCache('stores', timeout=settings.LOCAL_CACHE_TIMEOUT)
+
+
+def product_detail(pk):
+    """Get the serialized product
+
+    Raises:
+        Product.DoesNotExist: when there is no product with the pk
+    """
+    data = product_details.get(str(pk))
+    if data is None:
+        product = Product.objects.select_related('store', 'category').get(pk=pk)
+        data = ProductSerializer(product).data
+        product_details.set(str(pk), data, depends_on=[
+            (Product, product.id), (Store, product.store_id), (Category, product.category_id)])
+    return data
+
+
+def category_list():
+    """Get every serialized category"""
+    data = category_lists.get('all')
+    if data is None:
+        data = CategorySerializer(Category.objects.all(), many=True).data
+        category_lists.set('all', data, depends_on=[(Category, None)])
+    return data
+
+
+def category_counts(tree=False):
+    """Get every category with its product counts, from one query
+
+    total_count adds the products of the subcategories to the category's own.
+    Categories in a loop of parents are treated as top level ones.
+
+    Args:
+        tree (bool): nest the subcategories under their parent's children
+            instead of listing every category
+    """
+    key = 'tree' if tree else 'counts'
+    data = category_lists.get(key)
+    if data is None:
+        rows = Category.objects.order_by('id').values('id', 'name', 'parent_id', 'product_count')
+        nodes = {row['id']: dict(row, total_count=row['product_count']) for row in rows}
+        parents = {
+            pk: node['parent_id'] for pk, node in nodes.items() if node['parent_id'] in nodes}
+        for pk in in_cycles(parents):
+            del parents[pk]
+
+        for pk, node in nodes.items():
+            parent_id = parents.get(pk)
+            while parent_id is not None:
+                nodes[parent_id]['total_count'] += node['product_count']
+                parent_id = parents.get(parent_id)
+
+        if tree:
+            for node in nodes.values():
+                node['children'] = []
+            data = []
+            for pk, node in nodes.items():
+                parent_id = parents.get(pk)
+                (data if parent_id is None else nodes[parent_id]['children']).append(node)
+        else:
+            data = list(nodes.values())
+        # The product signals publish the categories whose counts change, see
+        # bangazon_api/signals.py, a store opening or closing changes all of them
+        category_lists.set(key, data, depends_on=[(Category, None), (Store, None)])
+    return data
+
+
+def in_cycles(parents):
+    """Get the ids in a loop of parents
+
+    Args:
+        parents (dict): category id to its parent's id
+    """
+    cycles = set()
+    done = set()
+    for pk in parents:
+        path = []
+        while pk in parents and pk not in done and pk not in path:
+            path.append(pk)
+            pk = parents[pk]
+        if pk in path:
+            cycles.update(path[path.index(pk):])
+        done.update(path)
+    return cycles
+
+
+def store_list():
+    """Get every serialized store with its seller and products"""
+    data = store_lists.get('all')
+    if data is None:
+        stores = Store.objects.select_related('seller').prefetch_related('products')
+        data = StoreSerializer(stores, many=True).data
+        store_lists.set('all', data, depends_on=[(Store, None), (User, None), (Product, None)])
+    return data
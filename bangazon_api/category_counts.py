@@ -0,0 +1,62 @@
+"""Product counts of the categories
+
+Category.product_count counts the products of active stores directly in
+the category. SQLite triggers keep it up to date when a product is
+created, deleted, or moved to another category or store, and when a store
+is opened or closed, so bulk writes are counted too. Like the sync
+triggers they are (re)created after every migrate.
+"""
+from django.db import connections
+
+from bangazon_api.models import Category, Product, Store
+
+
+def trigger_sql(quote):
+    """Get the statements that drop and create the counting triggers"""
+    categories = quote(Category._meta.db_table)
+    products = quote(Product._meta.db_table)
+    stores = quote(Store._meta.db_table)
+
+    def active(row):
+        return f'(SELECT is_active FROM {stores} WHERE id = {row}.store_id)'
+
+    def add(row, amount):
+        return (f'UPDATE {categories} SET product_count = product_count {amount} '
+                f'WHERE id = {row}.category_id AND {active(row)};')
+
+    triggers = {
+        'product_count_insert': f'AFTER INSERT ON {products} BEGIN {add("NEW", "+ 1")} END',
+        'product_count_delete': f'AFTER DELETE ON {products} BEGIN {add("OLD", "- 1")} END',
+        'product_count_update': (
+            f'AFTER UPDATE OF category_id, store_id ON {products} '
+            'WHEN OLD.category_id IS NOT NEW.category_id OR OLD.store_id IS NOT NEW.store_id '
+            f'BEGIN {add("OLD", "- 1")} {add("NEW", "+ 1")} END'),
+        'product_count_store': (
+            f'AFTER UPDATE OF is_active ON {stores} WHEN OLD.is_active IS NOT NEW.is_active '
+            f'BEGIN UPDATE {categories} SET product_count = product_count + '
+            'CASE WHEN NEW.is_active THEN 1 ELSE -1 END * ('
+            f'SELECT COUNT(*) FROM {products} p '
+            f'WHERE p.store_id = NEW.id AND p.category_id = {categories}.id) '
+            f'WHERE id IN (SELECT category_id FROM {products} WHERE store_id = NEW.id); END'),
+    }
+    statements = []
+    for name, body in triggers.items():
+        statements.append(f'DROP TRIGGER IF EXISTS {name}')
+        statements.append(f'CREATE TRIGGER {name} {body}')
+    return statements
+
+
+def install_triggers(using='default', **kwargs):
+    """Create the counting triggers, connected to post_migrate"""
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        if Category._meta.db_table not in connection.introspection.table_names(cursor):
+            return
+        columns = {
+            column.name for column in
+            connection.introspection.get_table_description(cursor, Category._meta.db_table)}
+        if 'product_count' not in columns:
+            # Migrating backwards past the counts
+            return
+        for sql in trigger_sql(connection.ops.quote_name):
+            cursor.execute(sql)
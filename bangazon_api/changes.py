@@ -0,0 +1,182 @@
+"""Invalidation of the in-process caches across worker processes
+
+Every change to a cached model is written to the ChangeEvent table in the
+same transaction as the change. Each worker reads the events it hasn't seen
+at the start of a request (InvalidationMiddleware) and drops the entries of
+its LocalCaches that depend on the changed objects. The writing worker
+drops its own entries straight away.
+
+SQLite allows one writer at a time, so event ids become visible in order
+and a worker only has to remember the last id it read.
+"""
+import threading
+import time
+from datetime import timedelta
+from collections import OrderedDict, defaultdict
+
+from django.conf import settings
+from django.db.models import Max
+from django.utils import timezone
+
+from bangazon_api.models import ChangeEvent
+
+caches = []
+
+_lock = threading.Lock()
+_last_id = None
+_last_poll = 0.0
+_last_prune = 0.0
+
+
+def label(model):
+    """Get the name events use for a model class or label, ex. bangazon_api.product"""
+    return model if isinstance(model, str) else model._meta.label_lower
+
+
+class LocalCache:
+    """A per-process cache whose entries are dropped when the objects they depend on change
+
+    When it holds max_size entries, setting another drops the least recently used one.
+
+    Args:
+        name (string): shown in warm up reports
+        timeout (int): seconds an entry is kept even when nothing changes, None to keep it
+        max_size (int): most entries kept, defaults to LOCAL_CACHE_MAX_SIZE
+    """
+
+    def __init__(self, name, timeout=None, max_size=None):
+        self.name = name
+        self.timeout = timeout
+        self.max_size = max_size or settings.LOCAL_CACHE_MAX_SIZE
+        self.entries = OrderedDict()
+        self.keys_by_dependency = defaultdict(set)
+        self.dependencies_by_key = {}
+        self.lock = threading.Lock()
+        caches.append(self)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, default=None):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return default
+            value, expires = entry
+            if expires is not None and expires < time.monotonic():
+                self._remove(key)
+                return default
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, depends_on=()):
+        """Cache a value
+
+        Args:
+            depends_on (iterable): (model, pk) pairs, a pk of None depends on every row of the model
+        """
+        expires = time.monotonic() + self.timeout if self.timeout is not None else None
+        dependencies = {
+            (label(model), None if pk is None else str(pk)) for model, pk in depends_on}
+        with self.lock:
+            # A replaced entry may have depended on other objects
+            self._remove(key)
+            self.entries[key] = (value, expires)
+            self.dependencies_by_key[key] = dependencies
+            for dependency in dependencies:
+                self.keys_by_dependency[dependency].add(key)
+            while len(self.entries) > self.max_size:
+                self._remove(next(iter(self.entries)))
+
+    def delete(self, key):
+        with self.lock:
+            self._remove(key)
+
+    def _remove(self, key):
+        """Drop an entry and its dependencies, call with the lock held"""
+        self.entries.pop(key, None)
+        for dependency in self.dependencies_by_key.pop(key, ()):
+            keys = self.keys_by_dependency.get(dependency)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.keys_by_dependency[dependency]
+
+    def invalidate(self, model, pk=None):
+        """Drop the entries that depend on an object, or on any row of the model when pk is None"""
+        model = label(model)
+        with self.lock:
+            if pk is None:
+                dependencies = [dep for dep in self.keys_by_dependency if dep[0] == model]
+            else:
+                dependencies = [(model, str(pk)), (model, None)]
+            for dependency in dependencies:
+                for key in list(self.keys_by_dependency.get(dependency, ())):
+                    self._remove(key)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.keys_by_dependency.clear()
+            self.dependencies_by_key.clear()
+
+
+def invalidate_local(model, pk=None):
+    for cache in caches:
+        cache.invalidate(model, pk)
+
+
+def publish(model, pks):
+    """Record that objects changed and drop them from this process's caches
+
+    Call inside the transaction that changes them, ex. from a signal receiver.
+    """
+    model = label(model)
+    pks = [str(pk) for pk in pks]
+    for pk in pks:
+        invalidate_local(model, pk)
+    ChangeEvent.objects.bulk_create([ChangeEvent(model=model, object_id=pk) for pk in pks])
+
+
+def reset():
+    """Empty every LocalCache and read the change log from its end again
+
+    For tests, a rolled back test can leave entries for rows that no longer exist.
+    """
+    global _last_id  # pylint: disable=global-statement
+    with _lock:
+        for cache in caches:
+            cache.clear()
+        _last_id = None
+
+
+def poll():
+    """Apply the events written by other workers since the last poll"""
+    global _last_id, _last_poll  # pylint: disable=global-statement
+    now = time.monotonic()
+    if now - _last_poll < settings.INVALIDATION_POLL_INTERVAL:
+        return
+    with _lock:
+        if _last_id is None or now - _last_poll > settings.INVALIDATION_EVENT_TTL:
+            # A new worker, or one idle long enough that its events were pruned
+            for cache in caches:
+                cache.clear()
+            _last_id = ChangeEvent.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+        else:
+            events = ChangeEvent.objects.filter(id__gt=_last_id).order_by(
+                'id').values_list('id', 'model', 'object_id')
+            for event_id, model, pk in events:
+                invalidate_local(model, pk)
+                _last_id = event_id
+        _last_poll = now
+    prune()
+
+
+def prune():
+    """Delete events every worker has read, at most once per INVALIDATION_EVENT_TTL"""
+    global _last_prune  # pylint: disable=global-statement
+    ttl = settings.INVALIDATION_EVENT_TTL
+    if time.monotonic() - _last_prune < ttl:
+        return
+    _last_prune = time.monotonic()
+    ChangeEvent.objects.filter(created_on__lt=timezone.now() - timedelta(seconds=ttl)).delete()
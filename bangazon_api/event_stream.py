@@ -0,0 +1,120 @@
+"""Server-sent events of stock and order changes, served by the ASGI application
+
+GET EVENTS_PATH?products=1,2,3 streams `product` events with the quantity
+of each listed product and `order` events with the status of the user's
+orders, starting with their current state. A `reset` event means events
+were dropped and the client should reload what it shows.
+
+The stream is a plain ASGI application in front of Django, so an idle
+connection is a coroutine waiting on a queue instead of a thread. Browsers
+can't set headers on an EventSource, the token may also be sent as ?token=.
+"""
+import asyncio
+import json
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from rest_framework.exceptions import AuthenticationFailed
+
+from bangazon_api.authentication import TimedTokenAuthentication
+from bangazon_api.events import broker, product_topic, snapshot, user_topic
+
+
+def authenticate(key):
+    """Get the id of the token's user, None for a bad token"""
+    try:
+        user, _ = TimedTokenAuthentication().authenticate_credentials(key)
+    except AuthenticationFailed:
+        return None
+    return user.id
+
+
+def token_key(scope, params):
+    authorization = dict(scope['headers']).get(b'authorization', b'').decode()
+    scheme, _, key = authorization.partition(' ')
+    if scheme.lower() == 'token' and key:
+        return key
+    return params.get('token', [''])[0]
+
+
+def encode(event, data):
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'.encode()
+
+
+async def respond(send, status, message):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json')],
+    })
+    await send({'type': 'http.response.body', 'body': json.dumps({'message': message}).encode()})
+
+
+async def wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def event_stream(scope, receive, send):
+    params = parse_qs(scope['query_string'].decode())
+    user_id = await sync_to_async(authenticate)(token_key(scope, params))
+    if user_id is None:
+        await respond(send, 401, 'Invalid token')
+        return
+
+    try:
+        product_ids = [
+            int(pk) for value in params.get('products', []) for pk in value.split(',') if pk]
+    except ValueError:
+        await respond(send, 400, 'products must be a comma separated list of ids')
+        return
+    if len(product_ids) > settings.EVENTS_MAX_PRODUCTS:
+        await respond(send, 400, f'At most {settings.EVENTS_MAX_PRODUCTS} products')
+        return
+
+    topics = [user_topic(user_id)] + [product_topic(pk) for pk in product_ids]
+    # Subscribing before reading the snapshot means no change falls in between
+    queue = broker.subscribe(topics)
+    disconnect = asyncio.ensure_future(wait_for_disconnect(receive))
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                # Stops nginx from buffering the stream
+                (b'x-accel-buffering', b'no'),
+            ],
+        })
+        for event, data in await sync_to_async(snapshot)(user_id, product_ids):
+            await send({'type': 'http.response.body', 'body': encode(event, data), 'more_body': True})
+
+        while True:
+            get = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait(
+                {get, disconnect}, timeout=settings.EVENTS_KEEPALIVE,
+                return_when=asyncio.FIRST_COMPLETED)
+            if get in done:
+                body = encode(*get.result())
+            else:
+                get.cancel()
+                if disconnect in done:
+                    break
+                # A comment line, keeps proxies from closing an idle connection
+                body = b': keepalive\n\n'
+            await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+    finally:
+        broker.unsubscribe(queue, topics)
+        disconnect.cancel()
+
+
+def with_event_stream(application):
+    """Wrap the Django ASGI application, serving EVENTS_PATH with event_stream"""
+    async def route(scope, receive, send):
+        if scope['type'] == 'http' and scope['path'] == settings.EVENTS_PATH:
+            await event_stream(scope, receive, send)
+        else:
+            await application(scope, receive, send)
+    return route
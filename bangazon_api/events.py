@@ -0,0 +1,163 @@
+"""In-process pub/sub of stock and order changes for the event stream
+
+Model signals publish to the Broker after their transaction commits, the
+Broker hands each event to the asyncio queues of the connections subscribed
+to its topic, see bangazon_api/event_stream.py. Signals run in the threads
+Django runs sync views in, so publishing only schedules the delivery on the
+event loop.
+
+Writes made by other workers, and bulk writes that don't send signals, are
+picked up from the change log by a relay task that runs while anyone is
+subscribed. An event is skipped when it repeats the last one of its topic,
+so a change seen both ways is only sent once.
+"""
+import asyncio
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+
+from bangazon_api import changes
+from bangazon_api.models import ChangeEvent, Order, Product
+
+# Put in a queue that overflowed, the client has to reload its state
+RESET = ('reset', {})
+
+
+def product_topic(product_id):
+    return f'product:{product_id}'
+
+
+def user_topic(user_id):
+    return f'user:{user_id}'
+
+
+def product_event(product_id, quantity):
+    return 'product', {'id': product_id, 'quantity': quantity}
+
+
+def order_event(order_id, completed_on=None, deleted=False):
+    if deleted:
+        order_status = 'deleted'
+    else:
+        order_status = 'completed' if completed_on else 'open'
+    return 'order', {'id': order_id, 'status': order_status}
+
+
+class Broker:
+    def __init__(self):
+        self.loop = None
+        self.queues = defaultdict(set)
+        self.last = {}
+        self.relay = None
+
+    def watched(self, topic):
+        return topic in self.queues
+
+    def subscribe(self, topics):
+        """Get a queue of the events of the topics, call from the event loop"""
+        loop = asyncio.get_running_loop()
+        self.loop = loop
+        queue = asyncio.Queue(settings.EVENTS_QUEUE_SIZE)
+        for topic in topics:
+            self.queues[topic].add(queue)
+        if self.relay is None or self.relay.done() or self.relay.get_loop() is not loop:
+            self.relay = loop.create_task(self.run_relay())
+        return queue
+
+    def unsubscribe(self, queue, topics):
+        for topic in topics:
+            queues = self.queues.get(topic, set())
+            queues.discard(queue)
+            if not queues:
+                self.queues.pop(topic, None)
+                self.last.pop(topic, None)
+        if not self.queues and self.relay is not None:
+            self.relay.cancel()
+            self.relay = None
+
+    def publish(self, topic, event):
+        """Send an event to a topic's subscribers, safe to call from any thread"""
+        if self.loop is None or topic not in self.queues:
+            return
+        try:
+            self.loop.call_soon_threadsafe(self.deliver, topic, event)
+        except RuntimeError:
+            # The event loop was closed
+            self.loop = None
+
+    def deliver(self, topic, event):
+        if topic not in self.queues or self.last.get(topic) == event:
+            return
+        self.last[topic] = event
+        for queue in self.queues.get(topic, ()):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # The client reads too slowly, it gets one reset instead of the backlog
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(RESET)
+
+    async def run_relay(self):
+        """Deliver the changes of the change log until nobody is subscribed"""
+        last_id = await sync_to_async(last_change_id)()
+        while True:
+            await asyncio.sleep(settings.EVENTS_POLL_INTERVAL)
+            last_id, events = await sync_to_async(read_changes)(last_id)
+            for topic, event in events:
+                self.deliver(topic, event)
+
+
+broker = Broker()
+
+
+def publish_on_commit(topic, event):
+    """Publish once the current transaction commits, nothing is published on rollback"""
+    if broker.watched(topic):
+        transaction.on_commit(lambda: broker.publish(topic, event))
+
+
+def read_changes(last_id):
+    """Get the events for the changes other workers logged after last_id
+
+    Returns:
+        tuple: the id of the last change read and a list of (topic, event) pairs
+    """
+    products = changes.label(Product)
+    orders = changes.label(Order)
+    product_ids = set()
+    order_ids = set()
+    rows = ChangeEvent.objects.filter(id__gt=last_id, model__in=[products, orders]).order_by('id')
+    for change_id, model, object_id in rows.values_list('id', 'model', 'object_id'):
+        last_id = change_id
+        if model == products and broker.watched(product_topic(object_id)):
+            product_ids.add(object_id)
+        elif model == orders:
+            order_ids.add(object_id)
+
+    events = [
+        (product_topic(pk), product_event(pk, quantity))
+        for pk, quantity in Product.objects.filter(id__in=product_ids).values_list('id', 'quantity')
+    ]
+    for pk, user_id, completed_on in Order.objects.filter(id__in=order_ids).values_list(
+            'id', 'user_id', 'completed_on'):
+        events.append((user_topic(user_id), order_event(pk, completed_on)))
+    return last_id, events
+
+
+def last_change_id():
+    return ChangeEvent.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+
+
+def snapshot(user_id, product_ids):
+    """Get the current state of the topics a client subscribed to, sent when it connects"""
+    events = [
+        product_event(pk, quantity)
+        for pk, quantity in Product.objects.filter(id__in=product_ids).values_list('id', 'quantity')
+    ]
+    open_orders = Order.objects.filter(user_id=user_id, completed_on=None).values_list('id', flat=True)
+    events.extend(order_event(pk) for pk in open_orders)
+    return events
@@ -0,0 +1,87 @@
+"""New products from the stores a customer has favorited
+
+New products are pushed into each follower's FeedEntry rows when they are
+created (fan-out on write), so reading a page is one range scan of the
+(user, product) index. Stores with more than FEED_FANOUT_LIMIT followers
+are skipped on write, their products are pulled in when the feed is read.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from bangazon_api.models import Favorite, FeedEntry, Product
+
+POPULAR_STORES_CACHE_KEY = 'feed:popular-stores'
+
+
+def fan_out(product_id, store_id):
+    """Add a new product to the feed of every follower of its store
+
+    Returns:
+        int: the number of followers the product was pushed to, 0 for popular stores
+    """
+    followers = Favorite.objects.filter(store_id=store_id)
+    if followers.count() > settings.FEED_FANOUT_LIMIT:
+        return 0
+
+    batch_size = settings.FEED_FANOUT_BATCH_SIZE
+    follower_ids = followers.values_list('customer_id', flat=True).distinct().order_by('customer_id')
+    pushed = 0
+    batch = []
+    for follower_id in follower_ids.iterator(chunk_size=batch_size):
+        batch.append(FeedEntry(user_id=follower_id, product_id=product_id))
+        if len(batch) >= batch_size:
+            FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            pushed += len(batch)
+            batch = []
+    FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+    return pushed + len(batch)
+
+
+def popular_store_ids():
+    """Get the stores whose products are read on demand instead of fanned out"""
+    store_ids = cache.get(POPULAR_STORES_CACHE_KEY)
+    if store_ids is None:
+        store_ids = set(Favorite.objects.values('store_id').annotate(
+            followers=Count('id')).filter(
+                followers__gt=settings.FEED_FANOUT_LIMIT).values_list('store_id', flat=True))
+        cache.set(POPULAR_STORES_CACHE_KEY, store_ids, settings.FEED_POPULAR_STORES_CACHE_TIMEOUT)
+    return store_ids
+
+
+def read_feed(user, cursor=None, limit=None):
+    """Get a page of the user's feed, newest product first
+
+    Args:
+        user (User): the customer
+        cursor (int): only return products with an id lower than this
+        limit (int): page size
+
+    Returns:
+        tuple: the list of products and the cursor of the next page, None on the last page
+    """
+    limit = limit or settings.PAGE_SIZE
+    products = Product.objects.select_related('store', 'category')
+
+    # Filtering and ordering on the entry's product id keeps this a scan of the
+    # (user, product) index without a sort, both conditions have to be in one
+    # filter call to share the join
+    entry_filter = {'feed_entries__user': user}
+    if cursor is not None:
+        entry_filter['feed_entries__product_id__lt'] = cursor
+    entries = products.filter(**entry_filter).order_by('-feed_entries__product_id')
+    page = list(entries[:limit + 1])
+
+    popular = popular_store_ids()
+    if popular:
+        followed = Favorite.objects.filter(
+            customer=user, store_id__in=popular).values_list('store_id', flat=True)
+        pulled = products.filter(store_id__in=list(followed)).order_by('-id')
+        if cursor is not None:
+            pulled = pulled.filter(id__lt=cursor)
+        pulled = pulled[:limit + 1]
+        merged = {product.id: product for product in page}
+        merged.update((product.id, product) for product in pulled)
+        page = sorted(merged.values(), key=lambda product: product.id, reverse=True)
+
+    next_cursor = page[limit - 1].id if len(page) > limit else None
+    return page[:limit], next_cursor
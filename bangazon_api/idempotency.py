@@ -0,0 +1,159 @@
+"""Idempotency-Key support for the endpoints that create things
+
+The first request with a key claims it by inserting an IdempotencyKey row,
+runs the view and stores the response in the row. A retry with the same key
+gets the stored response back without running the view again. A retry that
+arrives while the first request is still running waits for it to finish,
+on an Event when both run in this worker, polling the row otherwise.
+
+Server errors aren't stored, the key is released so the retry runs again.
+
+Requests without a key aren't protected, the views have to refuse to apply
+a change twice themselves, like completing an order that is already completed.
+"""
+import functools
+import hashlib
+import json
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from bangazon_api.models import IdempotencyKey
+
+HEADER = 'HTTP_IDEMPOTENCY_KEY'
+
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+
+
+def fingerprint(request):
+    """Hash the method, path and body of a request"""
+    data = request.data
+    if hasattr(data, 'lists'):
+        # Form and multipart bodies, uploaded files are compared by name
+        data = dict(data.lists())
+    digest = hashlib.sha1(f'{request.method} {request.path}'.encode())
+    digest.update(json.dumps(data, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+def claim(user, key, request_hash):
+    """Insert the row for a key, or get the row that is already there
+
+    Rows past IDEMPOTENCY_TTL, and rows of requests that never finished within
+    IDEMPOTENCY_LOCK_TIMEOUT, ex. because the worker died, are replaced.
+
+    Returns:
+        tuple: the row and whether this request claimed it
+    """
+    now = timezone.now()
+    while True:
+        try:
+            with transaction.atomic():
+                return IdempotencyKey.objects.create(
+                    user=user, key=key, fingerprint=request_hash, created_on=now), True
+        except IntegrityError:
+            pass
+        existing = IdempotencyKey.objects.filter(user=user, key=key).first()
+        if existing is None:
+            continue
+        if existing.status is None:
+            timeout = settings.IDEMPOTENCY_LOCK_TIMEOUT
+        else:
+            timeout = settings.IDEMPOTENCY_TTL
+        if existing.created_on > now - timedelta(seconds=timeout):
+            return existing, False
+        IdempotencyKey.objects.filter(pk=existing.pk, created_on=existing.created_on).delete()
+
+
+def wait_for(row):
+    """Wait for the request that claimed a row to store its response
+
+    Returns:
+        IdempotencyKey: the finished row, None when it is still running
+            after IDEMPOTENCY_WAIT seconds or was released
+    """
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT
+    done = _in_flight.get(row.pk)
+    while row is not None and row.status is None:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        if done is not None:
+            done.wait(remaining)
+            done = None
+        else:
+            time.sleep(min(settings.IDEMPOTENCY_POLL_INTERVAL, remaining))
+        row = IdempotencyKey.objects.filter(pk=row.pk).first()
+    return row
+
+
+def replay(row):
+    response = Response(row.data, status=row.status)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(view):
+    """Make a view method safe to retry with an Idempotency-Key header"""
+    @functools.wraps(view)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.META.get(HEADER)
+        if not key or request.auth is None:
+            return view(self, request, *args, **kwargs)
+        if len(key) > IdempotencyKey._meta.get_field('key').max_length:
+            return Response({'message': 'Idempotency-Key is too long'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        request_hash = fingerprint(request)
+        row, claimed = claim(request.auth.user, key, request_hash)
+        if not claimed:
+            if row.fingerprint != request_hash:
+                return Response({'message': 'Idempotency-Key was already used for another request'},
+                                status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+            finished = wait_for(row)
+            if finished is None:
+                response = Response(
+                    {'message': 'A request with this Idempotency-Key is still running'},
+                    status=status.HTTP_409_CONFLICT)
+                response['Retry-After'] = '1'
+                return response
+            return replay(finished)
+
+        row_id = row.pk
+        done = threading.Event()
+        with _in_flight_lock:
+            _in_flight[row_id] = done
+        try:
+            response = view(self, request, *args, **kwargs)
+            if response.status_code >= 500:
+                IdempotencyKey.objects.filter(pk=row_id).delete()
+            else:
+                IdempotencyKey.objects.filter(pk=row_id).update(
+                    status=response.status_code, data=response.data)
+            return response
+        except Exception:
+            IdempotencyKey.objects.filter(pk=row_id).delete()
+            raise
+        finally:
+            with _in_flight_lock:
+                _in_flight.pop(row_id, None)
+            done.set()
+    return wrapper
+
+
+def prune():
+    """Delete the keys past IDEMPOTENCY_TTL
+
+    Returns:
+        int: the number of keys deleted
+    """
+    expired = timezone.now() - timedelta(seconds=settings.IDEMPOTENCY_TTL)
+    deleted, _ = IdempotencyKey.objects.filter(created_on__lt=expired).delete()
+    return deleted
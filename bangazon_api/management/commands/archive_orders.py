@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from bangazon_api.archive import archive_orders
+
+
+class Command(BaseCommand):
+    help = 'Move completed orders older than ORDER_ARCHIVE_AFTER_DAYS into the archive tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.ORDER_ARCHIVE_AFTER_DAYS,
+            help='Archive orders completed more than this many days ago',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.ORDER_ARCHIVE_BATCH_SIZE,
+            help='Orders moved per transaction',
+        )
+        parser.add_argument(
+            '--vacuum',
+            action='store_true',
+            help='Rebuild the database file afterwards to give the freed pages back',
+        )
+
+    def handle(self, *args, **options):
+        archived = archive_orders(options['days'], options['batch_size'])
+        self.stdout.write(f'Archived {archived} orders')
+
+        if options['vacuum'] and archived and connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('VACUUM')
+            self.stdout.write('Vacuumed the database')
@@ -0,0 +1,70 @@
+import gzip
+import time
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from bangazon_api.models import Product, Store
+from bangazon_api.renderers import FastJSONRenderer
+from bangazon_api.serializers import ProductSerializer, StoreSerializer
+from bangazon_api.startup import cold_start
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def best_of(func, iterations):
+    """Run func several times and return the fastest time in ms and the last result"""
+    best = None
+    result = None
+    for _ in range(iterations):
+        start = time.perf_counter()
+        result = func()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+class Command(BaseCommand):
+    help = 'Measure worker start up, serialization, rendering and response size of the list endpoints'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=5,
+            help='Runs per measurement, the fastest one is reported',
+        )
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        self.bench_cold_start(iterations)
+
+        endpoints = {
+            'products': lambda: ProductSerializer(Product.objects.all(), many=True).data,
+            'stores': lambda: StoreSerializer(Store.objects.all(), many=True).data,
+        }
+
+        for endpoint, serialize in endpoints.items():
+            serialize_ms, data = best_of(serialize, iterations)
+            self.stdout.write(f'{endpoint}: serialize {serialize_ms:.2f} ms')
+            self.bench_rendering(data, iterations)
+
+    def bench_cold_start(self, iterations):
+        with_docs = cold_start(iterations, env={'BANGAZON_API_DOCS': 'true'})
+        without_docs = cold_start(iterations, env={'BANGAZON_API_DOCS': 'false'})
+        self.stdout.write(
+            f'cold start: {with_docs:.0f} ms with api docs, {without_docs:.0f} ms without')
+
+    def bench_rendering(self, data, iterations):
+        renderers = (('json', JSONRenderer()), ('fast', FastJSONRenderer()))
+        for name, renderer in renderers:
+            render_ms, content = best_of(lambda r=renderer: r.render(data), iterations)
+            sizes = [f'raw {len(content)} B']
+            gzip_ms, gzipped = best_of(lambda c=content: gzip.compress(c, 6, mtime=0), iterations)
+            sizes.append(f'gzip {len(gzipped)} B ({gzip_ms:.2f} ms)')
+            if brotli is not None:
+                br_ms, compressed = best_of(
+                    lambda c=content: brotli.compress(c, quality=5), iterations)
+                sizes.append(f'br {len(compressed)} B ({br_ms:.2f} ms)')
+            self.stdout.write(f'  render {name:<4} {render_ms:.2f} ms, {", ".join(sizes)}')
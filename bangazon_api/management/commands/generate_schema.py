@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Build the cached OpenAPI documents for the current code version'
+
+    def handle(self, *args, **options):
+        if not settings.API_DOCS_ENABLED:
+            raise CommandError('The api docs are disabled, see API_DOCS_ENABLED')
+
+        from bangazon import schema  # pylint: disable=import-outside-toplevel
+        version = schema.code_version()
+        documents = schema.build(version)
+        for extension, content in documents.items():
+            self.stdout.write(f'{schema.cache_path(version, extension)}: {len(content)} bytes')
@@ -0,0 +1,41 @@
+from concurrent.futures import ProcessPoolExecutor
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from bangazon_api.models import Product
+from bangazon_api.thumbnails import render_args, render_variants
+
+
+class Command(BaseCommand):
+    help = 'Render the resized variants for every product image'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.THUMBNAIL_WORKERS or 1,
+            help='Number of processes rendering variants',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Render variants again even if they already exist',
+        )
+
+    def handle(self, *args, **options):
+        names = Product.objects.exclude(image_path='').exclude(
+            image_path=None).values_list('image_path', flat=True).distinct()
+        jobs = [render_args(name, options['force']) for name in names.iterator()]
+
+        written = 0
+        failed = 0
+        with ProcessPoolExecutor(max_workers=options['workers']) as executor:
+            futures = [executor.submit(render_variants, *job) for job in jobs]
+            for job, future in zip(jobs, futures):
+                try:
+                    written += len(future.result())
+                except (OSError, ValueError) as ex:
+                    failed += 1
+                    self.stderr.write(f'{job[1]}: {ex}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Checked {len(jobs)} images, wrote {written} variants, {failed} failed'))
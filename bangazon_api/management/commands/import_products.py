@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+from bangazon_api.models import Store
+from bangazon_api.product_import import FORMATS, ProductImporter, detect_format, read_rows
+
+
+class Command(BaseCommand):
+    help = "Create or update a store's products from a CSV or JSON lines file"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='The file to import')
+        parser.add_argument(
+            '--seller',
+            required=True,
+            help="Username of the store's seller",
+        )
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            help='File format, detected from the extension by default',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows validated and written per transaction',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            store = Store.objects.get(seller__username=options['seller'])
+        except Store.DoesNotExist as ex:
+            raise CommandError(f"{options['seller']} does not have a store") from ex
+
+        file_format = options['format'] or detect_format(options['path'])
+        importer = ProductImporter(store, batch_size=options['batch_size'])
+        with open(options['path'], 'rb') as stream:
+            report = importer.run(read_rows(stream, file_format))
+
+        for error in report['errors']:
+            self.stderr.write(f"row {error['row']}: {'; '.join(error['errors'])}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {report['created']}, updated {report['updated']}, "
+            f"{report['failed']} rows failed"))
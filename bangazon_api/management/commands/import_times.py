@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from bangazon_api.startup import import_times
+
+PROJECT_PACKAGES = ('bangazon', 'bangazon_api', 'bangazon_reports')
+
+
+class Command(BaseCommand):
+    help = 'Report how long each project module takes to import in a fresh worker'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Include third party modules, grouped by top level package',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=30,
+            help='Number of rows to show',
+        )
+
+    def handle(self, *args, **options):
+        modules = import_times()
+
+        rows = {}
+        for name, self_us, cumulative_us in modules:
+            package = name.split('.')[0]
+            if package in PROJECT_PACKAGES:
+                rows[name] = (self_us, cumulative_us)
+            elif options['all']:
+                # Third party packages are summed, the time spent in all of their own modules
+                total_self, _ = rows.get(package, (0, 0))
+                rows[package] = (total_self + self_us, total_self + self_us)
+
+        total = sum(self_us for _, self_us, _ in modules)
+        self.stdout.write(f'{"module":<50} {"self ms":>9} {"cumulative ms":>14}')
+        ordered = sorted(rows.items(), key=lambda row: row[1][1], reverse=True)
+        for name, (self_us, cumulative_us) in ordered[:options['limit']]:
+            self.stdout.write(f'{name:<50} {self_us / 1000:>9.1f} {cumulative_us / 1000:>14.1f}')
+        self.stdout.write(f'{len(modules)} modules imported in {total / 1000:.1f} ms')
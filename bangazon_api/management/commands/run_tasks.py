@@ -0,0 +1,78 @@
+import multiprocessing
+import signal
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from bangazon_api import task_queue
+from bangazon_api.tasks import schedule_idempotency_prune, schedule_prune, schedule_sweep
+
+
+def work(index, burst, poll_interval):
+    """Loop of a single worker process"""
+    worker = f'{task_queue.worker_name()}:{index}'
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda *args: stopping.append(True))
+
+    while not stopping:
+        task_queue.release_stale()
+        ran = task_queue.run_pending(worker, limit=100)
+        if not ran:
+            if burst:
+                break
+            time.sleep(poll_interval)
+
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Run the deferred tasks from the task queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of worker processes',
+        )
+        parser.add_argument(
+            '--burst',
+            action='store_true',
+            help='Exit once the queue is empty instead of polling for new tasks',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=settings.TASK_POLL_INTERVAL,
+            help='Seconds to sleep when the queue is empty',
+        )
+
+    def handle(self, *args, **options):
+        # Starts the periodic sweep of expired cart holds and the prunes of sync
+        # tombstones and idempotency keys, a no-op when they are already queued
+        schedule_sweep()
+        schedule_prune()
+        schedule_idempotency_prune()
+
+        if options['workers'] == 1:
+            work(0, options['burst'], options['poll_interval'])
+            return
+
+        # Each process has to open its own database connection
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(
+                target=work, args=(index, options['burst'], options['poll_interval']))
+            for index in range(options['workers'])
+        ]
+        for process in processes:
+            process.start()
+
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.join()
@@ -8,6 +8,7 @@ from rest_framework.authtoken.models import Token
 from bangazon_api.models import (
     Store, Product, Category, PaymentType, Order, Favorite, Rating)
 from bangazon_api.helpers import STATE_NAMES
+from bangazon_api.tasks import refresh_purchase_counts, refresh_rating_totals
 
 
 class Command(BaseCommand):
@@ -62,6 +63,9 @@ class Command(BaseCommand):
             if user.id % 2 != 0:
                 self.create_ratings(user)
 
+        refresh_rating_totals(Product.objects.all())
+        refresh_purchase_counts(Product.objects.all())
+
     def create_store(self, user):
         """Create random stores in the database"""
         return Store.objects.create(
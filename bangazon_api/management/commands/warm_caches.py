@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from bangazon_api.warmup import warm_up
+
+
+class Command(BaseCommand):
+    help = ('Load the hottest catalog pages into the caches and the database page cache, '
+            'run before forking the workers')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--budget',
+            type=float,
+            help='Seconds to spend warming, defaults to WARMUP_TIME_BUDGET',
+        )
+        parser.add_argument(
+            '--products',
+            type=int,
+            help='Most product pages to load, defaults to WARMUP_PRODUCT_LIMIT',
+        )
+
+    def handle(self, *args, **options):
+        report = warm_up(options['budget'], options['products'])
+        self.stdout.write(
+            f"Warmed {report['categories']} categories, {report['stores']} stores and "
+            f"{report['products']} products in {report['ms']} ms")
+        if report['out_of_time']:
+            self.stdout.write('Stopped early, the time budget ran out')
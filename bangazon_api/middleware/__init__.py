@@ -0,0 +1,5 @@
+from .compression import CompressionMiddleware
+from .profiling import ProfilingMiddleware
+from .timing import TimingMiddleware
+from .invalidation import InvalidationMiddleware
+from .admission import AdmissionMiddleware
@@ -0,0 +1,168 @@
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.urls import Resolver404, resolve
+
+from bangazon_api.timing import view_name
+
+
+class Waiter:
+    __slots__ = ('name', 'priority', 'event', 'admitted')
+
+    def __init__(self, name, priority):
+        self.name = name
+        self.priority = priority
+        self.event = threading.Event()
+        self.admitted = False
+
+
+class Admission:
+    """Concurrency limits per route class with bounded, prioritized wait queues
+
+    A request runs when its class is under its limit and the worker is under
+    max_in_flight. Otherwise it waits in its class's queue, a freed slot goes
+    to the waiter with the lowest priority number, first come first served
+    within a class.
+
+    Args:
+        max_in_flight (int): requests the worker runs at once
+        classes (dict): class name to its priority, limit and queue size
+    """
+
+    def __init__(self, max_in_flight, classes):
+        self.max_in_flight = max_in_flight
+        self.classes = classes
+        self.lock = threading.Lock()
+        self.total = 0
+        self.in_flight = dict.fromkeys(classes, 0)
+        self.waiters = []
+
+    def has_room(self, name):
+        return self.total < self.max_in_flight and self.in_flight[name] < self.classes[name]['limit']
+
+    def admit(self, name):
+        self.total += 1
+        self.in_flight[name] += 1
+
+    def acquire(self, name, timeout):
+        """Wait for a slot for at most timeout seconds
+
+        Returns:
+            bool: False when the queue is full or the time ran out, the request has to be shed
+        """
+        priority = self.classes[name]['priority']
+        with self.lock:
+            # Earlier requests of the class, and waiters of more urgent classes
+            # that have room, go first
+            ahead = any(
+                waiter.name == name or (waiter.priority <= priority and self.has_room(waiter.name))
+                for waiter in self.waiters)
+            if self.has_room(name) and not ahead:
+                self.admit(name)
+                return True
+            queued = sum(1 for waiter in self.waiters if waiter.name == name)
+            if timeout <= 0 or queued >= self.classes[name]['queue']:
+                return False
+            waiter = Waiter(name, priority)
+            self.waiters.append(waiter)
+
+        waiter.event.wait(timeout)
+        with self.lock:
+            if not waiter.admitted:
+                self.waiters.remove(waiter)
+            return waiter.admitted
+
+    def release(self, name):
+        with self.lock:
+            self.total -= 1
+            self.in_flight[name] -= 1
+            # sorted is stable, waiters of a class stay in arrival order
+            for waiter in sorted(self.waiters, key=lambda waiter: waiter.priority):
+                if self.has_room(waiter.name):
+                    self.waiters.remove(waiter)
+                    self.admit(waiter.name)
+                    waiter.admitted = True
+                    waiter.event.set()
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_admission():
+    """Get the worker's Admission, shared by every handler's middleware, ex. the batch handler's"""
+    global _shared  # pylint: disable=global-statement
+    config = (settings.ADMISSION_MAX_IN_FLIGHT, settings.ADMISSION_CLASSES)
+    with _shared_lock:
+        if _shared is None or _shared[0] != config:
+            _shared = (config, Admission(*config))
+        return _shared[1]
+
+
+def queued_seconds(request):
+    """Seconds the request waited before reaching the worker, from the proxy's X-Request-Start header
+
+    Accepts `t=<seconds>` with a fraction, or a timestamp in milli or microseconds.
+    """
+    header = request.META.get('HTTP_X_REQUEST_START', '')
+    try:
+        start = float(header.split('=')[-1])
+    except ValueError:
+        return 0
+    if not math.isfinite(start):
+        return 0
+    if start > 1e14:
+        start /= 1e6
+    elif start > 1e11:
+        start /= 1e3
+    return max(time.time() - start, 0)
+
+
+class AdmissionMiddleware:
+    """Shed load with a 503 and Retry-After instead of letting requests pile up
+
+    Each request is classed by its view with ADMISSION_ROUTES, other reads
+    are catalog and other writes are writes, see ADMISSION_CLASSES. The wait
+    deadline of a class counts the time the request already queued in the
+    proxy.
+
+    The limits are per worker process, they only come into play with
+    threaded workers.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def route_class(self, request):
+        """Get the class of a request, None for the ADMISSION_EXEMPT views"""
+        try:
+            match = resolve(request.path_info)
+            name = view_name(match.func, request.method)
+        except Resolver404:
+            name = None
+        if name in settings.ADMISSION_EXEMPT:
+            return None
+        route_class = settings.ADMISSION_ROUTES.get(name)
+        if route_class is None:
+            route_class = 'catalog' if request.method in ('GET', 'HEAD', 'OPTIONS') else 'writes'
+        return route_class
+
+    def __call__(self, request):
+        name = self.route_class(request)
+        if name is None:
+            return self.get_response(request)
+        admission = get_admission()
+        config = admission.classes[name]
+        # A request past its deadline is shed even when there is room, its client has likely given up
+        remaining = config['wait'] - queued_seconds(request)
+        if remaining <= 0 or not admission.acquire(name, remaining):
+            response = JsonResponse({'message': 'The server is busy, try again shortly'}, status=503)
+            response['Retry-After'] = str(config['retry_after'])
+            return response
+        try:
+            return self.get_response(request)
+        finally:
+            admission.release(name)
@@ -0,0 +1,90 @@
+import gzip
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def accepted_encodings(header):
+    """Parse an Accept-Encoding header
+
+    Returns:
+        dict: encoding to its q value, q=0 means the client refuses the encoding
+    """
+    encodings = {}
+    for part in header.split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                continue
+        if name:
+            encodings[name.strip().lower()] = quality
+    return encodings
+
+
+def choose_encoding(header):
+    """Pick brotli or gzip based on the client's preference, brotli wins ties
+
+    An encoding refused with q=0 isn't picked even when * accepts anything.
+    """
+    encodings = accepted_encodings(header)
+    available = ['br', 'gzip'] if brotli is not None else ['gzip']
+    candidates = [
+        (encodings.get(name, encodings.get('*', 0)), -index, name)
+        for index, name in enumerate(available)
+    ]
+    quality, _, name = max(candidates)
+    return name if quality > 0 else None
+
+
+def compress(content, encoding):
+    if encoding == 'br':
+        return brotli.compress(content, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(content, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+class CompressionMiddleware:
+    """Compress text responses larger than COMPRESSION_MIN_SIZE with brotli or gzip
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        if (response.streaming or response.has_header('Content-Encoding')
+                or len(response.content) < settings.COMPRESSION_MIN_SIZE):
+            return response
+
+        content_type = response.get('Content-Type', '').split(';')[0].strip()
+        if content_type not in settings.COMPRESSION_CONTENT_TYPES:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        compressed = compress(response.content, encoding)
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+
+        # The compressed body is no longer byte for byte the same as the original
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+
+        return response
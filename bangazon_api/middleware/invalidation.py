@@ -0,0 +1,12 @@
+from bangazon_api import changes
+
+
+class InvalidationMiddleware:
+    """Drop cache entries changed by other workers before handling a request"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        changes.poll()
+        return self.get_response(request)
@@ -0,0 +1,138 @@
+import cProfile
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection
+from rest_framework.authtoken.models import Token
+
+from bangazon_api.timing import QueryTimer, view_name
+
+
+class StackSampler:
+    """Samples the call stack of one thread from a background thread
+
+    Much cheaper than cProfile for long requests, the samples are kept as
+    collapsed stacks that flame graph tools read directly.
+    """
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)  # pylint: disable=protected-access
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def collapsed(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+PROFILERS = ('cprofile', 'sampler')
+
+
+class ProfilingMiddleware:
+    """Profile single requests with cProfile or a stack sampler
+
+    A request is profiled when a staff user's token sends the X-Profile
+    header, or at random for PROFILING_SAMPLE_RATE of all requests. X-Profile
+    is 1 for the PROFILER setting, or cprofile or sampler. Only the chosen
+    profiler runs, cProfile's overhead would skew the sampled timings. Each
+    profile is written to PROFILING_DIR as a pstats file for cProfile or a
+    collapsed stacks file for the sampler, and a json file with the view,
+    timings and SQL time.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profiler_name = self.chosen_profiler(request)
+        if profiler_name is None:
+            return self.get_response(request)
+
+        if profiler_name == 'cprofile':
+            profiler = cProfile.Profile()
+            start_profiler, stop_profiler = profiler.enable, profiler.disable
+        else:
+            profiler = StackSampler(threading.get_ident(), settings.PROFILING_SAMPLE_INTERVAL)
+            start_profiler, stop_profiler = profiler.start, profiler.stop
+        queries = QueryTimer()
+
+        start = time.perf_counter()
+        with connection.execute_wrapper(queries):
+            start_profiler()
+            try:
+                response = self.get_response(request)
+            finally:
+                stop_profiler()
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        view = getattr(request, 'profiled_view', 'unresolved')
+        name = f'{datetime.now():%Y%m%dT%H%M%S.%f}-{view}-sql{queries.ms:.0f}ms'
+        directory = Path(settings.PROFILING_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        if profiler_name == 'cprofile':
+            profiler.dump_stats(directory / f'{name}.pstats')
+        else:
+            (directory / f'{name}.collapsed').write_text(profiler.collapsed())
+        (directory / f'{name}.json').write_text(json.dumps({
+            'view': view,
+            'profiler': profiler_name,
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'total_ms': round(elapsed_ms, 2),
+            'sql_ms': round(queries.ms, 2),
+            'queries': queries.count,
+        }, indent=2))
+
+        response['X-Profile'] = name
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.profiled_view = view_name(view_func, request.method)
+
+    def chosen_profiler(self, request):
+        """Get the profiler to run for a request, None to not profile it"""
+        header = request.META.get('HTTP_X_PROFILE')
+        if header in PROFILERS + ('1',):
+            if not self.is_staff(request):
+                return None
+            return settings.PROFILER if header == '1' else header
+        rate = settings.PROFILING_SAMPLE_RATE
+        if rate > 0 and random.random() < rate:
+            return settings.PROFILER
+        return None
+
+    def is_staff(self, request):
+        """Check the request's token, DRF has not authenticated it yet in middleware"""
+        keyword, _, key = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+        if keyword != 'Token' or not key:
+            return False
+        return Token.objects.filter(key=key.strip(), user__is_staff=True).exists()
@@ -0,0 +1,66 @@
+import json
+import logging
+import time
+from datetime import datetime, timezone
+
+from django.db import connection
+
+from bangazon_api.timing import end_request, start_request, view_name
+
+logger = logging.getLogger('bangazon_api.access')
+
+
+def server_timing(durations, queries, total_ms):
+    """Build the Server-Timing header value
+
+    Returns:
+        string: ex. auth;dur=0.4, db;dur=2.1;desc="3 queries", total;dur=5.0
+    """
+    metrics = []
+    for phase, duration in durations.items():
+        metric = f'{phase};dur={duration:.2f}'
+        if phase == 'db':
+            metric += f';desc="{queries} queries"'
+        metrics.append(metric)
+    metrics.append(f'total;dur={total_ms:.2f}')
+    return ', '.join(metrics)
+
+
+class TimingMiddleware:
+    """Break each request's latency down into auth, db, serialize and render
+
+    The breakdown is sent in the Server-Timing header and written as a json
+    line to the bangazon_api.access log.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings, token = start_request()
+        start = time.perf_counter()
+        try:
+            with connection.execute_wrapper(timings.queries):
+                response = self.get_response(request)
+        finally:
+            end_request(token)
+        total_ms = (time.perf_counter() - start) * 1000
+
+        durations = timings.durations_ms
+        response['Server-Timing'] = server_timing(durations, timings.queries.count, total_ms)
+
+        match = request.resolver_match
+        user = getattr(request, 'user', None)
+        logger.info(json.dumps({
+            'time': datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+            'method': request.method,
+            'path': request.path,
+            'route': match.route if match else None,
+            'view': view_name(match.func, request.method) if match else None,
+            'status': response.status_code,
+            'user': user.id if user is not None and user.is_authenticated else None,
+            'queries': timings.queries.count,
+            'total_ms': round(total_ms, 2),
+            **{f'{phase}_ms': round(duration, 2) for phase, duration in durations.items()},
+        }))
+        return response
@@ -0,0 +1,71 @@
+# Generated by Django 3.2.25 on 2026-10-19 14:45
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+import django.utils.timezone
+
+
+def fill_product_totals(apps, schema_editor):
+    Product = apps.get_model('bangazon_api', 'Product')
+    products = Product.objects.annotate(
+        count=Count('ratings'), total=Sum('ratings__score'))
+    for product in products:
+        product.rating_count = product.count
+        product.rating_sum = product.total or 0
+    Product.objects.bulk_update(products, ['rating_count', 'rating_sum'], batch_size=500)
+
+    products = Product.objects.annotate(
+        completed=Count('orders', filter=Q(orders__payment_type__isnull=False)))
+    for product in products:
+        product.purchase_count = product.completed
+    Product.objects.bulk_update(products, ['purchase_count'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bangazon_api', '0004_rating_review'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Task',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('key', models.CharField(blank=True, max_length=200, null=True)),
+                ('payload', models.JSONField(default=dict)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('attempts', models.IntegerField(default=0)),
+                ('run_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('locked_by', models.CharField(blank=True, max_length=100, null=True)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True, null=True)),
+                ('created_on', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='purchase_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_sum',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['status', 'run_at'], name='task_status_run_at'),
+        ),
+        migrations.AddConstraint(
+            model_name='task',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'pending')), fields=('key',), name='task_pending_key'),
+        ),
+        migrations.RunPython(fill_product_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 3.2.25 on 2026-10-19 14:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bangazon_api', '0005_task_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='sku',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='product',
+            constraint=models.UniqueConstraint(fields=('store', 'sku'), name='product_store_sku'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 3.2.25 on 2026-10-19 14:58
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def merge_open_orders(apps, schema_editor):
+    """Fold every user's extra open orders into their oldest one"""
+    Order = apps.get_model('bangazon_api', 'Order')
+    OrderProduct = apps.get_model('bangazon_api', 'OrderProduct')
+
+    duplicated = Order.objects.filter(completed_on=None).values('user_id').annotate(
+        open_count=Count('id')).filter(open_count__gt=1).values_list('user_id', flat=True)
+
+    for user_id in duplicated:
+        keep, *extra = Order.objects.filter(
+            user_id=user_id, completed_on=None).order_by('id')
+        in_cart = set(OrderProduct.objects.filter(
+            order=keep).values_list('product_id', flat=True))
+        for line in OrderProduct.objects.filter(order__in=extra):
+            if line.product_id not in in_cart:
+                in_cart.add(line.product_id)
+                OrderProduct.objects.create(order=keep, product_id=line.product_id)
+        Order.objects.filter(pk__in=[order.pk for order in extra]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bangazon_api', '0006_product_sku'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_open_orders, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='order',
+            constraint=models.UniqueConstraint(condition=models.Q(('completed_on', None)), fields=('user',), name='order_one_open_per_user'),
+        ),
+    ]
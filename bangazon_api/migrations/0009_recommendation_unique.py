@@ -0,0 +1,31 @@
+# Generated by Django 3.2.25 on 2026-10-19 15:00
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def delete_duplicates(apps, schema_editor):
+    """Keep the first of every repeated recommendation"""
+    Recommendation = apps.get_model('bangazon_api', 'Recommendation')
+    first_ids = Recommendation.objects.values(
+        'recommender_id', 'customer_id', 'product_id').annotate(first_id=Min('id')).values('first_id')
+    Recommendation.objects.exclude(id__in=first_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bangazon_api', '0008_feed_entry'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicates, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='recommendation',
+            index=models.Index(fields=['customer', 'id'], name='recommendation_inbox'),
+        ),
+        migrations.AddConstraint(
+            model_name='recommendation',
+            constraint=models.UniqueConstraint(fields=('recommender', 'customer', 'product'), name='recommendation_unique'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 3.2.25 on 2026-10-19 15:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bangazon_api', '0010_archived_orders'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=100)),
+                ('object_id', models.CharField(blank=True, max_length=64, null=True)),
+                ('created_on', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 3.2.25 on 2026-10-19 15:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bangazon_api', '0011_change_event'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Reservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('expires_on', models.DateTimeField()),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='bangazon_api.order')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='bangazon_api.product')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['product', 'expires_on'], name='reservation_live'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['expires_on'], name='reservation_expiry'),
+        ),
+        migrations.AddConstraint(
+            model_name='reservation',
+            constraint=models.UniqueConstraint(fields=('order', 'product'), name='reservation_order_product'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 3.2.25 on 2026-10-19 15:14
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def fill_histograms(apps, schema_editor):
+    Product = apps.get_model('bangazon_api', 'Product')
+    scores = range(1, 6)
+    products = Product.objects.annotate(**{
+        f'score_{score}': Count('ratings', filter=Q(ratings__score=score)) for score in scores})
+    for product in products:
+        for score in scores:
+            setattr(product, f'rating_count_{score}', getattr(product, f'score_{score}'))
+    Product.objects.bulk_update(
+        products, [f'rating_count_{score}' for score in scores], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bangazon_api', '0012_reservation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_count_1',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_count_2',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_count_3',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_count_4',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_count_5',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='rating',
+            index=models.Index(fields=['product', 'id'], name='rating_reviews'),
+        ),
+        migrations.AddIndex(
+            model_name='rating',
+            index=models.Index(fields=['product', 'score', 'id'], name='rating_reviews_by_score'),
+        ),
+        migrations.RunPython(fill_histograms, migrations.RunPython.noop),
+    ]
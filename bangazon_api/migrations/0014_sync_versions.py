@@ -0,0 +1,109 @@
+# Generated by Django 3.2.25 on 2026-10-19 15:18
+
+from django.db import migrations, models
+from django.db.models import F, Max
+from django.utils import timezone
+
+
+def number_rows(apps, schema_editor):
+    """Give every existing row its own version, one model after the other"""
+    offset = 0
+    now = timezone.now()
+    for name in ('Category', 'Store', 'Product', 'Order'):
+        model = apps.get_model('bangazon_api', name)
+        model.objects.update(version=F('id') + offset, updated_at=now)
+        offset += model.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+    apps.get_model('bangazon_api', 'Sequence').objects.create(name='sync', value=offset)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bangazon_api', '0013_rating_histogram'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Sequence',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=100)),
+                ('object_id', models.BigIntegerField()),
+                ('user_id', models.IntegerField(blank=True, null=True)),
+                ('version', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='updated_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='version',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='updated_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='version',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='updated_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='version',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='store',
+            name='updated_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='store',
+            name='version',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['version'], name='category_changes'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', 'version'], name='order_changes'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['version'], name='product_changes'),
+        ),
+        migrations.AddIndex(
+            model_name='store',
+            index=models.Index(fields=['version'], name='store_changes'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['model', 'version'], name='tombstone_changes'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['deleted_at'], name='tombstone_expiry'),
+        ),
+        migrations.RunPython(number_rows, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 3.2.25 on 2026-10-19 15:26
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+import django.db.models.deletion
+
+
+def count_products(apps, schema_editor):
+    Category = apps.get_model('bangazon_api', 'Category')
+    categories = Category.objects.annotate(
+        active_products=Count('products', filter=Q(products__store__is_active=True)))
+    for category in categories:
+        category.product_count = category.active_products
+    Category.objects.bulk_update(categories, ['product_count'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bangazon_api', '0015_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='children', to='bangazon_api.category'),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='product_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_products, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.25 on 2026-10-19 15:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bangazon_api', '0016_category_tree'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='archivedorder',
+            name='id',
+            field=models.BigIntegerField(primary_key=True, serialize=False),
+        ),
+    ]
@@ -1,9 +1,17 @@
+from .archived_order import ArchivedOrder, ArchivedOrderProduct
 from .category import Category
+from .change_event import ChangeEvent
 from .favorite import Favorite
+from .feed_entry import FeedEntry
+from .idempotency_key import IdempotencyKey
 from .order import Order
 from .order_product import OrderProduct
 from .payment_type import PaymentType
 from .product import Product
 from .rating import Rating
 from .recommendation import Recommendation
+from .reservation import Reservation
+from .sequence import Sequence
 from .store import Store
+from .task import Task
+from .tombstone import Tombstone
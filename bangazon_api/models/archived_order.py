@@ -0,0 +1,37 @@
+from django.db import models
+from django.contrib.auth.models import User
+
+
+class ArchivedOrder(models.Model):
+    """A completed order moved out of the Order table by the archive_orders command
+
+    Keeps the original order's id, its line items keep the product's name and
+    price so the history reads without joining the hot tables.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='archived_orders')
+    payment_type = models.ForeignKey(
+        "PaymentType", on_delete=models.SET_NULL, null=True, blank=True)
+    created_on = models.DateTimeField()
+    completed_on = models.DateTimeField()
+    archived_on = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # The history is read newest first by id
+            models.Index(fields=['user', 'id'], name='archived_order_history'),
+        ]
+
+    @property
+    def total(self):
+        return sum([item.price for item in self.items.all()], 0)
+
+
+class ArchivedOrderProduct(models.Model):
+    order = models.ForeignKey(
+        ArchivedOrder, on_delete=models.CASCADE, related_name='items')
+    product = models.ForeignKey(
+        "Product", on_delete=models.SET_NULL, null=True, related_name='archived_order_items')
+    name = models.CharField(max_length=100)
+    price = models.FloatField()
@@ -1,11 +1,38 @@
+from django.core.exceptions import ValidationError
 from django.db import models
 
 
 class Category(models.Model):
     name = models.CharField(max_length=50)
+    parent = models.ForeignKey(
+        'self', on_delete=models.CASCADE, null=True, blank=True, related_name='children')
+    # Products of active stores directly in the category, kept up to date by
+    # the triggers in bangazon_api/category_counts.py
+    product_count = models.IntegerField(default=0, editable=False)
+    # Set by the database triggers in bangazon_api/sync.py
+    version = models.BigIntegerField(default=0, editable=False)
+    updated_at = models.DateTimeField(null=True, blank=True, editable=False)
 
     class Meta:
         verbose_name_plural = 'Categories'
+        indexes = [
+            models.Index(fields=['version'], name='category_changes'),
+        ]
+
+    def clean(self):
+        parent = self.parent
+        while parent is not None:
+            if parent.pk == self.pk:
+                raise ValidationError({'parent': 'A category cannot be its own ancestor'})
+            parent = parent.parent
+
+    def save(self, *args, **kwargs):
+        # A save of an instance read before a product changed would overwrite the count
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'product_count']
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f'Category: {self.name}'
@@ -0,0 +1,8 @@
+from django.db import models
+
+
+class ChangeEvent(models.Model):
+    """A row written for every change to a cached model, see bangazon_api/changes.py"""
+    model = models.CharField(max_length=100)
+    object_id = models.CharField(max_length=64, null=True, blank=True)
+    created_on = models.DateTimeField(auto_now_add=True, db_index=True)
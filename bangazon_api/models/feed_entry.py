@@ -0,0 +1,16 @@
+from django.db import models
+from django.contrib.auth.models import User
+
+
+class FeedEntry(models.Model):
+    """A product from a favorited store, copied into the customer's feed when it is created"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='feed_entries')
+    product = models.ForeignKey(
+        "Product", on_delete=models.CASCADE, related_name='feed_entries')
+
+    class Meta:
+        verbose_name_plural = 'Feed entries'
+        constraints = [
+            # Also the index feed pages are read from, newest product first
+            models.UniqueConstraint(fields=['user', 'product'], name='feed_entry_user_product'),
+        ]
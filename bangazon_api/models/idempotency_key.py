@@ -0,0 +1,22 @@
+from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+
+class IdempotencyKey(models.Model):
+    """The stored response of a request sent with an Idempotency-Key header
+
+    See bangazon_api/idempotency.py, status is null while the request is running.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    key = models.CharField(max_length=100)
+    # Hash of the method, path and body, a key can't be reused for another request
+    fingerprint = models.CharField(max_length=40)
+    status = models.SmallIntegerField(null=True, blank=True)
+    data = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_on = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='idempotency_user_key'),
+        ]
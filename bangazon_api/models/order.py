@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Q
 from django.contrib.auth.models import User
 
 
@@ -11,6 +12,19 @@ class Order(models.Model):
     completed_on = models.DateTimeField(null=True, blank=True)
     products = models.ManyToManyField(
         "Product", through="OrderProduct", related_name='orders')
+    # Set by the database triggers in bangazon_api/sync.py
+    version = models.BigIntegerField(default=0, editable=False)
+    updated_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user'], condition=Q(completed_on=None), name='order_one_open_per_user'),
+        ]
+        indexes = [
+            # Orders are synced per customer
+            models.Index(fields=['user', 'version'], name='order_changes'),
+        ]
 
     @property
     def total(self):
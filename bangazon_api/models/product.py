@@ -2,8 +2,12 @@ from django.db import models
 from django.core.validators import MaxValueValidator, MinValueValidator
 
 
+SCORES = range(1, 6)
+
+
 class Product(models.Model):
     name = models.CharField(max_length=100)
+    sku = models.CharField(max_length=64, null=True, blank=True)
     store = models.ForeignKey(
         "Store", on_delete=models.CASCADE, related_name='products')
     price = models.FloatField(validators=[
@@ -15,6 +19,27 @@ class Product(models.Model):
                                    width_field=None, max_length=None, null=True, blank=True)
     category = models.ForeignKey(
         "Category", on_delete=models.CASCADE, related_name='products')
+    # Kept up to date by the tasks in bangazon_api/tasks.py
+    rating_count = models.IntegerField(default=0)
+    rating_sum = models.IntegerField(default=0)
+    # Number of ratings with each score, see rating_histogram
+    rating_count_1 = models.IntegerField(default=0)
+    rating_count_2 = models.IntegerField(default=0)
+    rating_count_3 = models.IntegerField(default=0)
+    rating_count_4 = models.IntegerField(default=0)
+    rating_count_5 = models.IntegerField(default=0)
+    purchase_count = models.IntegerField(default=0)
+    # Set by the database triggers in bangazon_api/sync.py
+    version = models.BigIntegerField(default=0, editable=False)
+    updated_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['store', 'sku'], name='product_store_sku'),
+        ]
+        indexes = [
+            models.Index(fields=['version'], name='product_changes'),
+        ]
 
     def save(self, *args, **kwargs):
         self.clean_fields()
@@ -23,23 +48,34 @@ class Product(models.Model):
     @property
     def average_rating(self):
         """Average rating calculated attribute for each product
+
+        Read from the stored totals, which rating a product updates in place
+        and the products.refresh_rating task recomputes.
         Returns:
             number -- The average rating for the product
         """
-        # TODO: Fix Divide by zero error
+        if not self.rating_count:
+            return 0
 
-        total_rating = 0
-        for rating in self.ratings.all():
-            total_rating += rating.score
+        return self.rating_sum / self.rating_count
 
-        avg = total_rating / self.ratings.count()
-        return avg
+    @property
+    def rating_histogram(self):
+        """Number of ratings for each score
+
+        Returns:
+            dict: ex. {1: 0, 2: 1, 3: 0, 4: 5, 5: 12}
+        """
+        return {score: getattr(self, f'rating_count_{score}') for score in SCORES}
 
     @property
     def number_purchased(self):
         """Returns the number of times product shows up on completed orders
+
+        Read from purchase_count, which only the orders.refresh_sales task
+        updates, so it lags behind until a run_tasks worker has run it.
         """
-        return self.orders.exclude(payment_type=None).count()
+        return self.purchase_count
 
     def __str__(self):
         return self.name
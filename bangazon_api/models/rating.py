@@ -6,3 +6,10 @@ class Rating(models.Model):
     product = models.ForeignKey("Product", on_delete=models.CASCADE, related_name="ratings")
     score = models.IntegerField()
     review = models.TextField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # The reviews of a product are paged newest first by id, or by score
+            models.Index(fields=['product', 'id'], name='rating_reviews'),
+            models.Index(fields=['product', 'score', 'id'], name='rating_reviews_by_score'),
+        ]
@@ -7,3 +7,13 @@ class Recommendation(models.Model):
     customer = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name="recommendations")
     product = models.ForeignKey("Product", on_delete=models.CASCADE)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recommender', 'customer', 'product'], name='recommendation_unique'),
+        ]
+        indexes = [
+            # The customer's inbox is read newest first by id
+            models.Index(fields=['customer', 'id'], name='recommendation_inbox'),
+        ]
@@ -0,0 +1,24 @@
+from django.db import models
+
+
+class Reservation(models.Model):
+    """One unit of a product held for an open order until expires_on
+
+    See bangazon_api/reservations.py
+    """
+    order = models.ForeignKey(
+        "Order", on_delete=models.CASCADE, related_name='reservations')
+    product = models.ForeignKey(
+        "Product", on_delete=models.CASCADE, related_name='reservations')
+    expires_on = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['order', 'product'], name='reservation_order_product'),
+        ]
+        indexes = [
+            # Counting a product's live holds reads only this index
+            models.Index(fields=['product', 'expires_on'], name='reservation_live'),
+            # The sweeper deletes the expired holds oldest first
+            models.Index(fields=['expires_on'], name='reservation_expiry'),
+        ]
@@ -0,0 +1,7 @@
+from django.db import models
+
+
+class Sequence(models.Model):
+    """A named counter, ex. the last version handed out to a synced row"""
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.BigIntegerField(default=0)
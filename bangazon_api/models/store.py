@@ -7,6 +7,14 @@ class Store(models.Model):
     description = models.TextField()
     is_active = models.BooleanField(default=True)
     favorites = models.ManyToManyField(User, through='Favorite', related_name='favorites')
+    # Set by the database triggers in bangazon_api/sync.py
+    version = models.BigIntegerField(default=0, editable=False)
+    updated_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['version'], name='store_changes'),
+        ]
 
     def __str__(self):
         return self.name
@@ -0,0 +1,17 @@
+from django.db import models
+
+
+class Tombstone(models.Model):
+    """A deleted row of a synced model, written by the triggers in bangazon_api/sync.py"""
+    model = models.CharField(max_length=100)
+    object_id = models.BigIntegerField()
+    # The owner of a deleted per-user row, ex. an order's customer
+    user_id = models.IntegerField(null=True, blank=True)
+    version = models.BigIntegerField()
+    deleted_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['model', 'version'], name='tombstone_changes'),
+            models.Index(fields=['deleted_at'], name='tombstone_expiry'),
+        ]
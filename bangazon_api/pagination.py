@@ -0,0 +1,48 @@
+"""Keyset pagination for the list endpoints that can grow without bound
+
+Pages are fetched with `WHERE id < cursor ORDER BY id DESC LIMIT n`, which
+stays an index range scan however deep the client pages, unlike OFFSET.
+"""
+from django.conf import settings
+
+
+def page_params(request):
+    """Read the cursor and limit query params
+
+    Raises:
+        ValueError: when either one is not a number
+
+    Returns:
+        tuple: the cursor, None for the first page, and the page size
+    """
+    cursor = request.query_params.get('cursor', None)
+    cursor = int(cursor) if cursor else None
+    limit = int(request.query_params.get('limit', settings.PAGE_SIZE))
+    return cursor, max(1, min(limit, settings.MAX_PAGE_SIZE))
+
+
+def paginate(queryset, cursor, limit):
+    """Get a page of a queryset, newest id first
+
+    Returns:
+        tuple: the list of objects and the cursor of the next page, None on the last page
+    """
+    if cursor is not None:
+        queryset = queryset.filter(id__lt=cursor)
+    page = list(queryset.order_by('-id')[:limit + 1])
+    next_cursor = page[limit - 1].id if len(page) > limit else None
+    return page[:limit], next_cursor
+
+
+def since_params(request):
+    """Read the since and limit query params of the change feeds, see bangazon_api/sync.py
+
+    Raises:
+        ValueError: when either one is not a number
+
+    Returns:
+        tuple: the cursor, 0 for a full sync, and the page size
+    """
+    since = int(request.query_params.get('since') or 0)
+    limit = int(request.query_params.get('limit', settings.PAGE_SIZE))
+    return max(since, 0), max(1, min(limit, settings.MAX_PAGE_SIZE))
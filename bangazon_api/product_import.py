@@ -0,0 +1,228 @@
+"""Bulk import of a seller's catalog from CSV or JSON lines
+
+Rows are read as a stream and handled in batches, each batch is validated
+in memory and written inside its own transaction, new products with one
+bulk_create and existing ones with one executemany UPDATE. Products are
+matched to existing ones by the seller's SKU.
+
+Like a product created through the API, every new product is pushed to the
+feeds of the store's followers by a feed.fan_out task.
+"""
+import csv
+import io
+import json
+import math
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from bangazon_api import changes
+from bangazon_api.models import Category, Product
+from bangazon_api.store_stats import STORE_STATS
+from bangazon_api.task_queue import enqueue_many
+
+FORMATS = ('csv', 'jsonl')
+
+UPDATE_FIELDS = ['name', 'price', 'description', 'quantity', 'location', 'category']
+
+
+def detect_format(filename):
+    """Get the format from a file name, ex. catalog.csv"""
+    extension = filename.rsplit('.', 1)[-1].lower()
+    if extension in ('jsonl', 'ndjson'):
+        return 'jsonl'
+    return 'csv'
+
+
+def read_rows(stream, file_format):
+    """Parse a binary stream one row at a time
+
+    Yields:
+        tuple: the row number and the row as a dict
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if file_format == 'csv':
+        # The header is row 1
+        for number, row in enumerate(csv.DictReader(text), start=2):
+            yield number, row
+        return
+
+    for number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as ex:
+            row = {'_error': f'Invalid JSON: {ex}'}
+        if not isinstance(row, dict):
+            row = {'_error': 'Each line must be a JSON object'}
+        yield number, row
+
+
+def update_products(products):
+    """Write the UPDATE_FIELDS of existing products with one prepared statement
+
+    bulk_update builds a CASE expression per field and row, the ORM work alone
+    takes longer than the writes for large catalogs.
+    """
+    if not products:
+        return
+    fields = [Product._meta.get_field(name) for name in UPDATE_FIELDS]
+    quote = connection.ops.quote_name
+    assignments = ', '.join(f'{quote(field.column)} = %s' for field in fields)
+    sql = f'UPDATE {quote(Product._meta.db_table)} SET {assignments} WHERE {quote("id")} = %s'
+    params = [
+        [field.get_db_prep_save(getattr(product, field.attname), connection) for field in fields]
+        + [product.pk]
+        for product in products
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, params)
+
+
+def error_messages(error):
+    """Flatten a ValidationError, prefixing field errors with the field name"""
+    if not hasattr(error, 'error_dict'):
+        return error.messages
+    return [
+        f'{field}: {message}'
+        for field, messages in error.message_dict.items()
+        for message in messages
+    ]
+
+
+class ProductImporter:
+    """Import rows into a store's catalog
+
+    Args:
+        store (Store): the store the products belong to
+        batch_size (int): rows validated and written per transaction
+        max_errors (int): most failed rows reported, defaults to PRODUCT_IMPORT_MAX_ERRORS
+    """
+
+    def __init__(self, store, batch_size=1000, max_errors=None):
+        self.store = store
+        self.batch_size = batch_size
+        self.max_errors = settings.PRODUCT_IMPORT_MAX_ERRORS if max_errors is None else max_errors
+        self.categories = {}
+        self.created = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors = []
+
+    @property
+    def report(self):
+        return {
+            'created': self.created,
+            'updated': self.updated,
+            'failed': self.failed,
+            'errors': self.errors,
+        }
+
+    def run(self, rows):
+        """Import every row
+
+        Args:
+            rows (iterable): (row number, dict) pairs, ex. from read_rows
+
+        Returns:
+            dict: the number of created, updated and failed products and the
+                errors of the first max_errors failed rows
+        """
+        self.categories = {
+            category.name.lower(): category for category in Category.objects.all()}
+
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                self.import_batch(batch)
+                batch = []
+        if batch:
+            self.import_batch(batch)
+        return self.report
+
+    def import_batch(self, rows):
+        products = {}
+        for number, row in rows:
+            try:
+                product = self.build_product(row)
+            except ValidationError as ex:
+                self.failed += 1
+                if len(self.errors) < self.max_errors:
+                    self.errors.append({'row': number, 'errors': error_messages(ex)})
+                continue
+            # A SKU repeated in the same batch keeps its last row
+            products[product.sku] = product
+
+        if not products:
+            return
+
+        with transaction.atomic():
+            existing = {
+                sku: (pk, category_id) for sku, pk, category_id in Product.objects.filter(
+                    store=self.store, sku__in=list(products)).values_list('sku', 'id', 'category_id')}
+            new = []
+            changed = []
+            # The categories whose product counts change
+            categories = set()
+            for sku, product in products.items():
+                if sku in existing:
+                    product.id, category_id = existing[sku]
+                    changed.append(product)
+                    if category_id != product.category_id:
+                        categories.update([category_id, product.category_id])
+                else:
+                    new.append(product)
+                    categories.add(product.category_id)
+
+            Product.objects.bulk_create(new, batch_size=self.batch_size)
+            update_products(changed)
+            # Neither write sends signals, and bulk_create doesn't set the new ids on SQLite
+            created_ids = list(Product.objects.filter(
+                store=self.store, sku__in=[product.sku for product in new]).values_list('id', flat=True))
+            changes.publish(Product, [product.id for product in changed] + created_ids)
+            changes.publish(STORE_STATS, [self.store.id])
+            changes.publish(Category, categories)
+            enqueue_many('feed.fan_out', [
+                {'product_id': product_id, 'store_id': self.store.id} for product_id in created_ids
+            ], key=lambda payload: f"feed-fan-out:{payload['product_id']}")
+
+        self.created += len(new)
+        self.updated += len(changed)
+
+    def build_product(self, row):
+        """Turn a row into an unsaved product, raising ValidationError for bad rows"""
+        if '_error' in row:
+            raise ValidationError(row['_error'])
+
+        sku = str(row.get('sku') or '').strip()
+        if not sku:
+            raise ValidationError('sku is required')
+
+        try:
+            price = float(row.get('price'))
+            quantity = int(row.get('quantity'))
+        except (TypeError, ValueError) as ex:
+            raise ValidationError('price and quantity must be numbers') from ex
+        if not math.isfinite(price):
+            raise ValidationError('price must be a finite number')
+
+        product = Product(
+            sku=sku,
+            store=self.store,
+            name=row.get('name'),
+            price=price,
+            description=row.get('description'),
+            quantity=quantity,
+            location=row.get('location'),
+            category=self.get_category(row.get('category')),
+        )
+        # The store and category are already loaded, validating them would query for each row
+        product.clean_fields(exclude=['image_path', 'store', 'category'])
+        return product
+
+    def get_category(self, name):
+        try:
+            return self.categories[str(name).strip().lower()]
+        except KeyError as ex:
+            raise ValidationError(f'Unknown category: {name}') from ex
@@ -0,0 +1,85 @@
+"""Product ratings: the stored totals and histogram, and paging through reviews"""
+from django.db import transaction
+from django.db.models import F, Q
+from bangazon_api import changes
+from bangazon_api.models import Product, Rating
+from bangazon_api.models.product import SCORES
+
+SORTS = ['newest', 'score']
+
+
+def rate(customer, product, score, review):
+    """Add or change a customer's rating and update the product's totals in place
+
+    Raises:
+        ValueError: when the score is not 1 to 5
+
+    Returns:
+        Rating: the saved rating
+    """
+    try:
+        score = int(score)
+    except (TypeError, ValueError) as ex:
+        raise ValueError('score must be between 1 and 5') from ex
+    if score not in SCORES:
+        raise ValueError('score must be between 1 and 5')
+
+    with transaction.atomic():
+        rating = Rating.objects.select_for_update().filter(
+            customer=customer, product=product).first()
+        if rating is None:
+            rating = Rating.objects.create(
+                customer=customer, product=product, score=score, review=review)
+            totals = {
+                'rating_count': F('rating_count') + 1,
+                'rating_sum': F('rating_sum') + score,
+                f'rating_count_{score}': F(f'rating_count_{score}') + 1,
+            }
+        else:
+            old_score = rating.score
+            rating.score = score
+            rating.review = review
+            rating.save()
+            totals = {'rating_sum': F('rating_sum') + score - old_score}
+            if old_score != score:
+                totals[f'rating_count_{old_score}'] = F(f'rating_count_{old_score}') - 1
+                totals[f'rating_count_{score}'] = F(f'rating_count_{score}') + 1
+        Product.objects.filter(pk=product.pk).update(**totals)
+        # The update doesn't send signals
+        changes.publish(Product, [product.pk])
+    return rating
+
+
+def encode_cursor(rating, sort):
+    return f'{rating.score}.{rating.id}' if sort == 'score' else str(rating.id)
+
+
+def read_reviews(product_id, sort='newest', cursor=None, limit=20):
+    """Get a page of a product's reviews
+
+    Newest first pages along the rating_reviews index, by score pages along
+    rating_reviews_by_score, highest score first and newest first within a score.
+
+    Raises:
+        ValueError: for an unknown sort or a cursor from another sort
+
+    Returns:
+        tuple: the list of ratings and the cursor of the next page, None on the last page
+    """
+    if sort not in SORTS:
+        raise ValueError(f'sort must be one of {", ".join(SORTS)}')
+
+    ratings = Rating.objects.filter(product_id=product_id).select_related('customer')
+    if sort == 'score':
+        ratings = ratings.order_by('-score', '-id')
+        if cursor:
+            score, rating_id = (int(part) for part in cursor.split('.'))
+            ratings = ratings.filter(Q(score__lt=score) | Q(score=score, id__lt=rating_id))
+    else:
+        ratings = ratings.order_by('-id')
+        if cursor:
+            ratings = ratings.filter(id__lt=int(cursor))
+
+    page = list(ratings[:limit + 1])
+    next_cursor = encode_cursor(page[limit - 1], sort) if len(page) > limit else None
+    return page[:limit], next_cursor
@@ -0,0 +1,42 @@
+"""JSON rendering with orjson when it is installed
+
+orjson is optional, without it FastJSONRenderer behaves exactly like DRF's
+JSONRenderer.
+"""
+from django.db.models.fields.files import FieldFile
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from bangazon_api.timing import measure
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONEncoder(JSONEncoder):
+    def default(self, obj):  # pylint: disable=arguments-renamed
+        if isinstance(obj, FieldFile):
+            return obj.url if obj else None
+        return super().default(obj)
+
+
+class FastJSONRenderer(JSONRenderer):
+    encoder_class = FastJSONEncoder
+    options = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Render with orjson, falling back to the stdlib encoder for indented output
+
+        Datetimes are passed through to the DRF encoder so both renderers
+        format them the same way.
+        """
+        with measure('render'):
+            if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}):
+                return super().render(data, accepted_media_type, renderer_context)
+
+            if data is None:
+                return b''
+
+            return orjson.dumps(data, default=self.encoder_class().default, option=self.options)
@@ -0,0 +1,119 @@
+"""Holding stock for the products in open orders
+
+Adding a product to the cart holds one unit of it for RESERVATION_TTL
+seconds. The stock a customer can still add is the product's quantity
+minus its live holds. Completing the order turns its holds into a lower
+quantity, expired holds are deleted by the reservations.sweep task.
+
+The availability check and the insert of a hold are a single statement,
+so two carts can't both take the last unit.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from bangazon_api import changes
+from bangazon_api.models import OrderProduct, Product, Reservation
+from bangazon_api.store_stats import STORE_STATS
+
+
+class SoldOut(Exception):
+    pass
+
+
+def db_datetime(value):
+    return Reservation._meta.get_field('expires_on').get_db_prep_value(value, connection)
+
+
+def reserve(order_id, product_id):
+    """Hold a unit of a product for an order, or extend the order's hold
+
+    Raises:
+        SoldOut: when every unit is sold or held by other orders
+    """
+    now = timezone.now()
+    expires_on = now + timedelta(seconds=settings.RESERVATION_TTL)
+    holds = Reservation.objects.filter(order_id=order_id, product_id=product_id)
+
+    with transaction.atomic():
+        if holds.filter(expires_on__gt=now).update(expires_on=expires_on):
+            return
+        # An expired hold no longer counts, the unit has to be available again
+        holds.delete()
+
+        # Locks the product row on databases that support it, SQLite already
+        # runs the insert below with the database write lock held
+        list(Product.objects.select_for_update().filter(pk=product_id).values_list('id'))
+
+        quote = connection.ops.quote_name
+        reservations = quote(Reservation._meta.db_table)
+        products = quote(Product._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {reservations} (order_id, product_id, expires_on) '
+                f'SELECT %s, p.id, %s FROM {products} p WHERE p.id = %s AND p.quantity > ('
+                f'SELECT COUNT(*) FROM {reservations} r '
+                f'WHERE r.product_id = p.id AND r.expires_on > %s)',
+                [order_id, db_datetime(expires_on), product_id, db_datetime(now)])
+            if cursor.rowcount != 1:
+                raise SoldOut('This product is sold out')
+
+
+def release(order_id, product_id):
+    Reservation.objects.filter(order_id=order_id, product_id=product_id).delete()
+
+
+def held_quantity(product_id):
+    """Count the live holds of a product with a range scan of the reservation_live index"""
+    return Reservation.objects.filter(
+        product_id=product_id, expires_on__gt=timezone.now()).count()
+
+
+def checkout(order):
+    """Take the order's products out of stock
+
+    Products whose hold expired are held again first.
+
+    Raises:
+        SoldOut: when a product without a live hold is no longer available,
+            or the seller lowered its stock to 0 while it was held
+    """
+    product_ids = list(OrderProduct.objects.filter(
+        order=order).values_list('product_id', flat=True))
+    with transaction.atomic():
+        for product_id in product_ids:
+            try:
+                reserve(order.id, product_id)
+            except SoldOut as ex:
+                name = Product.objects.get(pk=product_id).name
+                raise SoldOut(f'{name} is sold out') from ex
+        in_stock = Product.objects.filter(id__in=product_ids, quantity__gt=0)
+        if in_stock.update(quantity=F('quantity') - 1) < len(set(product_ids)):
+            name = Product.objects.filter(id__in=product_ids, quantity__lte=0).values_list(
+                'name', flat=True).first()
+            raise SoldOut(f'{name} is sold out')
+        Reservation.objects.filter(order=order).delete()
+        # The update doesn't send signals
+        changes.publish(Product, product_ids)
+        changes.publish(STORE_STATS, set(Product.objects.filter(
+            id__in=product_ids).values_list('store_id', flat=True)))
+
+
+def sweep(batch_size=None):
+    """Delete the expired holds in batches
+
+    Returns:
+        int: the number of holds deleted
+    """
+    batch_size = batch_size or settings.RESERVATION_SWEEP_BATCH_SIZE
+    deleted = 0
+    while True:
+        expired = list(Reservation.objects.filter(
+            expires_on__lte=timezone.now()).order_by('expires_on').values_list(
+                'id', flat=True)[:batch_size])
+        if not expired:
+            return deleted
+        deleted += Reservation.objects.filter(id__in=expired).delete()[0]
@@ -1,9 +1,17 @@
-from .category_serializer import CategorySerializer
-from .order_serializer import OrderSerializer, UpdateOrderSerializer
+from .category_serializer import CategorySerializer, CategoryChangesSerializer
+from .order_serializer import (
+    OrderSerializer, UpdateOrderSerializer, ArchivedOrderSerializer, OrderHistorySerializer,
+    OrderChangesSerializer)
 from .payment_type_serializer import PaymentTypeSerializer, CreatePaymentType
 from .product_serializer import (
-    ProductSerializer, CreateProductSerializer,
-    AddRemoveRecommendationSerializer, AddProductRatingSerializer)
-from .store_serializer import StoreSerializer, AddStoreSerializer
+    ProductSerializer, ProductPageSerializer, ProductChangesSerializer, CreateProductSerializer,
+    AddRemoveRecommendationSerializer, AddProductRatingSerializer,
+    ImportProductsSerializer, ImportReportSerializer, AvailabilitySerializer,
+    ReviewSerializer, ReviewPageSerializer, SuggestionSerializer)
+from .store_serializer import (
+    StoreSerializer, StoreChangesSerializer, AddStoreSerializer, StoreStatsSerializer)
 from .user_serializer import UserSerializer, CreateUserSerializer
 from .message_serializer import MessageSerializer
+from .batch_serializer import BatchRequestSerializer, BatchResponseSerializer
+from .recommendation_serializer import (
+    RecommendationSerializer, RecommendationPageSerializer, RecommendResultSerializer)
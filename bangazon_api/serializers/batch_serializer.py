@@ -0,0 +1,30 @@
+from django.conf import settings
+from rest_framework import serializers
+
+
+class SubRequestSerializer(serializers.Serializer):
+    method = serializers.ChoiceField(choices=('GET', 'POST', 'PUT', 'DELETE'))
+    path = serializers.CharField()
+    body = serializers.JSONField(required=False)
+
+
+class BatchRequestSerializer(serializers.Serializer):
+    requests = SubRequestSerializer(many=True)
+    parallel = serializers.BooleanField(default=False)
+
+    def validate_requests(self, value):
+        if not value:
+            raise serializers.ValidationError('At least one request is required')
+        if len(value) > settings.BATCH_MAX_REQUESTS:
+            raise serializers.ValidationError(
+                f'At most {settings.BATCH_MAX_REQUESTS} requests can be batched')
+        return value
+
+
+class SubResponseSerializer(serializers.Serializer):
+    status = serializers.IntegerField()
+    body = serializers.JSONField(allow_null=True)
+
+
+class BatchResponseSerializer(serializers.Serializer):
+    responses = SubResponseSerializer(many=True)
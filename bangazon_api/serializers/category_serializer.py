@@ -7,3 +7,10 @@ class CategorySerializer(serializers.ModelSerializer):
         model = Category
         fields = ('id', 'name')
         depth = 1
+
+
+class CategoryChangesSerializer(serializers.Serializer):
+    results = CategorySerializer(many=True)
+    deleted = serializers.ListField(child=serializers.IntegerField())
+    cursor = serializers.IntegerField()
+    more = serializers.BooleanField()
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from bangazon_api.models import Order
+from bangazon_api.models import ArchivedOrder, ArchivedOrderProduct, Order
 from bangazon_api.models.payment_type import PaymentType
 
 
@@ -9,6 +9,33 @@ class OrderSerializer(serializers.ModelSerializer):
         fields = ('id', 'products', 'created_on', 'completed_on', 'total')
         depth = 1
 
+
+class OrderChangesSerializer(serializers.Serializer):
+    results = OrderSerializer(many=True)
+    deleted = serializers.ListField(child=serializers.IntegerField())
+    cursor = serializers.IntegerField()
+    more = serializers.BooleanField()
+
+
+class ArchivedOrderProductSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ArchivedOrderProduct
+        fields = ('product_id', 'name', 'price')
+
+
+class ArchivedOrderSerializer(serializers.ModelSerializer):
+    products = ArchivedOrderProductSerializer(source='items', many=True)
+
+    class Meta:
+        model = ArchivedOrder
+        fields = ('id', 'products', 'created_on', 'completed_on', 'total')
+
+
+class OrderHistorySerializer(serializers.Serializer):
+    results = ArchivedOrderSerializer(many=True)
+    next_cursor = serializers.IntegerField(allow_null=True)
+
+
 class UpdateOrderSerializer(serializers.ModelSerializer):
     paymentTypeId = serializers.IntegerField()
 
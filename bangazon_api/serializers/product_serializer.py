@@ -1,15 +1,62 @@
 from rest_framework import serializers
-from bangazon_api.models import Product
+from django.conf import settings
+from django.contrib.auth.models import User
+from bangazon_api.models import Product, Rating
+from bangazon_api.models.product import SCORES
+from bangazon_api.product_import import FORMATS
+from bangazon_api.thumbnails import variant_urls
 
 
 class ProductSerializer(serializers.ModelSerializer):
+    image_variants = serializers.SerializerMethodField()
+
     class Meta:
         model = Product
         fields = ('id', 'name', 'price', 'description', 'average_rating',
-                  'quantity', 'location', 'image_path', 'category', 'store',
-                  'ratings', 'number_purchased')
+                  'quantity', 'location', 'image_path', 'image_variants',
+                  'category', 'store', 'rating_count', 'rating_histogram',
+                  'number_purchased')
         depth = 1
 
+    def get_image_variants(self, obj):
+        return variant_urls(obj.image_path)
+
+
+class ProductPageSerializer(serializers.Serializer):
+    results = ProductSerializer(many=True)
+    next_cursor = serializers.IntegerField(allow_null=True)
+
+
+class ProductChangesSerializer(serializers.Serializer):
+    results = ProductSerializer(many=True)
+    deleted = serializers.ListField(child=serializers.IntegerField())
+    cursor = serializers.IntegerField()
+    more = serializers.BooleanField()
+
+
+class ReviewerSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = User
+        fields = ('id', 'username', 'first_name', 'last_name')
+
+
+class ReviewSerializer(serializers.ModelSerializer):
+    customer = ReviewerSerializer()
+
+    class Meta:
+        model = Rating
+        fields = ('id', 'score', 'review', 'customer')
+
+
+class ReviewPageSerializer(serializers.Serializer):
+    results = ReviewSerializer(many=True)
+    next_cursor = serializers.CharField(allow_null=True)
+
+
+class SuggestionSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+
 
 class CreateProductSerializer(serializers.Serializer):
     categoryId = serializers.IntegerField()
@@ -21,10 +68,41 @@ class CreateProductSerializer(serializers.Serializer):
     image = serializers.ImageField()
 
 
+class AvailabilitySerializer(serializers.Serializer):
+    quantity = serializers.IntegerField()
+    held = serializers.IntegerField()
+    available = serializers.IntegerField()
+
+
+class ImportProductsSerializer(serializers.Serializer):
+    file = serializers.FileField()
+    format = serializers.ChoiceField(choices=FORMATS, required=False, allow_blank=True)
+
+
+class ImportErrorSerializer(serializers.Serializer):
+    row = serializers.IntegerField()
+    errors = serializers.ListField(child=serializers.CharField())
+
+
+class ImportReportSerializer(serializers.Serializer):
+    created = serializers.IntegerField()
+    updated = serializers.IntegerField()
+    failed = serializers.IntegerField()
+    errors = ImportErrorSerializer(many=True, help_text='The first PRODUCT_IMPORT_MAX_ERRORS failed rows')
+
+
 class AddRemoveRecommendationSerializer(serializers.Serializer):
-    username = serializers.CharField()
+    username = serializers.CharField(required=False, max_length=150)
+    usernames = serializers.ListField(
+        child=serializers.CharField(max_length=150), required=False, allow_empty=False,
+        max_length=settings.RECOMMEND_MAX_USERNAMES)
+
+    def validate(self, attrs):
+        if 'username' not in attrs and 'usernames' not in attrs:
+            raise serializers.ValidationError('Send a username or a list of usernames')
+        return attrs
 
 
 class AddProductRatingSerializer(serializers.Serializer):
-    score = serializers.IntegerField()
-    rating = serializers.CharField()
+    score = serializers.ChoiceField(choices=list(SCORES))
+    review = serializers.CharField()
@@ -0,0 +1,34 @@
+from rest_framework import serializers
+from django.contrib.auth.models import User
+from bangazon_api.models import Product, Recommendation
+
+
+class RecommenderSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = User
+        fields = ('id', 'username', 'first_name', 'last_name')
+
+
+class RecommendedProductSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Product
+        fields = ('id', 'name', 'price', 'image_path')
+
+
+class RecommendationSerializer(serializers.ModelSerializer):
+    recommender = RecommenderSerializer()
+    product = RecommendedProductSerializer()
+
+    class Meta:
+        model = Recommendation
+        fields = ('id', 'recommender', 'product')
+
+
+class RecommendationPageSerializer(serializers.Serializer):
+    results = RecommendationSerializer(many=True)
+    next_cursor = serializers.IntegerField(allow_null=True)
+
+
+class RecommendResultSerializer(serializers.Serializer):
+    recommended = serializers.ListField(child=serializers.CharField())
+    not_found = serializers.ListField(child=serializers.CharField())
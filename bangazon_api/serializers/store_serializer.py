@@ -18,6 +18,25 @@ class StoreSerializer(serializers.ModelSerializer):
         depth = 1
 
 
+class StoreChangesSerializer(serializers.Serializer):
+    results = StoreSerializer(many=True)
+    deleted = serializers.ListField(child=serializers.IntegerField())
+    cursor = serializers.IntegerField()
+    more = serializers.BooleanField()
+
+
+class StoreStatsSerializer(serializers.Serializer):
+    start = serializers.DateField(allow_null=True)
+    end = serializers.DateField(allow_null=True)
+    revenue = serializers.FloatField()
+    units_sold = serializers.IntegerField()
+    orders = serializers.IntegerField()
+    average_rating = serializers.FloatField()
+    rating_count = serializers.IntegerField()
+    product_count = serializers.IntegerField()
+    out_of_stock = serializers.IntegerField()
+
+
 class AddStoreSerializer(serializers.Serializer):
     name = serializers.CharField()
     description = serializers.CharField()
@@ -0,0 +1,65 @@
+"""Model signal receivers, connected in BangazonApiConfig.ready"""
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from bangazon_api import changes, events
+from bangazon_api.models import Category, Order, Product, Rating, Store
+from bangazon_api.store_stats import STORE_STATS
+
+# Models whose rows are kept in the LocalCaches, see bangazon_api/changes.py
+CACHED_MODELS = (Category, Order, Product, Store, Token, User)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def publish_change(sender, instance, **kwargs):
+    if sender in CACHED_MODELS:
+        changes.publish(sender, [instance.pk])
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def product_changed(sender, instance, **kwargs):
+    changes.publish(STORE_STATS, [instance.store_id])
+
+
+@receiver(post_init, sender=Product)
+def remember_counted_in(sender, instance, **kwargs):
+    # Read from __dict__, a deferred field would be loaded by the attribute
+    instance._counted_in = (instance.__dict__.get('category_id'), instance.__dict__.get('store_id'))
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def category_count_changed(sender, instance, signal, created=False, **kwargs):
+    """Publish the categories whose product_count the triggers changed, see bangazon_api/category_counts.py"""
+    counted_in = (instance.category_id, instance.store_id)
+    if signal is post_save and not created and counted_in == instance._counted_in:
+        return
+    changes.publish(Category, {instance.category_id, instance._counted_in[0]} - {None})
+    instance._counted_in = counted_in
+
+
+@receiver(post_save, sender=Product)
+def stock_changed(sender, instance, **kwargs):
+    events.publish_on_commit(
+        events.product_topic(instance.pk), events.product_event(instance.pk, instance.quantity))
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def order_status_changed(sender, instance, signal, **kwargs):
+    events.publish_on_commit(
+        events.user_topic(instance.user_id),
+        events.order_event(instance.pk, instance.completed_on, deleted=signal is post_delete))
+
+
+@receiver(post_save, sender=Rating)
+@receiver(post_delete, sender=Rating)
+def rating_changed(sender, instance, **kwargs):
+    # The product detail lists its ratings
+    changes.publish(Product, [instance.product_id])
+    store_id = Product.objects.filter(pk=instance.product_id).values_list('store_id', flat=True).first()
+    if store_id is not None:
+        changes.publish(STORE_STATS, [store_id])
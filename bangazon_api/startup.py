@@ -0,0 +1,50 @@
+"""Measure how long a fresh worker process takes to start
+
+Both helpers run a new interpreter that sets up Django and loads the
+URLconf, the same work a wsgi worker does before serving its first request.
+"""
+import os
+import subprocess
+import sys
+import time
+
+STARTUP_CODE = (
+    'import django; django.setup(); '
+    'from django.urls import get_resolver; get_resolver().url_patterns'
+)
+
+
+def run_startup(*python_args, env=None):
+    environ = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get(
+        'DJANGO_SETTINGS_MODULE', 'bangazon.settings'))
+    environ.update(env or {})
+    return subprocess.run(
+        [sys.executable, *python_args, '-c', STARTUP_CODE],
+        env=environ, capture_output=True, text=True, check=True)
+
+
+def cold_start(runs=3, env=None):
+    """Get the fastest wall time of starting a worker, in ms"""
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        run_startup(env=env)
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def import_times(env=None):
+    """Import every module of a worker start with -X importtime
+
+    Returns:
+        list: (module, self us, cumulative us) for each imported module
+    """
+    result = run_startup('-X', 'importtime', env=env)
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return modules
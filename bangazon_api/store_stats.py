@@ -0,0 +1,83 @@
+"""Sales, rating and stock figures for a seller's store
+
+Each figure is one aggregate query. The results are cached per store and
+date range until the store's products, ratings or sales change, which is
+published under the STORE_STATS label.
+"""
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db.models import Avg, Count, Q, Sum
+from bangazon_api.changes import LocalCache
+from bangazon_api.models import ArchivedOrderProduct, OrderProduct, Product, Rating
+
+# Event label for changes to the figures of a store, the pk is the store id
+STORE_STATS = 'bangazon_api.store_stats'
+
+stats_cache = LocalCache('store stats', timeout=settings.STORE_STATS_CACHE_TIMEOUT)
+
+
+def parse_range(start, end):
+    """Turn optional YYYY-MM-DD dates into datetimes, end is inclusive
+
+    Raises:
+        ValueError: when a date is not in the YYYY-MM-DD format
+
+    Returns:
+        tuple: the start and the end of the range, either one can be None
+    """
+    start = datetime.combine(datetime.strptime(start, '%Y-%m-%d'), time.min) if start else None
+    end = datetime.strptime(end, '%Y-%m-%d') + timedelta(days=1) if end else None
+    return start, end
+
+
+def completed_between(prefix, start, end):
+    """Filter for orders completed in the range, prefix is the path to the order"""
+    query = Q(**{f'{prefix}completed_on__isnull': False})
+    if start:
+        query &= Q(**{f'{prefix}completed_on__gte': start})
+    if end:
+        query &= Q(**{f'{prefix}completed_on__lt': end})
+    return query
+
+
+def compute(store_id, start=None, end=None):
+    """Compute a store's figures for orders completed in the range
+
+    Returns:
+        dict: sales, ratings and stock of the store
+    """
+    sales = OrderProduct.objects.filter(
+        completed_between('order__', start, end), product__store_id=store_id).aggregate(
+            revenue=Sum('product__price'), units_sold=Count('id'),
+            orders=Count('order', distinct=True))
+    # Orders moved out by archive_orders still count
+    archived = ArchivedOrderProduct.objects.filter(
+        completed_between('order__', start, end), product__store_id=store_id).aggregate(
+            revenue=Sum('price'), units_sold=Count('id'), orders=Count('order', distinct=True))
+    ratings = Rating.objects.filter(product__store_id=store_id).aggregate(
+        average_rating=Avg('score'), rating_count=Count('id'))
+    stock = Product.objects.filter(store_id=store_id).aggregate(
+        product_count=Count('id'), out_of_stock=Count('id', filter=Q(quantity__lte=0)))
+
+    return {
+        'start': start.date() if start else None,
+        'end': (end - timedelta(days=1)).date() if end else None,
+        'revenue': round((sales['revenue'] or 0) + (archived['revenue'] or 0), 2),
+        'units_sold': sales['units_sold'] + archived['units_sold'],
+        'orders': sales['orders'] + archived['orders'],
+        'average_rating': ratings['average_rating'] or 0,
+        'rating_count': ratings['rating_count'],
+        'product_count': stock['product_count'],
+        'out_of_stock': stock['out_of_stock'],
+    }
+
+
+def store_stats(store_id, start=None, end=None):
+    """Get a store's figures from the cache, computing them on a miss"""
+    key = (store_id, start, end)
+    stats = stats_cache.get(key)
+    if stats is None:
+        stats = compute(store_id, start, end)
+        stats_cache.set(key, stats, depends_on=[(STORE_STATS, store_id)])
+    return stats
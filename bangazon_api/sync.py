@@ -0,0 +1,187 @@
+"""Incremental sync of the catalog and orders for downstream systems
+
+Every row of a synced model carries a version taken from one counter
+shared by all of them, and deleting a row leaves a Tombstone with a
+version of its own. A client asks for everything with a version above the
+cursor it saved after its last pull.
+
+Versions are set by SQLite triggers rather than signals, so bulk_create,
+queryset updates and raw SQL are tracked too. A trigger runs inside the
+writing transaction, which holds the database write lock until it commits,
+so rows become visible in version order and a client can't skip past a
+version that commits late.
+
+An archived order is deleted from Order, so it shows up as a delete too,
+see bangazon_api/archive.py.
+
+The triggers are (re)created after every migrate from the current models,
+SQLite drops them when a migration rebuilds a table.
+"""
+from datetime import timedelta
+
+from django.db import connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from bangazon_api.models import Category, Order, OrderProduct, Product, Sequence, Store, Tombstone
+
+SYNCED_MODELS = (Category, Order, Product, Store)
+
+SEQUENCE = 'sync'
+PRUNED_SEQUENCE = 'sync-tombstones-pruned'
+
+# Fields the triggers write, changing only these doesn't make a new version
+TRACKING_FIELDS = ('version', 'updated_at')
+
+
+class CursorExpired(Exception):
+    """The tombstones a client needs were pruned, it has to sync from 0 again"""
+
+
+def trigger_sql(model, quote):
+    """Get the statements that drop and create a model's triggers"""
+    table = quote(model._meta.db_table)
+    name = model._meta.db_table
+    sequences = quote(Sequence._meta.db_table)
+    tombstones = quote(Tombstone._meta.db_table)
+    now = "strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime')"
+    version = f"(SELECT value FROM {sequences} WHERE name = '{SEQUENCE}')"
+    next_version = (
+        f"INSERT INTO {sequences} (name, value) VALUES ('{SEQUENCE}', 1) "
+        "ON CONFLICT (name) DO UPDATE SET value = value + 1;")
+    set_version = (
+        f'UPDATE {table} SET version = {version}, updated_at = {now} WHERE id = NEW.id;')
+
+    content = [
+        quote(field.column) for field in model._meta.concrete_fields
+        if not field.primary_key and field.name not in TRACKING_FIELDS
+    ]
+    # A save that rewrites an old version is bumped too, the row may have changed since it was read
+    changed = ' OR '.join(
+        [f'OLD.{column} IS NOT NEW.{column}' for column in content]
+        + ['OLD.version IS NOT NEW.version'])
+
+    user_id = 'OLD.user_id' if model is Order else 'NULL'
+    return [
+        f'DROP TRIGGER IF EXISTS {name}_sync_insert',
+        f'DROP TRIGGER IF EXISTS {name}_sync_update',
+        f'DROP TRIGGER IF EXISTS {name}_sync_delete',
+        f'CREATE TRIGGER {name}_sync_insert AFTER INSERT ON {table} '
+        f'BEGIN {next_version} {set_version} END',
+        f'CREATE TRIGGER {name}_sync_update AFTER UPDATE ON {table} WHEN {changed} '
+        f'BEGIN {next_version} {set_version} END',
+        f'CREATE TRIGGER {name}_sync_delete AFTER DELETE ON {table} '
+        f'BEGIN {next_version} '
+        f'INSERT INTO {tombstones} (model, object_id, user_id, version, deleted_at) '
+        f"VALUES ('{model._meta.label_lower}', OLD.id, {user_id}, {version}, {now}); END",
+    ]
+
+
+def line_trigger_sql(quote):
+    """Get the statements that drop and create the triggers giving an order a new version when its lines change
+
+    The order feed includes the products, but the cart only writes OrderProduct rows.
+    """
+    table = quote(OrderProduct._meta.db_table)
+    name = OrderProduct._meta.db_table
+    orders = quote(Order._meta.db_table)
+
+    def touch(row):
+        # -1 is a version no row has, the order's update trigger replaces it with the next one
+        return f'UPDATE {orders} SET version = -1 WHERE id = {row}.order_id;'
+
+    return [
+        f'DROP TRIGGER IF EXISTS {name}_sync_insert',
+        f'DROP TRIGGER IF EXISTS {name}_sync_update',
+        f'DROP TRIGGER IF EXISTS {name}_sync_delete',
+        f'CREATE TRIGGER {name}_sync_insert AFTER INSERT ON {table} BEGIN {touch("NEW")} END',
+        f'CREATE TRIGGER {name}_sync_update AFTER UPDATE ON {table} '
+        f'BEGIN {touch("OLD")} {touch("NEW")} END',
+        f'CREATE TRIGGER {name}_sync_delete AFTER DELETE ON {table} BEGIN {touch("OLD")} END',
+    ]
+
+
+def install_triggers(using='default', **kwargs):
+    """Create the version triggers, connected to post_migrate"""
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        tables = connection.introspection.table_names(cursor)
+        for model in SYNCED_MODELS:
+            if model._meta.db_table not in tables:
+                continue
+            columns = {
+                column.name for column in
+                connection.introspection.get_table_description(cursor, model._meta.db_table)}
+            if 'version' not in columns:
+                # Migrating backwards past the sync fields
+                continue
+            for sql in trigger_sql(model, connection.ops.quote_name):
+                cursor.execute(sql)
+            if model is Order and OrderProduct._meta.db_table in tables:
+                for sql in line_trigger_sql(connection.ops.quote_name):
+                    cursor.execute(sql)
+
+
+def changed_since(queryset, since, limit, user_id=None):
+    """Get the rows changed and deleted after a version, oldest change first
+
+    Args:
+        queryset (QuerySet): the rows the client may see, of one of the SYNCED_MODELS
+        since (int): the cursor of the last pull, 0 for a full sync
+        limit (int): most changes returned
+        user_id (int): only return the tombstones of this user's rows
+
+    Raises:
+        CursorExpired: when tombstones after the cursor were pruned
+
+    Returns:
+        dict: the changed rows, the deleted ids, the cursor to pull from next
+        and whether there are more changes after it
+    """
+    if since and since < pruned_version():
+        raise CursorExpired()
+
+    changes = [
+        (row.version, row, None)
+        for row in queryset.filter(version__gt=since).order_by('version')[:limit + 1]
+    ]
+    if since:
+        # A full sync has nothing to delete
+        tombstones = Tombstone.objects.filter(
+            model=queryset.model._meta.label_lower, version__gt=since)
+        if user_id is not None:
+            tombstones = tombstones.filter(user_id=user_id)
+        changes.extend(
+            (version, None, object_id) for version, object_id in
+            tombstones.order_by('version').values_list('version', 'object_id')[:limit + 1])
+    changes.sort(key=lambda change: change[0])
+
+    page = changes[:limit]
+    return {
+        'results': [row for _, row, _ in page if row is not None],
+        'deleted': [object_id for _, _, object_id in page if object_id is not None],
+        'cursor': page[-1][0] if page else since,
+        'more': len(changes) > limit,
+    }
+
+
+def pruned_version():
+    return Sequence.objects.filter(name=PRUNED_SEQUENCE).values_list('value', flat=True).first() or 0
+
+
+def prune(ttl):
+    """Delete the tombstones older than ttl seconds
+
+    Returns:
+        int: the number of tombstones deleted
+    """
+    expired = Tombstone.objects.filter(deleted_at__lt=timezone.now() - timedelta(seconds=ttl))
+    last_version = expired.aggregate(last_version=Max('version'))['last_version']
+    if last_version is None:
+        return 0
+    with transaction.atomic():
+        # Clients whose cursor is older than this may have missed a delete
+        Sequence.objects.update_or_create(
+            name=PRUNED_SEQUENCE, defaults={'value': max(last_version, pruned_version())})
+        deleted, _ = Tombstone.objects.filter(version__lte=last_version).delete()
+    return deleted
@@ -0,0 +1,165 @@
+"""A small task queue stored in the app's own database
+
+Views call `enqueue` to defer follow up work, the `run_tasks` management
+command claims and runs the tasks in worker processes. Tasks with a key are
+coalesced: while a task with that key is still pending a second enqueue is
+a no-op.
+"""
+import logging
+import random
+import socket
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from bangazon_api.models import Task
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+
+def task(name):
+    """Register a function as the handler for a task name
+
+    The handler is called with the task's payload as keyword arguments and
+    should be safe to run more than once.
+    """
+    def decorator(func):
+        registry[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, key=None, delay=0, **payload):
+    """Add a task to the queue
+
+    Args:
+        name (string): the registered task name
+        key (string): optional idempotency key, ex. product-rating:12
+        delay (int): seconds to wait before the task can run
+
+    Returns:
+        Task: the new task, or the pending task that already had the key
+    """
+    run_at = timezone.now() + timedelta(seconds=delay)
+    try:
+        with transaction.atomic():
+            return Task.objects.create(name=name, key=key, payload=payload, run_at=run_at)
+    except IntegrityError:
+        return Task.objects.filter(key=key, status=Task.PENDING).first()
+
+
+def enqueue_many(name, payloads, key=None):
+    """Add one task per payload with a single insert
+
+    Args:
+        name (string): the registered task name
+        payloads (list): the payload of each task
+        key (callable): optional, gets a payload and returns its idempotency key
+
+    A payload whose key already has a pending task is skipped.
+    """
+    run_at = timezone.now()
+    Task.objects.bulk_create([
+        Task(name=name, key=key(payload) if key else None, payload=payload, run_at=run_at)
+        for payload in payloads
+    ], ignore_conflicts=True)
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def claim(worker):
+    """Lock the next runnable task for a worker
+
+    The status check in the update makes the claim safe when several worker
+    processes race for the same row.
+
+    Returns:
+        Task: the claimed task or None when nothing is ready
+    """
+    while True:
+        now = timezone.now()
+        task_id = Task.objects.filter(
+            status=Task.PENDING, run_at__lte=now
+        ).order_by('run_at', 'id').values_list('id', flat=True).first()
+        if task_id is None:
+            return None
+
+        claimed = Task.objects.filter(pk=task_id, status=Task.PENDING).update(
+            status=Task.RUNNING, locked_by=worker, locked_at=now,
+            attempts=F('attempts') + 1)
+        if claimed:
+            return Task.objects.get(pk=task_id)
+
+
+def backoff(attempts):
+    """Seconds to wait before retrying, doubling with every attempt"""
+    delay = min(settings.TASK_RETRY_BACKOFF * 2 ** (attempts - 1),
+                settings.TASK_RETRY_BACKOFF_MAX)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def run(claimed):
+    """Run a claimed task, then delete it or schedule its retry"""
+    try:
+        handler = registry[claimed.name]
+        handler(**claimed.payload)
+    except Exception as ex:
+        logger.exception('Task %s failed', claimed)
+        fail(claimed, f'{type(ex).__name__}: {ex}')
+        return False
+
+    claimed.delete()
+    return True
+
+
+def fail(claimed, error):
+    if claimed.attempts >= settings.TASK_MAX_ATTEMPTS:
+        Task.objects.filter(pk=claimed.pk).update(
+            status=Task.FAILED, last_error=error, locked_by=None, locked_at=None)
+        return
+
+    run_at = timezone.now() + timedelta(seconds=backoff(claimed.attempts))
+    try:
+        with transaction.atomic():
+            Task.objects.filter(pk=claimed.pk).update(
+                status=Task.PENDING, run_at=run_at, last_error=error,
+                locked_by=None, locked_at=None)
+    except IntegrityError:
+        # A newer task with the same key is already pending and covers this one
+        Task.objects.filter(pk=claimed.pk).delete()
+
+
+def release_stale():
+    """Put tasks back in the queue when their worker died while running them"""
+    cutoff = timezone.now() - timedelta(seconds=settings.TASK_LOCK_TIMEOUT)
+    stale = Task.objects.filter(status=Task.RUNNING, locked_at__lt=cutoff)
+    released = 0
+    for stale_task in stale:
+        fail(stale_task, 'Worker did not finish the task')
+        released += 1
+    return released
+
+
+def run_pending(worker=None, limit=None):
+    """Run ready tasks until the queue is empty or the limit is hit
+
+    Returns:
+        int: the number of tasks that were run
+    """
+    worker = worker or worker_name()
+    count = 0
+    while limit is None or count < limit:
+        claimed = claim(worker)
+        if claimed is None:
+            break
+        run(claimed)
+        count += 1
+    return count
@@ -0,0 +1,93 @@
+"""Deferred work run by the task queue workers
+
+Loaded from BangazonApiConfig.ready so every worker process has the
+handlers registered.
+"""
+from django.db.models import Count, Q, Sum
+from django.conf import settings
+from bangazon_api import changes, feed, idempotency, reservations, sync
+from bangazon_api.models import OrderProduct, Product
+from bangazon_api.models.product import SCORES
+from bangazon_api.task_queue import enqueue, task
+
+
+@task('products.refresh_rating')
+def refresh_rating(product_id):
+    """Recompute the stored rating totals behind Product.average_rating and rating_histogram"""
+    refresh_rating_totals(Product.objects.filter(pk=product_id))
+
+
+@task('orders.refresh_sales')
+def refresh_sales(order_id):
+    """Recompute Product.number_purchased for every product on a completed order"""
+    product_ids = OrderProduct.objects.filter(
+        order_id=order_id).values_list('product_id', flat=True)
+    refresh_purchase_counts(Product.objects.filter(pk__in=list(product_ids)))
+
+
+@task('feed.fan_out')
+def fan_out(product_id, store_id):
+    """Push a new product into the feeds of its store's followers"""
+    feed.fan_out(product_id, store_id)
+
+
+@task('reservations.sweep')
+def sweep_reservations():
+    """Delete the expired cart holds, then schedule the next sweep"""
+    reservations.sweep()
+    schedule_sweep(settings.RESERVATION_SWEEP_INTERVAL)
+
+
+def schedule_sweep(delay=0):
+    enqueue('reservations.sweep', key='reservations-sweep', delay=delay)
+
+
+@task('sync.prune')
+def prune_tombstones():
+    """Delete the old tombstones of the change feeds, then schedule the next prune"""
+    sync.prune(settings.SYNC_TOMBSTONE_TTL)
+    schedule_prune(settings.SYNC_PRUNE_INTERVAL)
+
+
+def schedule_prune(delay=0):
+    enqueue('sync.prune', key='sync-prune', delay=delay)
+
+
+@task('idempotency.prune')
+def prune_idempotency_keys():
+    """Delete the expired Idempotency-Key responses, then schedule the next prune"""
+    idempotency.prune()
+    schedule_idempotency_prune(settings.IDEMPOTENCY_PRUNE_INTERVAL)
+
+
+def schedule_idempotency_prune(delay=0):
+    enqueue('idempotency.prune', key='idempotency-prune', delay=delay)
+
+
+def refresh_rating_totals(products):
+    scores = {
+        f'score_{score}': Count('ratings', filter=Q(ratings__score=score)) for score in SCORES}
+    products = products.annotate(count=Count('ratings'), total=Sum('ratings__score'), **scores)
+    updated = []
+    for product in products:
+        product.rating_count = product.count
+        product.rating_sum = product.total or 0
+        for score in SCORES:
+            setattr(product, f'rating_count_{score}', getattr(product, f'score_{score}'))
+        updated.append(product)
+    fields = ['rating_count', 'rating_sum'] + [f'rating_count_{score}' for score in SCORES]
+    Product.objects.bulk_update(updated, fields, batch_size=500)
+    changes.publish(Product, [product.pk for product in updated])
+
+
+def refresh_purchase_counts(products):
+    # Archived orders were all completed, they still count as sales
+    products = products.annotate(
+        completed=Count('orders', filter=Q(orders__payment_type__isnull=False), distinct=True),
+        archived=Count('archived_order_items', distinct=True))
+    updated = []
+    for product in products:
+        product.purchase_count = product.completed + product.archived
+        updated.append(product)
+    Product.objects.bulk_update(updated, ['purchase_count'], batch_size=500)
+    changes.publish(Product, [product.pk for product in updated])
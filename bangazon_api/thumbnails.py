@@ -0,0 +1,139 @@
+"""Resized variants of uploaded product images
+
+Originals are stored as uploaded, the resized copies are rendered in a
+process pool so the request that uploaded the image never waits on Pillow.
+
+A variant's name includes a hash of its size, format and quality, so new
+render settings give new urls instead of changing the files browsers cached.
+"""
+import hashlib
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import PurePosixPath
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image
+
+VARIANT_DIR = 'variants'
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def variant_name(name, variant):
+    """Get the storage name of a resized variant
+
+    Args:
+        name (string): storage name of the original, ex. products/shoe.png
+        variant (string): one of the keys in settings.THUMBNAIL_VARIANTS
+
+    Returns:
+        string: ex. products/variants/shoe-thumbnail-1f2e3d4c.jpg
+    """
+    return variant_name_for(
+        name, variant, settings.THUMBNAIL_VARIANTS[variant], settings.THUMBNAIL_FORMAT,
+        settings.THUMBNAIL_QUALITY)
+
+
+def variant_urls(image):
+    """Get the urls of every variant for an image field
+
+    Returns:
+        dict: variant name to url, empty when the product has no image
+    """
+    if not image:
+        return {}
+    urls = {'original': image.url}
+    for variant in settings.THUMBNAIL_VARIANTS:
+        urls[variant] = default_storage.url(variant_name(image.name, variant))
+    return urls
+
+
+def render_variants(media_root, name, variants, image_format, quality, force=False):
+    """Render the resized copies of one image
+
+    Runs inside the worker processes so it only deals with plain paths and
+    never touches the database or the Django settings.
+
+    Returns:
+        list: the storage names that were written
+    """
+    source = os.path.join(media_root, name)
+    written = []
+    with Image.open(source) as original:
+        original.load()
+        if original.mode not in ('RGB', 'L'):
+            original = original.convert('RGB')
+        for variant, size in variants.items():
+            target_name = variant_name_for(name, variant, size, image_format, quality)
+            target = os.path.join(media_root, target_name)
+            if not force and os.path.exists(target):
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            resized = original.copy()
+            resized.thumbnail(size, Image.LANCZOS)
+            resized.save(target, image_format, quality=quality,
+                         optimize=True, progressive=True)
+            written.append(target_name)
+    return written
+
+
+def variant_name_for(name, variant, size, image_format, quality):
+    """Same as variant_name without reading the settings, for the worker processes"""
+    path = PurePosixPath(name)
+    extension = image_format.lower().replace('jpeg', 'jpg')
+    digest = hashlib.sha1(f'{size[0]}x{size[1]} {image_format} {quality}'.encode()).hexdigest()[:8]
+    return str(path.parent / VARIANT_DIR / f'{path.stem}-{variant}-{digest}.{extension}')
+
+
+def is_variant(name):
+    """Check whether a storage name is a rendered variant rather than an original"""
+    return PurePosixPath(name).parent.name == VARIANT_DIR
+
+
+def get_executor():
+    """Lazily start the process pool shared by every request in this process"""
+    global _executor  # pylint: disable=global-statement
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=settings.THUMBNAIL_WORKERS)
+    return _executor
+
+
+def render_args(name, force=False):
+    return (
+        str(settings.MEDIA_ROOT), name, settings.THUMBNAIL_VARIANTS,
+        settings.THUMBNAIL_FORMAT, settings.THUMBNAIL_QUALITY, force
+    )
+
+
+def schedule_variants(product):
+    """Queue the variants for a product's image once the transaction commits
+
+    With THUMBNAIL_WORKERS set to 0 the variants are rendered inline, which
+    is what the tests and the backfill command use.
+    """
+    if not product.image_path:
+        return
+
+    name = product.image_path.name
+
+    def submit():
+        if settings.THUMBNAIL_WORKERS:
+            future = get_executor().submit(render_variants, *render_args(name))
+            future.add_done_callback(lambda future: log_failure(name, future))
+        else:
+            render_variants(*render_args(name))
+
+    transaction.on_commit(submit)
+
+
+def log_failure(name, future):
+    """Log a render that failed in the pool, generate_thumbnails renders the missing variants again"""
+    if future.cancelled():
+        logger.warning('Rendering the variants of %s was cancelled', name)
+    elif future.exception() is not None:
+        logger.error('Rendering the variants of %s failed', name, exc_info=future.exception())
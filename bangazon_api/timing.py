@@ -0,0 +1,111 @@
+"""Timers shared by the profiling and request timing middleware"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_current = ContextVar('request_timings', default=None)
+
+
+class QueryTimer:
+    """Database execute wrapper that adds up the time spent in SQL
+
+    Use with connection.execute_wrapper(timer)
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.count += 1
+
+    @property
+    def ms(self):
+        return self.seconds * 1000
+
+
+class RequestTimings:
+    """Time spent in each phase of a request
+
+    auth and render are measured around the authentication class and the
+    renderer. serialize is the time between them, the view running its
+    serializers, without the SQL it ran.
+    """
+
+    def __init__(self):
+        self.queries = QueryTimer()
+        self.phases = {}
+        self.view_start = None
+        self.view_end = None
+
+    def checkpoint(self):
+        return time.perf_counter(), self.queries.seconds
+
+    def add(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    @property
+    def durations_ms(self):
+        """Get the phases in ms, in the order they ran"""
+        durations = {}
+        if 'auth' in self.phases:
+            durations['auth'] = self.phases['auth'] * 1000
+        durations['db'] = self.queries.ms
+        if self.view_start and self.view_end:
+            (start, start_sql), (end, end_sql) = self.view_start, self.view_end
+            durations['serialize'] = max((end - start) - (end_sql - start_sql), 0) * 1000
+        if 'render' in self.phases:
+            durations['render'] = self.phases['render'] * 1000
+        return durations
+
+
+def start_request():
+    """Start timing the current request
+
+    Returns:
+        tuple: the RequestTimings and the token to pass to end_request
+    """
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+@contextmanager
+def measure(phase):
+    """Add the time spent in the block to a phase of the current request"""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+
+    if phase == 'render' and timings.view_end is None:
+        timings.view_end = timings.checkpoint()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(phase, time.perf_counter() - start)
+        if phase == 'auth':
+            timings.view_start = timings.checkpoint()
+
+
+def view_name(view_func, method):
+    """Name a resolved view for logs and profiles
+
+    Returns:
+        string: ex. ProductView.list for a viewset action, register_user for a function view
+    """
+    cls = getattr(view_func, 'cls', None)
+    if cls is None:
+        return getattr(view_func, '__name__', 'unknown')
+    actions = getattr(view_func, 'actions', None) or {}
+    action = actions.get(method.lower(), method.lower())
+    return f'{cls.__name__}.{action}'
@@ -14,5 +14,6 @@ router.register(r'profile', views.ProfileView, 'profile')
 urlpatterns = [
     path('', include(router.urls)),
     path('login', auth_token_views.obtain_auth_token),
-    path('register', views.register_user)
+    path('register', views.register_user),
+    path('batch', views.batch),
 ]
@@ -5,3 +5,5 @@ from .product_view import ProductView
 from .store_view import StoreView
 from .auth import register_user
 from .profile_view import ProfileView
+from .media_view import serve_media
+from .batch_view import batch
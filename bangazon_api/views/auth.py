@@ -4,8 +4,7 @@ from rest_framework.authtoken.serializers import AuthTokenSerializer
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
-from drf_yasg.utils import swagger_auto_schema
-from drf_yasg import openapi
+from bangazon_api.docs import swagger_auto_schema, openapi
 
 from bangazon_api.serializers import CreateUserSerializer
 
@@ -0,0 +1,32 @@
+from rest_framework import status
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+from bangazon_api.batch import run_batch
+from bangazon_api.docs import swagger_auto_schema, openapi
+from bangazon_api.serializers import (
+    BatchRequestSerializer, BatchResponseSerializer, MessageSerializer)
+
+
+@swagger_auto_schema(method='POST', request_body=BatchRequestSerializer, responses={
+    200: openapi.Response(
+        description="The status and body of each request, in order",
+        schema=BatchResponseSerializer()
+    ),
+    400: openapi.Response(
+        description="The list of requests is invalid",
+        schema=MessageSerializer()
+    ),
+})
+@api_view(['POST'])
+def batch(request):
+    '''Run several api requests in one round trip
+
+    Set parallel to run consecutive GET requests at the same time.
+    '''
+    serializer = BatchRequestSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response({'message': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+    responses = run_batch(
+        request, serializer.validated_data['requests'], serializer.validated_data['parallel'])
+    return Response({'responses': responses})
@@ -1,21 +1,95 @@
 from rest_framework.viewsets import ViewSet
 from rest_framework.response import Response
-from drf_yasg.utils import swagger_auto_schema
-from drf_yasg import openapi
+from rest_framework import status
+from rest_framework.decorators import action
+from bangazon_api.docs import swagger_auto_schema, openapi
+from bangazon_api.catalog import category_counts, category_list
 from bangazon_api.models import Category
-from bangazon_api.serializers import CategorySerializer
+from bangazon_api.pagination import since_params
+from bangazon_api.serializers import CategorySerializer, CategoryChangesSerializer, MessageSerializer
+from bangazon_api.sync import CursorExpired, changed_since
 
 
 class CategoryView(ViewSet):
-    @swagger_auto_schema(responses={
-        200: openapi.Response(
-            description="The list of categories",
-            schema=CategorySerializer(many=True)
-        )
-    })
+    @swagger_auto_schema(
+        responses={
+            200: openapi.Response(
+                description="The list of categories. With counts each also has parent_id, "
+                            "product_count and total_count, which adds the subcategories, "
+                            "as a tree the top level ones have their subcategories in children",
+                schema=CategorySerializer(many=True)
+            )
+        },
+        manual_parameters=[
+            openapi.Parameter(
+                "counts",
+                openapi.IN_QUERY,
+                required=False,
+                type=openapi.TYPE_BOOLEAN,
+                description="Add the parent and the number of products of active stores"
+            ),
+            openapi.Parameter(
+                "tree",
+                openapi.IN_QUERY,
+                required=False,
+                type=openapi.TYPE_BOOLEAN,
+                description="Nest the subcategories under their parent, with the counts"
+            ),
+        ]
+    )
     def list(self, request):
         """Get a list of categories
         """
-        categories = Category.objects.all()
-        serializer = CategorySerializer(categories, many=True)
-        return Response(serializer.data)
+        tree = request.query_params.get('tree') in ('true', '1')
+        if tree or request.query_params.get('counts') in ('true', '1'):
+            return Response(category_counts(tree=tree))
+        return Response(category_list())
+
+    @swagger_auto_schema(
+        method='GET',
+        responses={
+            200: openapi.Response(
+                description="The categories changed or deleted since the cursor, oldest change first",
+                schema=CategoryChangesSerializer()
+            ),
+            400: openapi.Response(
+                description="since or limit is not a number",
+                schema=MessageSerializer()
+            ),
+            410: openapi.Response(
+                description="Deletes after the cursor are no longer kept, sync from 0 again",
+                schema=MessageSerializer()
+            ),
+        },
+        manual_parameters=[
+            openapi.Parameter(
+                "since",
+                openapi.IN_QUERY,
+                required=False,
+                type=openapi.TYPE_INTEGER,
+                description="The cursor of the last pull, 0 or none for every category"
+            ),
+            openapi.Parameter(
+                "limit",
+                openapi.IN_QUERY,
+                required=False,
+                type=openapi.TYPE_INTEGER,
+                description="Most changes returned"
+            ),
+        ]
+    )
+    @action(methods=['get'], detail=False)
+    def changes(self, request):
+        """Get the categories changed since a cursor, for incremental syncs"""
+        try:
+            since, limit = since_params(request)
+            page = changed_since(Category.objects.all(), since, limit)
+        except ValueError:
+            return Response({'message': 'since and limit must be numbers'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        except CursorExpired:
+            return Response({'message': 'The cursor is too old, sync again from 0'},
+                            status=status.HTTP_410_GONE)
+
+        page['results'] = CategorySerializer(page['results'], many=True).data
+        return Response(page)
@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.views.static import serve
+
+from bangazon_api.thumbnails import is_variant
+
+
+def serve_media(request, path):
+    """Serve an uploaded image for development, in production the web server serves MEDIA_ROOT
+
+    Variants are never rewritten under the same name so browsers can keep
+    them, originals revalidate with their Last-Modified date.
+    """
+    response = serve(request, path, document_root=settings.MEDIA_ROOT)
+    if is_variant(path):
+        response['Cache-Control'] = f'public, max-age={settings.MEDIA_CACHE_MAX_AGE}, immutable'
+    else:
+        response['Cache-Control'] = 'public, no-cache'
+    return response
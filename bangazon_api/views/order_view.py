@@ -1,14 +1,22 @@
 from datetime import datetime
+from django.db import transaction
 from rest_framework.viewsets import ViewSet
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.decorators import action
-from drf_yasg.utils import swagger_auto_schema
-from drf_yasg import openapi
+from bangazon_api.docs import swagger_auto_schema, openapi
+from bangazon_api.idempotency import idempotent
 
-from bangazon_api.models import Order, PaymentType
-from bangazon_api.serializers import OrderSerializer, UpdateOrderSerializer
+from bangazon_api.cart import open_order_id
+from bangazon_api.models import ArchivedOrder, Order, PaymentType
+from bangazon_api.pagination import page_params, paginate, since_params
+from bangazon_api.reservations import SoldOut, checkout
+from bangazon_api.serializers import (
+    ArchivedOrderSerializer, OrderChangesSerializer, OrderHistorySerializer, OrderSerializer,
+    UpdateOrderSerializer)
 from bangazon_api.serializers.message_serializer import MessageSerializer
+from bangazon_api.sync import CursorExpired, changed_since
+from bangazon_api.task_queue import enqueue
 
 
 class OrderView(ViewSet):
@@ -54,8 +62,14 @@ class OrderView(ViewSet):
             description="Either the order or payment type was not found",
             schema=MessageSerializer()
         ),
+        409: openapi.Response(
+            description="The order is already completed, or a product on it sold out "
+                        "after its hold expired",
+            schema=MessageSerializer()
+        ),
     })
     @action(methods=['put'], detail=True)
+    @idempotent
     def complete(self, request, pk):
         """Complete an order by adding a payment type and completed data
         """
@@ -63,12 +77,25 @@ class OrderView(ViewSet):
             order = Order.objects.get(pk=pk, user=request.auth.user)
             payment_type = PaymentType.objects.get(
                 pk=request.data['paymentTypeId'], customer=request.auth.user)
-            order.payment_type = payment_type
-            order.completed_on = datetime.now()
-            order.save()
+            with transaction.atomic():
+                # Claiming the open order first makes a repeated or concurrent
+                # complete wait for this one and then find it completed
+                completed_on = datetime.now()
+                if not Order.objects.filter(pk=order.pk, completed_on=None).update(
+                        completed_on=completed_on):
+                    return Response({'message': 'The order is already completed'},
+                                    status=status.HTTP_409_CONFLICT)
+                checkout(order)
+                order.payment_type = payment_type
+                order.completed_on = completed_on
+                order.save()
+            enqueue('orders.refresh_sales', key=f'order-sales:{order.id}',
+                    order_id=order.id)
             return Response({'message': "Order Completed"})
         except (Order.DoesNotExist, PaymentType.DoesNotExist) as ex:
             return Response({'message': ex.args[0]}, status=status.HTTP_404_NOT_FOUND)
+        except SoldOut as ex:
+            return Response({'message': ex.args[0]}, status=status.HTTP_409_CONFLICT)
 
     @swagger_auto_schema(
         method='get',
@@ -87,8 +114,7 @@ class OrderView(ViewSet):
     def current(self, request):
         """Get the user's current order"""
         try:
-            order = Order.objects.get(
-                completed_on=None, user=request.auth.user)
+            order = Order.objects.get(pk=open_order_id(request.auth.user))
             serializer = OrderSerializer(order)
             return Response(serializer.data)
         except Order.DoesNotExist:
@@ -96,3 +122,97 @@ class OrderView(ViewSet):
                 'message': 'You do not have an open order. Add a product to the cart to get started'},
                 status=status.HTTP_404_NOT_FOUND
             )
+
+    @swagger_auto_schema(
+        method='get',
+        responses={
+            200: openapi.Response(
+                description="A page of the user's archived orders, newest first",
+                schema=OrderHistorySerializer()
+            ),
+            400: openapi.Response(
+                description="The cursor or limit is not a number",
+                schema=MessageSerializer()
+            ),
+        },
+        manual_parameters=[
+            openapi.Parameter(
+                "cursor",
+                openapi.IN_QUERY,
+                required=False,
+                type=openapi.TYPE_INTEGER,
+                description="The next_cursor of the previous page"
+            ),
+            openapi.Parameter(
+                "limit",
+                openapi.IN_QUERY,
+                required=False,
+                type=openapi.TYPE_INTEGER,
+                description="Number of orders per page"
+            ),
+        ]
+    )
+    @action(methods=['get'], detail=False)
+    def history(self, request):
+        """Get the user's archived orders, see the archive_orders command"""
+        try:
+            cursor, limit = page_params(request)
+        except ValueError:
+            return Response({'message': 'cursor and limit must be numbers'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        orders = ArchivedOrder.objects.filter(
+            user=request.auth.user).prefetch_related('items')
+        page, next_cursor = paginate(orders, cursor, limit)
+        serializer = ArchivedOrderSerializer(page, many=True)
+        return Response({'results': serializer.data, 'next_cursor': next_cursor})
+
+    @swagger_auto_schema(
+        method='GET',
+        responses={
+            200: openapi.Response(
+                description="The user's orders changed or deleted since the cursor, oldest change first",
+                schema=OrderChangesSerializer()
+            ),
+            400: openapi.Response(
+                description="since or limit is not a number",
+                schema=MessageSerializer()
+            ),
+            410: openapi.Response(
+                description="Deletes after the cursor are no longer kept, sync from 0 again",
+                schema=MessageSerializer()
+            ),
+        },
+        manual_parameters=[
+            openapi.Parameter(
+                "since",
+                openapi.IN_QUERY,
+                required=False,
+                type=openapi.TYPE_INTEGER,
+                description="The cursor of the last pull, 0 or none for every order"
+            ),
+            openapi.Parameter(
+                "limit",
+                openapi.IN_QUERY,
+                required=False,
+                type=openapi.TYPE_INTEGER,
+                description="Most changes returned"
+            ),
+        ]
+    )
+    @action(methods=['get'], detail=False)
+    def changes(self, request):
+        """Get the current user's orders changed since a cursor, for incremental syncs"""
+        try:
+            since, limit = since_params(request)
+            orders = Order.objects.filter(user=request.auth.user).prefetch_related('products')
+            page = changed_since(orders, since, limit, user_id=request.auth.user.id)
+        except ValueError:
+            return Response({'message': 'since and limit must be numbers'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        except CursorExpired:
+            return Response({'message': 'The cursor is too old, sync again from 0'},
+                            status=status.HTTP_410_GONE)
+
+        page['results'] = OrderSerializer(page['results'], many=True).data
+        return Response(page)
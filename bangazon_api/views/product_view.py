@@ -1,17 +1,33 @@
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.db import transaction
 from django.db.models import Count
 from rest_framework.viewsets import ViewSet
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError
-from drf_yasg.utils import swagger_auto_schema
-from drf_yasg import openapi
+from bangazon_api.docs import swagger_auto_schema, openapi
+from bangazon_api.idempotency import idempotent
+from bangazon_api.autocomplete import SORTS as AUTOCOMPLETE_SORTS, index as name_index
 from bangazon_api.helpers import STATE_NAMES
-from bangazon_api.models import Product, Store, Category, Order, Rating, Recommendation
+from bangazon_api.cart import open_order_id
+from bangazon_api.catalog import product_detail
+from bangazon_api.feed import read_feed
+from bangazon_api.pagination import page_params, since_params
+from bangazon_api.models import (
+    Product, Store, Category, Order, OrderProduct, Recommendation)
+from bangazon_api.product_import import ProductImporter, detect_format, read_rows
+from bangazon_api.ratings import SORTS as REVIEW_SORTS, rate, read_reviews
+from bangazon_api.reservations import SoldOut, held_quantity, release, reserve
 from bangazon_api.serializers import (
-    ProductSerializer, CreateProductSerializer, MessageSerializer,
-    AddProductRatingSerializer, AddRemoveRecommendationSerializer)
+    ProductSerializer, ProductPageSerializer, ProductChangesSerializer, CreateProductSerializer,
+    MessageSerializer, AddProductRatingSerializer, AddRemoveRecommendationSerializer,
+    ImportProductsSerializer, ImportReportSerializer, RecommendResultSerializer,
+    AvailabilitySerializer, ReviewSerializer, ReviewPageSerializer, SuggestionSerializer)
+from bangazon_api.sync import CursorExpired, changed_since
+from bangazon_api.task_queue import enqueue
+from bangazon_api.thumbnails import schedule_variants
 
 
 class ProductView(ViewSet):
@@ -28,6 +44,7 @@ class ProductView(ViewSet):
             )
         }
     )
+    @idempotent
     def create(self, request):
         """Create a new product for the current user's store"""
         store = Store.objects.get(seller=request.auth.user)
@@ -40,8 +57,12 @@ class ProductView(ViewSet):
                 description=request.data['description'],
                 quantity=request.data['quantity'],
                 location=request.data['location'],
+                image_path=request.FILES.get('image'),
                 category=category
             )
+            schedule_variants(product)
+            enqueue('feed.fan_out', key=f'feed-fan-out:{product.id}',
+                    product_id=product.id, store_id=store.id)
             serializer = ProductSerializer(product)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         except ValidationError as ex:
@@ -76,7 +97,11 @@ class ProductView(ViewSet):
             product.quantity = request.data['quantity']
             product.location = request.data['location']
             product.category = category
+            if 'image' in request.FILES:
+                product.image_path = request.FILES['image']
             product.save()
+            if 'image' in request.FILES:
+                schedule_variants(product)
             return Response(None, status=status.HTTP_204_NO_CONTENT)
         except ValidationError as ex:
             return Response({'message': ex.args[0]}, status=status.HTTP_400_BAD_REQUEST)
@@ -185,6 +210,149 @@ class ProductView(ViewSet):
         serializer = ProductSerializer(products, many=True)
         return Response(serializer.data)
 
+    @swagger_auto_schema(
+        method='GET',
+        responses={
+            200: openapi.Response(
+                description="A page of new products from the user's favorite stores, newest first",
+                schema=ProductPageSerializer()
+            ),
+            400: openapi.Response(
+                description="The cursor or limit is not a number",
+                schema=MessageSerializer()
+            ),
+        },
+        manual_parameters=[
+            openapi.Parameter(
+                "cursor",
+                openapi.IN_QUERY,
+                required=False,
+                type=openapi.TYPE_INTEGER,
+                description="The next_cursor of the previous page"
+            ),
+            openapi.Parameter(
+                "limit",
+                openapi.IN_QUERY,
+                required=False,
+                type=openapi.TYPE_INTEGER,
+                description="Number of products per page"
+            ),
+        ]
+    )
+    @action(methods=['get'], detail=False)
+    def feed(self, request):
+        """Get the new products from the stores the current user favorited"""
+        try:
+            cursor, limit = page_params(request)
+        except ValueError:
+            return Response({'message': 'cursor and limit must be numbers'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        products, next_cursor = read_feed(request.auth.user, cursor, limit)
+        serializer = ProductSerializer(products, many=True)
+        return Response({'results': serializer.data, 'next_cursor': next_cursor})
+
+    @swagger_auto_schema(
+        method='GET',
+        responses={
+            200: openapi.Response(
+                description="The products changed or deleted since the cursor, oldest change first",
+                schema=ProductChangesSerializer()
+            ),
+            400: openapi.Response(
+                description="since or limit is not a number",
+                schema=MessageSerializer()
+            ),
+            410: openapi.Response(
+                description="Deletes after the cursor are no longer kept, sync from 0 again",
+                schema=MessageSerializer()
+            ),
+        },
+        manual_parameters=[
+            openapi.Parameter(
+                "since",
+                openapi.IN_QUERY,
+                required=False,
+                type=openapi.TYPE_INTEGER,
+                description="The cursor of the last pull, 0 or none for every product"
+            ),
+            openapi.Parameter(
+                "limit",
+                openapi.IN_QUERY,
+                required=False,
+                type=openapi.TYPE_INTEGER,
+                description="Most changes returned"
+            ),
+        ]
+    )
+    @action(methods=['get'], detail=False)
+    def changes(self, request):
+        """Get the products changed since a cursor, for incremental syncs"""
+        try:
+            since, limit = since_params(request)
+            products = Product.objects.select_related('store', 'category')
+            page = changed_since(products, since, limit)
+        except ValueError:
+            return Response({'message': 'since and limit must be numbers'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        except CursorExpired:
+            return Response({'message': 'The cursor is too old, sync again from 0'},
+                            status=status.HTTP_410_GONE)
+
+        page['results'] = ProductSerializer(page['results'], many=True).data
+        return Response(page)
+
+    @swagger_auto_schema(
+        method='GET',
+        responses={
+            200: openapi.Response(
+                description="The best products with a word starting with each word of the query",
+                schema=SuggestionSerializer(many=True)
+            ),
+            400: openapi.Response(
+                description="The sort or limit is invalid",
+                schema=MessageSerializer()
+            ),
+        },
+        manual_parameters=[
+            openapi.Parameter(
+                "q",
+                openapi.IN_QUERY,
+                required=True,
+                type=openapi.TYPE_STRING,
+                description="What the user typed so far, ex. 'red sh'"
+            ),
+            openapi.Parameter(
+                "sort",
+                openapi.IN_QUERY,
+                required=False,
+                type=openapi.TYPE_STRING,
+                enum=AUTOCOMPLETE_SORTS,
+                description="sales (the default) or rating, best first"
+            ),
+            openapi.Parameter(
+                "limit",
+                openapi.IN_QUERY,
+                required=False,
+                type=openapi.TYPE_INTEGER,
+                description="Number of suggestions"
+            ),
+        ]
+    )
+    @action(methods=['get'], detail=False)
+    def autocomplete(self, request):
+        """Suggest product names from the in-memory index, without querying the database"""
+        try:
+            limit = int(request.query_params.get('limit', settings.AUTOCOMPLETE_LIMIT))
+            suggestions = name_index.search(
+                request.query_params.get('q', ''), max(1, min(limit, settings.MAX_PAGE_SIZE)),
+                request.query_params.get('sort', 'sales'))
+        except ValueError:
+            return Response({'message': 'sort or limit is invalid'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(suggestions)
+
     @swagger_auto_schema(
         responses={
             200: openapi.Response(
@@ -200,9 +368,7 @@ class ProductView(ViewSet):
     def retrieve(self, request, pk):
         """Get a single product"""
         try:
-            product = Product.objects.get(pk=pk)
-            serializer = ProductSerializer(product)
-            return Response(serializer.data)
+            return Response(product_detail(pk))
         except Product.DoesNotExist as ex:
             return Response({'message': ex.args[0]}, status=status.HTTP_404_NOT_FOUND)
 
@@ -217,19 +383,54 @@ class ProductView(ViewSet):
                 description="Product not found",
                 schema=MessageSerializer()
             ),
+            409: openapi.Response(
+                description="Every unit of the product is sold or held in other carts",
+                schema=MessageSerializer()
+            ),
         }
     )
     @action(methods=['post'], detail=True)
+    @idempotent
     def add_to_order(self, request, pk):
-        """Add a product to the current users open order"""
+        """Add a product to the current users open order, holding a unit of it for RESERVATION_TTL"""
         try:
             product = Product.objects.get(pk=pk)
-            order, _ = Order.objects.get_or_create(
-                user=request.auth.user, completed_on=None, payment_type=None)
-            order.products.add(product)
+            order_id = open_order_id(request.auth.user, create=True)
+            with transaction.atomic():
+                reserve(order_id, product.id)
+                OrderProduct.objects.get_or_create(order_id=order_id, product=product)
             return Response({'message': 'product added'}, status=status.HTTP_201_CREATED)
         except Product.DoesNotExist as ex:
             return Response({'message': ex.args[0]}, status=status.HTTP_404_NOT_FOUND)
+        except SoldOut as ex:
+            return Response({'message': ex.args[0]}, status=status.HTTP_409_CONFLICT)
+
+    @swagger_auto_schema(
+        method='GET',
+        responses={
+            200: openapi.Response(
+                description="The product's stock, the units held in carts and the units left",
+                schema=AvailabilitySerializer()
+            ),
+            404: openapi.Response(
+                description="Product not found",
+                schema=MessageSerializer()
+            ),
+        }
+    )
+    @action(methods=['get'], detail=True)
+    def availability(self, request, pk):
+        """Get how many units of a product can still be added to a cart"""
+        try:
+            quantity = Product.objects.values_list('quantity', flat=True).get(pk=pk)
+            held = held_quantity(pk)
+            return Response({
+                'quantity': quantity,
+                'held': held,
+                'available': max(quantity - held, 0),
+            })
+        except Product.DoesNotExist as ex:
+            return Response({'message': ex.args[0]}, status=status.HTTP_404_NOT_FOUND)
 
     @swagger_auto_schema(
         method='DELETE',
@@ -249,9 +450,11 @@ class ProductView(ViewSet):
         """Remove a product from the users open order"""
         try:
             product = Product.objects.get(pk=pk)
-            order = Order.objects.get(
-                user=request.auth.user, completed_on=None)
-            order.products.remove(product)
+            order_id = open_order_id(request.auth.user)
+            if order_id is None:
+                raise Order.DoesNotExist('You do not have an open order')
+            OrderProduct.objects.filter(order_id=order_id, product=product).delete()
+            release(order_id, product.id)
             return Response(None, status=status.HTTP_204_NO_CONTENT)
         except Product.DoesNotExist as ex:
             return Response({'message': ex.args[0]}, status=status.HTTP_404_NOT_FOUND)
@@ -276,7 +479,13 @@ class ProductView(ViewSet):
         request_body=AddRemoveRecommendationSerializer(),
         responses={
             201: openapi.Response(
-                description="No content, the recommendation was added",
+                description="No content for a single username, the usernames that were found for a list",
+                schema=RecommendResultSerializer()
+            ),
+            400: openapi.Response(
+                description="Neither username nor usernames was sent, or usernames isn't a list "
+                            "of at most RECOMMEND_MAX_USERNAMES names",
+                schema=MessageSerializer()
             ),
             404: openapi.Response(
                 description="Either the Product or User was not found",
@@ -285,34 +494,52 @@ class ProductView(ViewSet):
         }
     )
     @action(methods=['post', 'delete'], detail=True)
+    @idempotent
     def recommend(self, request, pk):
-        """Add or remove a recommendation for a product to another user"""
+        """Add or remove a recommendation for a product to another user,
+        send usernames to recommend to many users at once"""
         try:
             product = Product.objects.get(pk=pk)
-            customer = User.objects.get(username=request.data['username'])
         except Product.DoesNotExist as ex:
             return Response({'message': ex.args[0]}, status=status.HTTP_404_NOT_FOUND)
-        except User.DoesNotExist as ex:
-            return Response({'message': ex.args[0]}, status=status.HTTP_404_NOT_FOUND)
+
+        serializer = AddRemoveRecommendationSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({'message': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+        many = 'usernames' in serializer.validated_data
+        if many:
+            usernames = serializer.validated_data['usernames']
+        else:
+            usernames = [serializer.validated_data['username']]
+
+        customers = list(User.objects.filter(username__in=usernames).only('id', 'username'))
+        if not many and not customers:
+            return Response({'message': 'User matching query does not exist.'},
+                            status=status.HTTP_404_NOT_FOUND)
 
         if request.method == "POST":
-            recommendation = Recommendation.objects.create(
-                product=product,
-                recommender=request.auth.user,
-                customer=customer
-            )
+            # Recommending the same product to the same user again is a no-op
+            Recommendation.objects.bulk_create([
+                Recommendation(product=product, recommender=request.auth.user, customer=customer)
+                for customer in customers
+            ], ignore_conflicts=True)
 
-            return Response(None, status=status.HTTP_201_CREATED)
+            if not many:
+                return Response(None, status=status.HTTP_201_CREATED)
 
-        if request.method == 'DELETE':
-            recommendation = Recommendation.objects.get(
-                product=product,
-                recommender=request.auth.user,
-                customer=customer
-            )
-            recommendation.delete()
+            found = {customer.username for customer in customers}
+            return Response({
+                'recommended': [username for username in usernames if username in found],
+                'not_found': [username for username in usernames if username not in found]
+            }, status=status.HTTP_201_CREATED)
 
-            return Response(None, status=status.HTTP_204_NO_CONTENT)
+        Recommendation.objects.filter(
+            product=product,
+            recommender=request.auth.user,
+            customer__in=customers
+        ).delete()
+
+        return Response(None, status=status.HTTP_204_NO_CONTENT)
 
     @swagger_auto_schema(
         method='POST',
@@ -321,7 +548,10 @@ class ProductView(ViewSet):
             201: openapi.Response(
                 description="No content, the rating was added",
             ),
-
+            400: openapi.Response(
+                description="The score is not a number from 1 to 5 or the review is missing",
+                schema=MessageSerializer()
+            ),
         }
     )
     @action(methods=['post'], detail=True, url_path='rate-product')
@@ -329,18 +559,98 @@ class ProductView(ViewSet):
         """Rate a product"""
         product = Product.objects.get(pk=pk)
 
-        try:
-            rating = Rating.objects.get(
-                customer=request.auth.user, product=product)
-            rating.score = request.data['score']
-            rating.review = request.data['review']
-            rating.save()
-        except Rating.DoesNotExist:
-            rating = Rating.objects.create(
-                customer=request.auth.user,
-                product=product,
-                score=request.data['score'],
-                review=request.data['review']
-            )
+        serializer = AddProductRatingSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({'message': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+        rate(request.auth.user, product, serializer.validated_data['score'],
+             serializer.validated_data['review'])
 
         return Response({'message': 'Rating added'}, status=status.HTTP_201_CREATED)
+
+    @swagger_auto_schema(
+        method='GET',
+        responses={
+            200: openapi.Response(
+                description="A page of the product's reviews",
+                schema=ReviewPageSerializer()
+            ),
+            400: openapi.Response(
+                description="The sort, cursor or limit is invalid",
+                schema=MessageSerializer()
+            ),
+        },
+        manual_parameters=[
+            openapi.Parameter(
+                "sort",
+                openapi.IN_QUERY,
+                required=False,
+                type=openapi.TYPE_STRING,
+                enum=REVIEW_SORTS,
+                description="newest (the default) or score, highest first"
+            ),
+            openapi.Parameter(
+                "cursor",
+                openapi.IN_QUERY,
+                required=False,
+                type=openapi.TYPE_STRING,
+                description="The next_cursor of the previous page"
+            ),
+            openapi.Parameter(
+                "limit",
+                openapi.IN_QUERY,
+                required=False,
+                type=openapi.TYPE_INTEGER,
+                description="Number of reviews per page"
+            ),
+        ]
+    )
+    @action(methods=['get'], detail=True)
+    def reviews(self, request, pk):
+        """Get a page of a product's ratings and reviews"""
+        try:
+            limit = int(request.query_params.get('limit', settings.PAGE_SIZE))
+            page, next_cursor = read_reviews(
+                pk, request.query_params.get('sort', 'newest'),
+                request.query_params.get('cursor'), max(1, min(limit, settings.MAX_PAGE_SIZE)))
+        except ValueError:
+            return Response({'message': 'sort, cursor or limit is invalid'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = ReviewSerializer(page, many=True)
+        return Response({'results': serializer.data, 'next_cursor': next_cursor})
+
+    @swagger_auto_schema(
+        method='POST',
+        request_body=ImportProductsSerializer(),
+        responses={
+            200: openapi.Response(
+                description="The number of created and updated products and the rows that failed",
+                schema=ImportReportSerializer()
+            ),
+            400: openapi.Response(
+                description="No file was uploaded or the format is unknown",
+                schema=MessageSerializer()
+            ),
+            404: openapi.Response(
+                description="The current user does not have a store",
+                schema=MessageSerializer()
+            ),
+        }
+    )
+    @action(methods=['post'], detail=False, url_path='import')
+    def import_products(self, request):
+        """Create or update the current user's products from a CSV or JSON lines file,
+        rows are matched to existing products by sku"""
+        try:
+            store = Store.objects.get(seller=request.auth.user)
+        except Store.DoesNotExist as ex:
+            return Response({'message': ex.args[0]}, status=status.HTTP_404_NOT_FOUND)
+
+        serializer = ImportProductsSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({'message': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        upload = serializer.validated_data['file']
+        file_format = serializer.validated_data.get('format') or detect_format(upload.name)
+        report = ProductImporter(store).run(read_rows(upload.file, file_format))
+        return Response(report)
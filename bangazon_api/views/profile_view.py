@@ -4,10 +4,13 @@ from rest_framework import status
 from rest_framework.decorators import action
 from django.contrib.auth.models import User
 
-from drf_yasg.utils import swagger_auto_schema
-from drf_yasg import openapi
+from bangazon_api.docs import swagger_auto_schema, openapi
 
-from bangazon_api.serializers import UserSerializer, MessageSerializer, CreateUserSerializer
+from bangazon_api.models import Recommendation
+from bangazon_api.pagination import page_params, paginate
+from bangazon_api.serializers import (
+    UserSerializer, MessageSerializer, CreateUserSerializer,
+    RecommendationSerializer, RecommendationPageSerializer)
 
 
 class ProfileView(ViewSet):
@@ -54,3 +57,47 @@ class ProfileView(ViewSet):
         user.save()
 
         return Response(None, status=status.HTTP_204_NO_CONTENT)
+
+    @swagger_auto_schema(
+        method='GET',
+        responses={
+            200: openapi.Response(
+                description="A page of the products recommended to the current user, newest first",
+                schema=RecommendationPageSerializer()
+            ),
+            400: openapi.Response(
+                description="The cursor or limit is not a number",
+                schema=MessageSerializer()
+            ),
+        },
+        manual_parameters=[
+            openapi.Parameter(
+                "cursor",
+                openapi.IN_QUERY,
+                required=False,
+                type=openapi.TYPE_INTEGER,
+                description="The next_cursor of the previous page"
+            ),
+            openapi.Parameter(
+                "limit",
+                openapi.IN_QUERY,
+                required=False,
+                type=openapi.TYPE_INTEGER,
+                description="Number of recommendations per page"
+            ),
+        ]
+    )
+    @action(methods=['GET'], detail=False)
+    def recommendations(self, request):
+        """Get the products other users recommended to the current user"""
+        try:
+            cursor, limit = page_params(request)
+        except ValueError:
+            return Response({'message': 'cursor and limit must be numbers'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        recommendations = Recommendation.objects.filter(
+            customer=request.auth.user).select_related('product', 'recommender')
+        page, next_cursor = paginate(recommendations, cursor, limit)
+        serializer = RecommendationSerializer(page, many=True)
+        return Response({'results': serializer.data, 'next_cursor': next_cursor})
@@ -1,11 +1,18 @@
 from rest_framework.viewsets import ViewSet
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError
-from drf_yasg.utils import swagger_auto_schema
-from drf_yasg import openapi
+from bangazon_api.docs import swagger_auto_schema, openapi
+from bangazon_api.idempotency import idempotent
+from bangazon_api.catalog import store_list
 from bangazon_api.models import Store
-from bangazon_api.serializers import StoreSerializer, MessageSerializer, AddStoreSerializer
+from bangazon_api.pagination import since_params
+from bangazon_api.serializers import (
+    StoreSerializer, StoreChangesSerializer, MessageSerializer, AddStoreSerializer,
+    StoreStatsSerializer)
+from bangazon_api.store_stats import parse_range, store_stats
+from bangazon_api.sync import CursorExpired, changed_since
 
 
 class StoreView(ViewSet):
@@ -22,6 +29,7 @@ class StoreView(ViewSet):
             ),
         }
     )
+    @idempotent
     def create(self, request):
         """Create a store for the current user"""
         try:
@@ -45,9 +53,7 @@ class StoreView(ViewSet):
     )
     def list(self, request):
         """Get a list of all stores"""
-        stores = Store.objects.all()
-        serializer = StoreSerializer(stores, many=True)
-        return Response(serializer.data)
+        return Response(store_list())
 
     @swagger_auto_schema(
         responses={
@@ -99,3 +105,102 @@ class StoreView(ViewSet):
             return Response({'message': ex.args[0]}, status=status.HTTP_400_BAD_REQUEST)
         except Store.DoesNotExist as ex:
             return Response({'message': ex.args[0]}, status=status.HTTP_404_NOT_FOUND)
+
+    @swagger_auto_schema(
+        method='GET',
+        responses={
+            200: openapi.Response(
+                description="Revenue, units sold, ratings and stock outs of the store",
+                schema=StoreStatsSerializer()
+            ),
+            400: openapi.Response(
+                description="A date is not in the YYYY-MM-DD format",
+                schema=MessageSerializer()
+            ),
+            404: openapi.Response(
+                description="The store does not exist or belongs to another seller",
+                schema=MessageSerializer()
+            ),
+        },
+        manual_parameters=[
+            openapi.Parameter(
+                "start",
+                openapi.IN_QUERY,
+                required=False,
+                type=openapi.TYPE_STRING,
+                format=openapi.FORMAT_DATE,
+                description="Only count orders completed on or after this date"
+            ),
+            openapi.Parameter(
+                "end",
+                openapi.IN_QUERY,
+                required=False,
+                type=openapi.TYPE_STRING,
+                format=openapi.FORMAT_DATE,
+                description="Only count orders completed on or before this date"
+            ),
+        ]
+    )
+    @action(methods=['get'], detail=True)
+    def stats(self, request, pk):
+        """Get the dashboard figures of the current user's store"""
+        try:
+            store = Store.objects.get(pk=pk, seller=request.auth.user)
+            start, end = parse_range(
+                request.query_params.get('start'), request.query_params.get('end'))
+            return Response(store_stats(store.id, start, end))
+        except ValueError:
+            return Response({'message': 'start and end must be dates like 2021-12-31'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        except Store.DoesNotExist as ex:
+            return Response({'message': ex.args[0]}, status=status.HTTP_404_NOT_FOUND)
+
+    @swagger_auto_schema(
+        method='GET',
+        responses={
+            200: openapi.Response(
+                description="The stores changed or deleted since the cursor, oldest change first",
+                schema=StoreChangesSerializer()
+            ),
+            400: openapi.Response(
+                description="since or limit is not a number",
+                schema=MessageSerializer()
+            ),
+            410: openapi.Response(
+                description="Deletes after the cursor are no longer kept, sync from 0 again",
+                schema=MessageSerializer()
+            ),
+        },
+        manual_parameters=[
+            openapi.Parameter(
+                "since",
+                openapi.IN_QUERY,
+                required=False,
+                type=openapi.TYPE_INTEGER,
+                description="The cursor of the last pull, 0 or none for every store"
+            ),
+            openapi.Parameter(
+                "limit",
+                openapi.IN_QUERY,
+                required=False,
+                type=openapi.TYPE_INTEGER,
+                description="Most changes returned"
+            ),
+        ]
+    )
+    @action(methods=['get'], detail=False)
+    def changes(self, request):
+        """Get the stores changed since a cursor, for incremental syncs"""
+        try:
+            since, limit = since_params(request)
+            stores = Store.objects.select_related('seller').prefetch_related('products')
+            page = changed_since(stores, since, limit)
+        except ValueError:
+            return Response({'message': 'since and limit must be numbers'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        except CursorExpired:
+            return Response({'message': 'The cursor is too old, sync again from 0'},
+                            status=status.HTTP_410_GONE)
+
+        page['results'] = StoreSerializer(page['results'], many=True).data
+        return Response(page)
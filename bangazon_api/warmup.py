@@ -0,0 +1,141 @@
+"""Filling the per-worker caches before a worker serves its first request
+
+The hottest product pages are taken from the recent access log, topped up
+with the best sellers. Reading them also pulls their pages into SQLite's
+and the OS's page cache.
+"""
+import json
+import logging
+import time
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.urls import Resolver404, resolve
+from bangazon_api import autocomplete, catalog, changes
+from bangazon_api.models import Product
+
+logger = logging.getLogger(__name__)
+
+
+def recent_product_views(path, max_bytes):
+    """Count the product detail requests at the end of the access log
+
+    Args:
+        path (string): the access log, None when it goes to stdout
+
+    Returns:
+        Counter: product id to the number of requests
+    """
+    counts = Counter()
+    if not path:
+        return counts
+    path = Path(path)
+    if not path.exists():
+        return counts
+
+    offset = max(path.stat().st_size - max_bytes, 0)
+    with path.open('rb') as log:
+        log.seek(offset)
+        lines = log.read().splitlines()
+    if offset:
+        # The first line was cut in half by the seek
+        lines = lines[1:]
+
+    for line in lines:
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            continue
+        if entry.get('view') != 'ProductView.retrieve' or entry.get('status') != 200:
+            continue
+        try:
+            counts[resolve(entry['path']).kwargs['pk']] += 1
+        except (Resolver404, KeyError):
+            continue
+    return counts
+
+
+def hot_product_ids(limit):
+    """Get the ids of the products most likely to be requested, hottest first"""
+    ids = [
+        pk for pk, _ in recent_product_views(
+            settings.ACCESS_LOG_PATH, settings.WARMUP_LOG_BYTES).most_common(limit)
+    ]
+    if len(ids) < limit:
+        best_sellers = Product.objects.exclude(id__in=ids).order_by(
+            '-purchase_count').values_list('id', flat=True)[:limit - len(ids)]
+        ids.extend(str(pk) for pk in best_sellers)
+    return ids
+
+
+def warm_products(limit, start, budget):
+    """Load the hottest product pages until the time budget runs out
+
+    Returns:
+        int: the number of pages loaded
+    """
+    loaded = 0
+    for pk in hot_product_ids(limit):
+        if time.perf_counter() - start > budget:
+            break
+        try:
+            catalog.product_detail(pk)
+        except Product.DoesNotExist:
+            continue
+        loaded += 1
+    return loaded
+
+
+def warm_up(budget=None, product_limit=None):
+    """Fill the catalog caches until the time budget runs out
+
+    Args:
+        budget (float): seconds to spend, defaults to WARMUP_TIME_BUDGET
+        product_limit (int): most product pages to load, defaults to WARMUP_PRODUCT_LIMIT
+
+    Returns:
+        dict: what was warmed, the time it took and whether the budget ran out
+    """
+    budget = settings.WARMUP_TIME_BUDGET if budget is None else budget
+    product_limit = settings.WARMUP_PRODUCT_LIMIT if product_limit is None else product_limit
+    start = time.perf_counter()
+    report = {
+        'categories': 0, 'category tree': 0, 'stores': 0, 'autocomplete': 0, 'products': 0,
+        'failed': 0, 'out_of_time': False}
+
+    try:
+        # Sets where this worker starts reading the change log, so the first
+        # request doesn't throw the warmed entries away
+        changes.poll()
+    except DatabaseError:
+        # ex. the database isn't migrated yet, the worker still has to start
+        logger.exception('Cache warm up failed')
+        steps = []
+    else:
+        steps = [
+            ('categories', lambda: len(catalog.category_list())),
+            ('category tree', lambda: len(catalog.category_counts(tree=True))),
+            ('stores', lambda: len(catalog.store_list())),
+            ('autocomplete', lambda: autocomplete.index.build() or len(autocomplete.index)),
+            ('products', lambda: warm_products(product_limit, start, budget)),
+        ]
+
+    for name, step in steps:
+        if time.perf_counter() - start > budget:
+            report['out_of_time'] = True
+            break
+        # A failed step is only a colder cache, the worker still has to start
+        try:
+            report[name] += step()
+        except Exception:  # pylint: disable=broad-except
+            logger.exception('Warming the %s failed', name)
+            report['failed'] += 1
+    else:
+        report['out_of_time'] = time.perf_counter() - start > budget
+
+    report['ms'] = round((time.perf_counter() - start) * 1000, 1)
+    logger.info('Warmed %(categories)s categories, %(stores)s stores, '
+                '%(autocomplete)s autocomplete names and %(products)s products in %(ms)s ms', report)
+    return report
@@ -0,0 +1,23 @@
+from rest_framework.test import APITestCase
+from django.core.cache import cache
+from django.core.management import call_command
+
+from bangazon_api import changes
+
+
+class SeededTestCase(APITestCase):
+    """Seeds the database once for all the tests of a class
+
+    Each test runs in a savepoint that is rolled back afterwards, so every
+    test starts from the same seeded rows.
+    """
+    user_count = 2
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_db', user_count=cls.user_count)
+
+    def setUp(self):
+        # Entries cached by an earlier test can hold rows its rollback undid
+        cache.clear()
+        changes.reset()
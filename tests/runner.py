@@ -0,0 +1,17 @@
+import logging
+
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """Runs the tests without writing the access log"""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        access_log = logging.getLogger('bangazon_api.access')
+        self._access_handlers = access_log.handlers
+        access_log.handlers = [logging.NullHandler()]
+
+    def teardown_test_environment(self, **kwargs):
+        logging.getLogger('bangazon_api.access').handlers = self._access_handlers
+        super().teardown_test_environment(**kwargs)
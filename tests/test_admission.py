@@ -0,0 +1,93 @@
+import threading
+import time
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from rest_framework import status
+
+from bangazon_api.middleware.admission import Admission, queued_seconds
+from tests.base import SeededTestCase
+
+CLASSES = {
+    'checkout': {'priority': 0, 'limit': 1, 'queue': 1, 'wait': 5, 'retry_after': 1},
+    'catalog': {'priority': 3, 'limit': 1, 'queue': 1, 'wait': 5, 'retry_after': 2},
+}
+
+
+class AdmissionTests(SimpleTestCase):
+    def test_full_queue_is_shed(self):
+        admission = Admission(1, CLASSES)
+        self.assertTrue(admission.acquire('catalog', 1))
+        self.assertFalse(admission.acquire('catalog', 0))
+
+        waiter = threading.Thread(target=admission.acquire, args=('catalog', 5))
+        waiter.start()
+        while not admission.waiters:
+            time.sleep(0.001)
+        # The one queue spot is taken
+        self.assertFalse(admission.acquire('catalog', 1))
+        admission.release('catalog')
+        waiter.join()
+        self.assertEqual(admission.in_flight['catalog'], 1)
+
+    def test_checkout_goes_first(self):
+        """A freed slot goes to a waiting checkout before browsing that waited longer"""
+        admission = Admission(1, CLASSES)
+        admission.acquire('catalog', 1)
+        order = []
+
+        def request(name):
+            if admission.acquire(name, 5):
+                order.append(name)
+                admission.release(name)
+
+        threads = [threading.Thread(target=request, args=(name,)) for name in ('catalog', 'checkout')]
+        for thread in threads:
+            thread.start()
+            while len(admission.waiters) < threads.index(thread) + 1:
+                time.sleep(0.001)
+        admission.release('catalog')
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(order, ['checkout', 'catalog'])
+
+    def test_queued_seconds(self):
+        """Headers that aren't a finite time count as not queued"""
+        factory = RequestFactory()
+        for header in ('t=nan', 'inf', '-inf', 'nope', ''):
+            request = factory.get('/api/categories', HTTP_X_REQUEST_START=header)
+            self.assertEqual(queued_seconds(request), 0)
+        request = factory.get('/api/categories', HTTP_X_REQUEST_START=f'{(time.time() - 2) * 1e6:.0f}')
+        self.assertAlmostEqual(queued_seconds(request), 2, delta=1)
+
+
+class AdmissionMiddlewareTests(SeededTestCase):
+    @override_settings(ADMISSION_CLASSES={
+        **CLASSES,
+        'catalog': {'priority': 3, 'limit': 0, 'queue': 0, 'wait': 1, 'retry_after': 2},
+        'writes': {'priority': 2, 'limit': 1, 'queue': 0, 'wait': 1, 'retry_after': 2},
+        'cart': {'priority': 1, 'limit': 1, 'queue': 0, 'wait': 1, 'retry_after': 1},
+    })
+    def test_shed_with_retry_after(self):
+        response = self.client.get('/api/categories')
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response['Retry-After'], '2')
+
+        # The browser can read the 503 and when to retry
+        response = self.client.get('/api/categories', HTTP_ORIGIN='http://localhost:3000')
+        self.assertEqual(response['Access-Control-Allow-Origin'], 'http://localhost:3000')
+        self.assertIn('Retry-After', response['Access-Control-Expose-Headers'])
+
+        # Checkout still gets through, and fails on auth
+        response = self.client.put('/api/orders/1/complete')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(ADMISSION_CLASSES={
+        **CLASSES,
+        'writes': CLASSES['catalog'],
+        'cart': CLASSES['catalog'],
+    })
+    def test_time_queued_in_proxy(self):
+        """A request that already waited past its deadline in the proxy is shed"""
+        started = f't={time.time() - 10:.3f}'
+        response = self.client.get('/api/categories', HTTP_X_REQUEST_START=started)
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
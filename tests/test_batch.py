@@ -0,0 +1,102 @@
+from rest_framework import status
+from rest_framework.test import APITransactionTestCase
+from rest_framework.authtoken.models import Token
+from django.conf import settings
+from django.core.management import call_command
+from django.test import override_settings
+from django.contrib.auth.models import User
+
+from bangazon_api.models import Product
+from tests.base import SeededTestCase
+
+
+class BatchTests(SeededTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user1 = User.objects.filter(store__isnull=False).first()
+        cls.token = Token.objects.get(user=cls.user1)
+
+    def setUp(self):
+        super().setUp()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_product_page_in_one_request(self):
+        """Each sub-request gets its own status and body, in order"""
+        product = Product.objects.first()
+        requests = [
+            {'method': 'GET', 'path': f'/api/products/{product.id}'},
+            {'method': 'GET', 'path': f'/api/stores/{product.store_id}'},
+            {'method': 'GET', 'path': '/api/orders/current'},
+            {'method': 'GET', 'path': '/api/profile/my-profile'},
+            {'method': 'GET', 'path': '/api/products/0'},
+            {'method': 'GET', 'path': '/api/nothing-here'},
+        ]
+        response = self.client.post('/api/batch', {'requests': requests}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        statuses = [sub_response['status'] for sub_response in response.data['responses']]
+        self.assertEqual(statuses, [200, 200, 200, 200, 404, 404])
+        self.assertEqual(response.data['responses'][0]['body']['id'], product.id)
+        self.assertEqual(response.data['responses'][3]['body']['username'], self.user1.username)
+
+    def test_write_with_body(self):
+        product = Product.objects.first()
+        requests = [
+            {'method': 'POST', 'path': f'/api/products/{product.id}/rate-product',
+             'body': {'score': 4, 'review': 'Good'}},
+        ]
+        response = self.client.post('/api/batch', {'requests': requests}, format='json')
+
+        self.assertEqual(response.data['responses'][0]['status'], status.HTTP_201_CREATED)
+        self.assertTrue(product.ratings.filter(customer=self.user1, score=4).exists())
+
+    @override_settings(ADMISSION_CLASSES={
+        **settings.ADMISSION_CLASSES,
+        'writes': {'priority': 2, 'limit': 0, 'queue': 0, 'wait': 1, 'retry_after': 2},
+    })
+    def test_sub_requests_are_admitted(self):
+        """Each sub-request is charged to its own route class, the batch itself isn't"""
+        product = Product.objects.first()
+        requests = [
+            {'method': 'GET', 'path': f'/api/products/{product.id}'},
+            {'method': 'POST', 'path': f'/api/products/{product.id}/rate-product',
+             'body': {'score': 4, 'review': 'Good'}},
+        ]
+        response = self.client.post('/api/batch', {'requests': requests}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        statuses = [sub_response['status'] for sub_response in response.data['responses']]
+        self.assertEqual(statuses, [200, 503])
+        self.assertIn('message', response.data['responses'][1]['body'])
+        self.assertFalse(product.ratings.filter(customer=self.user1).exists())
+
+    def test_batch_needs_a_token(self):
+        self.client.credentials()
+        requests = [{'method': 'GET', 'path': '/api/profile/my-profile'}]
+        response = self.client.post('/api/batch', {'requests': requests}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class ParallelBatchTests(APITransactionTestCase):
+    def setUp(self):
+        """
+        Seed the database, the pool threads only see committed rows
+        """
+        call_command('seed_db', user_count=2)
+        self.user1 = User.objects.first()
+        self.token = Token.objects.get(user=self.user1)
+
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_parallel_gets(self):
+        products = list(Product.objects.all()[:3])
+        requests = [{'method': 'GET', 'path': f'/api/products/{p.id}'} for p in products]
+        response = self.client.post(
+            '/api/batch', {'requests': requests, 'parallel': True}, format='json')
+
+        self.assertEqual(
+            [sub_response['body']['id'] for sub_response in response.data['responses']],
+            [p.id for p in products])
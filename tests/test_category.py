@@ -0,0 +1,120 @@
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Q
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from django.contrib.auth.models import User
+
+from bangazon_api.models import Category, Product, Store
+from tests.base import SeededTestCase
+
+
+class CategoryTests(SeededTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user1 = User.objects.filter(store__isnull=False).first()
+        cls.token = Token.objects.get(user=cls.user1)
+
+    def setUp(self):
+        super().setUp()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def assertCountsMatch(self):
+        expected = Category.objects.annotate(
+            expected=Count('products', filter=Q(products__store__is_active=True)))
+        for category in expected:
+            self.assertEqual(category.product_count, category.expected, category.name)
+
+    def test_counts_follow_products_and_stores(self):
+        """The counts only include active stores and follow every kind of write"""
+        self.assertCountsMatch()
+        product = Product.objects.first()
+        other = Category.objects.exclude(pk=product.category_id).first()
+
+        copy = Product.objects.get(pk=product.pk)
+        copy.pk = None
+        copy.save()
+        self.assertCountsMatch()
+
+        Product.objects.filter(pk=copy.pk).update(category=other)
+        self.assertCountsMatch()
+
+        Store.objects.filter(pk=product.store_id).update(is_active=False)
+        self.assertCountsMatch()
+        Store.objects.filter(pk=product.store_id).update(is_active=True)
+        self.assertCountsMatch()
+
+        copy.delete()
+        self.assertCountsMatch()
+
+    def test_save_keeps_count(self):
+        """Saving a category read before its products changed keeps the count"""
+        product = Product.objects.first()
+        category = Category.objects.get(pk=product.category_id)
+        product.delete()
+        category.name = 'Renamed'
+        category.save()
+        self.assertCountsMatch()
+
+    def test_list_counts(self):
+        """The counts include the subcategories in total_count"""
+        parent, child = Category.objects.all()[:2]
+        Category.objects.filter(pk=child.pk).update(parent=parent)
+        parent.refresh_from_db()
+        child.refresh_from_db()
+
+        response = self.client.get('/api/categories', {'counts': 'true'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        categories = {category['id']: category for category in response.data}
+        self.assertEqual(len(categories), Category.objects.count())
+        self.assertEqual(categories[child.id]['parent_id'], parent.id)
+        self.assertEqual(categories[parent.id]['product_count'], parent.product_count)
+        self.assertEqual(
+            categories[parent.id]['total_count'], parent.product_count + child.product_count)
+
+        response = self.client.get('/api/categories')
+        self.assertNotIn('product_count', response.data[0])
+
+    def test_tree(self):
+        """The tree nests subcategories and is served from the cache"""
+        parent, child = Category.objects.all()[:2]
+        Category.objects.filter(pk=child.pk).update(parent=parent)
+
+        response = self.client.get('/api/categories', {'tree': '1'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        ids = [category['id'] for category in response.data]
+        self.assertNotIn(child.id, ids)
+        node = next(category for category in response.data if category['id'] == parent.id)
+        self.assertEqual([category['id'] for category in node['children']], [child.id])
+
+        # Only the change log poll, the tree comes from the cache, also after a
+        # product change that leaves the counts alone
+        Product.objects.get(pk=Product.objects.first().pk).save()
+        with self.assertNumQueries(1):
+            self.client.get('/api/categories', {'tree': '1'})
+
+        Product.objects.create(
+            name='Trowel', store=Store.objects.filter(is_active=True).first(),
+            price=5, description='Hand trowel', quantity=1, location='Nashville', category=child)
+        response = self.client.get('/api/categories', {'tree': '1'})
+        node = next(category for category in response.data if category['id'] == parent.id)
+        self.assertEqual(node['children'][0]['product_count'], child.product_count + 1)
+
+    def test_parent_cycle(self):
+        """Categories in a loop of parents are listed at the top level and can't be saved"""
+        first, second = Category.objects.all()[:2]
+        third = Category.objects.create(name='Garden', parent=first)
+        Category.objects.filter(pk=first.pk).update(parent=second)
+        Category.objects.filter(pk=second.pk).update(parent=first)
+
+        response = self.client.get('/api/categories', {'tree': 'true'})
+        roots = {category['id']: category for category in response.data}
+        self.assertIn(first.id, roots)
+        self.assertIn(second.id, roots)
+        self.assertEqual([category['id'] for category in roots[first.id]['children']], [third.id])
+        self.assertEqual(roots[second.id]['children'], [])
+
+        first.refresh_from_db()
+        with self.assertRaises(ValidationError):
+            first.full_clean()
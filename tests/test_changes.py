@@ -0,0 +1,80 @@
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from django.contrib.auth.models import User
+
+from bangazon_api import changes
+from bangazon_api.authentication import TimedTokenAuthentication
+from bangazon_api.changes import LocalCache
+from bangazon_api.models import ChangeEvent, Product
+from tests.base import SeededTestCase
+
+
+class ChangeEventTests(SeededTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user1 = User.objects.first()
+        cls.token = Token.objects.get(user=cls.user1)
+
+    def setUp(self):
+        super().setUp()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_change_from_other_worker(self):
+        """A product changed by another worker is not served from the cache"""
+        product = Product.objects.first()
+        self.client.get(f'/api/products/{product.id}')
+
+        # Another worker's write: the row and its event, without touching this worker's caches
+        Product.objects.filter(pk=product.pk).update(name='Renamed')
+        response = self.client.get(f'/api/products/{product.id}')
+        self.assertNotEqual(response.data['name'], 'Renamed')
+
+        ChangeEvent.objects.create(model='bangazon_api.product', object_id=str(product.pk))
+        response = self.client.get(f'/api/products/{product.id}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['name'], 'Renamed')
+
+    def test_invalidate_by_model(self):
+        cache = LocalCache('test')
+        self.addCleanup(changes.caches.remove, cache)
+        cache.set('one', 1, depends_on=[(Product, 1)])
+        cache.set('all', [1, 2], depends_on=[(Product, None)])
+        cache.set('other', 2, depends_on=[(Product, 2)])
+
+        cache.invalidate(Product, 1)
+
+        self.assertIsNone(cache.get('one'))
+        self.assertIsNone(cache.get('all'))
+        self.assertEqual(cache.get('other'), 2)
+
+    def test_least_recently_used_is_dropped(self):
+        """A full cache drops its least recently used entry, with its dependencies"""
+        cache = LocalCache('test', max_size=2)
+        self.addCleanup(changes.caches.remove, cache)
+        cache.set('one', 1, depends_on=[(Product, 1)])
+        cache.set('two', 2, depends_on=[(Product, 2)])
+        cache.get('one')
+        cache.set('three', 3, depends_on=[(Product, 3)])
+
+        self.assertIsNone(cache.get('two'))
+        self.assertEqual(cache.get('one'), 1)
+        self.assertNotIn(('bangazon_api.product', '2'), cache.keys_by_dependency)
+
+        # A replaced entry no longer depends on what the old one did
+        cache.set('one', 1, depends_on=[(Product, 4)])
+        cache.delete('three')
+        self.assertEqual(set(cache.keys_by_dependency), {('bangazon_api.product', '4')})
+
+    def test_cached_user_is_not_shared(self):
+        """A change to one request's user doesn't reach the next request"""
+        authentication = TimedTokenAuthentication()
+        user, _ = authentication.authenticate_credentials(self.token.key)
+        user.first_name = 'Unsaved'
+        cached, _ = authentication.authenticate_credentials(self.token.key)
+        cached.last_name = 'Unsaved'
+
+        user, _ = authentication.authenticate_credentials(self.token.key)
+        self.assertEqual(user.first_name, self.user1.first_name)
+        self.assertEqual(user.last_name, self.user1.last_name)
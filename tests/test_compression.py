@@ -0,0 +1,45 @@
+import gzip
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from django.contrib.auth.models import User
+from django.test import override_settings
+
+from bangazon_api.middleware.compression import choose_encoding
+from tests.base import SeededTestCase
+
+
+class CompressionTests(SeededTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user1 = User.objects.first()
+        cls.token = Token.objects.get(user=cls.user1)
+
+    def setUp(self):
+        super().setUp()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_gzip_product_list(self):
+        """A large list is gzipped when the client asks for it"""
+        plain = self.client.get('/api/products')
+        response = self.client.get('/api/products', HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+
+    @override_settings(COMPRESSION_MIN_SIZE=10 ** 9)
+    def test_small_response_is_not_compressed(self):
+        """A response under COMPRESSION_MIN_SIZE is sent as is"""
+        response = self.client.get('/api/products', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_choose_encoding(self):
+        """Encodings the client refused with q=0 are never picked"""
+        self.assertEqual(choose_encoding('gzip, deflate'), 'gzip')
+        self.assertIsNone(choose_encoding('identity'))
+        self.assertIsNone(choose_encoding('gzip;q=0'))
+        self.assertIsNone(choose_encoding('gzip;q=0, br;q=0, *'))
+        self.assertNotEqual(choose_encoding('gzip;q=0, *'), 'gzip')
@@ -0,0 +1,96 @@
+import json
+from asgiref.sync import async_to_sync, sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from rest_framework.authtoken.models import Token
+from django.contrib.auth.models import User
+from django.test import override_settings
+
+from bangazon_api import changes
+from bangazon_api.event_stream import event_stream
+from bangazon_api.events import broker
+from bangazon_api.models import Order, Product
+from tests.base import SeededTestCase
+
+
+def scope(query):
+    return {
+        'type': 'http',
+        'method': 'GET',
+        'path': '/api/events',
+        'query_string': query.encode(),
+        'headers': [],
+    }
+
+
+def parse(body):
+    event, data = body.decode().strip().split('\n')
+    return event[len('event: '):], json.loads(data[len('data: '):])
+
+
+@override_settings(EVENTS_POLL_INTERVAL=0.01)
+class EventStreamTests(SeededTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user1 = User.objects.filter(store__isnull=False).first()
+        cls.token = Token.objects.get(user=cls.user1)
+
+    def save(self, instance, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            for name, value in fields.items():
+                setattr(instance, name, value)
+            instance.save()
+
+    def sell_out(self, product):
+        Product.objects.filter(pk=product.pk).update(quantity=0)
+        changes.publish(Product, [product.pk])
+
+    def test_bad_token(self):
+        async def connect():
+            communicator = ApplicationCommunicator(event_stream, scope('token=nope'))
+            await communicator.send_input({'type': 'http.request'})
+            return await communicator.receive_output()
+
+        self.assertEqual(async_to_sync(connect)()['status'], 401)
+
+    def test_stream(self):
+        """The current state comes first, then each change as it commits"""
+        product = Product.objects.first()
+        Order.objects.filter(user=self.user1, completed_on=None).delete()
+        order = Order.objects.create(user=self.user1)
+
+        async def stream():
+            communicator = ApplicationCommunicator(
+                event_stream, scope(f'token={self.token.key}&products={product.id}'))
+            await communicator.send_input({'type': 'http.request'})
+            start = await communicator.receive_output()
+            self.assertEqual(start['status'], 200)
+            self.assertIn((b'content-type', b'text/event-stream'), start['headers'])
+
+            received = [parse((await communicator.receive_output())['body']) for _ in range(2)]
+            self.assertEqual(received, [
+                ('product', {'id': product.id, 'quantity': product.quantity}),
+                ('order', {'id': order.id, 'status': 'open'}),
+            ])
+
+            await sync_to_async(self.save)(product, quantity=product.quantity + 5)
+            self.assertEqual(
+                parse((await communicator.receive_output())['body']),
+                ('product', {'id': product.id, 'quantity': product.quantity}))
+
+            await sync_to_async(self.save)(order, completed_on='2021-01-01')
+            self.assertEqual(
+                parse((await communicator.receive_output())['body']),
+                ('order', {'id': order.id, 'status': 'completed'}))
+
+            # Written without signals, found in the change log by the relay
+            await sync_to_async(self.sell_out)(product)
+            self.assertEqual(
+                parse((await communicator.receive_output(timeout=2))['body']),
+                ('product', {'id': product.id, 'quantity': 0}))
+
+            await communicator.send_input({'type': 'http.disconnect'})
+            await communicator.wait()
+
+        async_to_sync(stream)()
+        self.assertFalse(broker.queues)
@@ -0,0 +1,74 @@
+from django.contrib.auth.models import User
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+from bangazon_api.models import IdempotencyKey, Order, PaymentType, Product
+from tests.base import SeededTestCase
+
+
+class IdempotencyTests(SeededTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user1 = User.objects.filter(store=None).first()
+        cls.token = Token.objects.get(user=cls.user1)
+
+    def setUp(self):
+        super().setUp()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_retry_is_replayed(self):
+        """A retried complete doesn't take the products out of stock twice"""
+        product = Product.objects.first()
+        order = Order.objects.get(user=self.user1, completed_on=None)
+        payment_type = PaymentType.objects.create(
+            merchant_name='Visa', acct_number='1111222233334444', customer=self.user1)
+        self.client.post(f'/api/products/{product.id}/add_to_order')
+
+        url = f'/api/orders/{order.id}/complete'
+        body = {'paymentTypeId': payment_type.id}
+        first = self.client.put(url, body, format='json', HTTP_IDEMPOTENCY_KEY='retry-1')
+        retry = self.client.put(url, body, format='json', HTTP_IDEMPOTENCY_KEY='retry-1')
+
+        self.assertEqual(retry.status_code, first.status_code)
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Product.objects.get(pk=product.pk).quantity, product.quantity - 1)
+
+        other = self.client.put(
+            url, {'paymentTypeId': 0}, format='json', HTTP_IDEMPOTENCY_KEY='retry-1')
+        self.assertEqual(other.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+    def test_retry_without_key(self):
+        """A complete retried without a key is refused instead of applied twice"""
+        product = Product.objects.first()
+        order = Order.objects.get(user=self.user1, completed_on=None)
+        payment_type = PaymentType.objects.create(
+            merchant_name='Visa', acct_number='1111222233334444', customer=self.user1)
+        self.client.post(f'/api/products/{product.id}/add_to_order')
+
+        url = f'/api/orders/{order.id}/complete'
+        body = {'paymentTypeId': payment_type.id}
+        first = self.client.put(url, body, format='json')
+        retry = self.client.put(url, body, format='json')
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(retry.status_code, status.HTTP_409_CONFLICT)
+        self.assertFalse(retry.has_header('Idempotent-Replayed'))
+        self.assertEqual(Product.objects.get(pk=product.pk).quantity, product.quantity - 1)
+
+    @override_settings(IDEMPOTENCY_WAIT=0)
+    def test_running_request(self):
+        """A retry of a request that is still running gets a 409 once it stops waiting"""
+        product = Product.objects.first()
+        url = f'/api/products/{product.id}/add_to_order'
+        self.client.post(url, HTTP_IDEMPOTENCY_KEY='first')
+        # As if the first request hadn't stored its response yet
+        IdempotencyKey.objects.filter(key='first').update(status=None, created_on=timezone.now())
+
+        response = self.client.post(url, HTTP_IDEMPOTENCY_KEY='first')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response['Retry-After'], '1')
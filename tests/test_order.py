@@ -1,36 +1,39 @@
+import io
+from datetime import datetime, timedelta
 from rest_framework import status
-from rest_framework.test import APITestCase
 from rest_framework.authtoken.models import Token
 from django.core.management import call_command
 from django.contrib.auth.models import User
 
-from bangazon_api.models import Order, Product
+from bangazon_api import reservations
+from bangazon_api.models import Order, PaymentType, Product, Reservation
+from bangazon_api.tasks import refresh_purchase_counts
+from tests.base import SeededTestCase
 
 
-class OrderTests(APITestCase):
-    def setUp(self):
-        """
-        Seed the database
-        """
-        call_command('seed_db', user_count=3)
-        self.user1 = User.objects.filter(store=None).first()
-        self.token = Token.objects.get(user=self.user1)
-
-        self.user2 = User.objects.filter(store=None).last()
+class OrderTests(SeededTestCase):
+    user_count = 3
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user1 = User.objects.filter(store=None).first()
+        cls.token = Token.objects.get(user=cls.user1)
+
+        cls.user2 = User.objects.filter(store=None).last()
         product = Product.objects.get(pk=1)
 
-        self.order1 = Order.objects.create(
-            user=self.user1
-        )
+        # seed_db already opened an order for every user and a user can only have one
+        cls.order1 = Order.objects.get(user=cls.user1, completed_on=None)
 
-        self.order1.products.add(product)
+        cls.order1.products.add(product)
 
-        self.order2 = Order.objects.create(
-            user=self.user2
-        )
+        cls.order2 = Order.objects.get(user=cls.user2, completed_on=None)
 
-        self.order2.products.add(product)
+        cls.order2.products.add(product)
 
+    def setUp(self):
+        super().setUp()
         self.client.credentials(
             HTTP_AUTHORIZATION=f'Token {self.token.key}')
 
@@ -44,4 +47,116 @@ class OrderTests(APITestCase):
         response = self.client.delete(f'/api/orders/{self.order1.id}')
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
 
+    def test_add_to_cart_reuses_open_order(self):
+        """Adding products always goes to the single open order"""
+        for product in Product.objects.all()[:2]:
+            response = self.client.post(f'/api/products/{product.id}/add_to_order')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        open_orders = Order.objects.filter(user=self.user1, completed_on=None)
+        self.assertEqual(open_orders.count(), 1)
+        self.assertEqual(open_orders.get().id, self.order1.id)
+
+    def test_cart_after_delete_opens_new_order(self):
+        """The cached open order is dropped when the order is deleted"""
+        product = Product.objects.first()
+        self.client.post(f'/api/products/{product.id}/add_to_order')
+        self.client.delete(f'/api/orders/{self.order1.id}')
+
+        response = self.client.post(f'/api/products/{product.id}/add_to_order')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        new_order = Order.objects.get(user=self.user1, completed_on=None)
+        self.assertNotEqual(new_order.id, self.order1.id)
+
+    def test_archive_old_orders(self):
+        """Old completed orders move to the history endpoint and still count as sales"""
+        payment_type = PaymentType.objects.create(
+            merchant_name='Visa', acct_number='1111222233334444', customer=self.user1)
+        product = Product.objects.get(pk=1)
+        Order.objects.filter(pk=self.order1.pk).update(
+            payment_type=payment_type, completed_on=datetime.now() - timedelta(days=400))
+        refresh_purchase_counts(Product.objects.filter(pk=product.pk))
+        purchase_count = Product.objects.get(pk=product.pk).purchase_count
+
+        call_command('archive_orders', days=365, stdout=io.StringIO())
+
+        self.assertFalse(Order.objects.filter(pk=self.order1.pk).exists())
+        response = self.client.get('/api/orders/history')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([order['id'] for order in response.data['results']], [self.order1.id])
+        names = [item['name'] for item in response.data['results'][0]['products']]
+        self.assertIn(product.name, names)
+        self.assertIsNone(response.data['next_cursor'])
+
+        refresh_purchase_counts(Product.objects.filter(pk=product.pk))
+        self.assertEqual(Product.objects.get(pk=product.pk).purchase_count, purchase_count)
+
+    def test_last_unit_is_held_for_one_cart(self):
+        """A unit in one cart can't be added to another until its hold expires"""
+        product = Product.objects.get(pk=2)
+        Product.objects.filter(pk=product.pk).update(quantity=1)
+        user2_token = Token.objects.get(user=self.user2).key
+
+        response = self.client.post(f'/api/products/{product.id}/add_to_order')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.get(f'/api/products/{product.id}/availability')
+        self.assertEqual(response.data, {'quantity': 1, 'held': 1, 'available': 0})
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {user2_token}')
+        response = self.client.post(f'/api/products/{product.id}/add_to_order')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+        Reservation.objects.update(expires_on=datetime.now() - timedelta(seconds=1))
+        self.assertEqual(reservations.sweep(), 1)
+        response = self.client.post(f'/api/products/{product.id}/add_to_order')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_complete_takes_products_out_of_stock(self):
+        product = Product.objects.get(pk=2)
+        payment_type = PaymentType.objects.create(
+            merchant_name='Visa', acct_number='1111222233334444', customer=self.user1)
+        self.client.post(f'/api/products/{product.id}/add_to_order')
+
+        response = self.client.put(
+            f'/api/orders/{self.order1.id}/complete', {'paymentTypeId': payment_type.id},
+            format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Product.objects.get(pk=product.pk).quantity, product.quantity - 1)
+        self.assertFalse(Reservation.objects.filter(order=self.order1).exists())
+
+    def test_complete_keeps_stock_above_zero(self):
+        """A held product whose stock the seller set to 0 can't be bought"""
+        product = Product.objects.get(pk=2)
+        payment_type = PaymentType.objects.create(
+            merchant_name='Visa', acct_number='1111222233334444', customer=self.user1)
+        self.client.post(f'/api/products/{product.id}/add_to_order')
+        Product.objects.filter(pk=product.pk).update(quantity=0)
+
+        response = self.client.put(
+            f'/api/orders/{self.order1.id}/complete', {'paymentTypeId': payment_type.id},
+            format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(Product.objects.get(pk=product.pk).quantity, 0)
+        self.assertIsNone(Order.objects.get(pk=self.order1.pk).completed_on)
+
+    def test_complete_only_once(self):
+        """Completing a completed order again doesn't take more stock or restamp it"""
+        product = Product.objects.get(pk=2)
+        payment_type = PaymentType.objects.create(
+            merchant_name='Visa', acct_number='1111222233334444', customer=self.user1)
+        self.client.post(f'/api/products/{product.id}/add_to_order')
+        url = f'/api/orders/{self.order1.id}/complete'
+
+        response = self.client.put(url, {'paymentTypeId': payment_type.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        completed_on = Order.objects.get(pk=self.order1.pk).completed_on
+
+        response = self.client.put(url, {'paymentTypeId': payment_type.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(Product.objects.get(pk=product.pk).quantity, product.quantity - 1)
+        self.assertEqual(Order.objects.get(pk=self.order1.pk).completed_on, completed_on)
+        self.assertFalse(Reservation.objects.filter(order=self.order1).exists())
+
     # TODO: Complete Order test
@@ -1,20 +1,22 @@
 from faker import Faker
 from rest_framework import status
-from rest_framework.test import APITestCase
 from rest_framework.authtoken.models import Token
-from django.core.management import call_command
 from django.contrib.auth.models import User
 
+from tests.base import SeededTestCase
 
-class PaymentTests(APITestCase):
-    def setUp(self):
-        """
-        Seed the database
-        """
-        call_command('seed_db', user_count=1)
-        self.user1 = User.objects.filter(store=None).first()
-        self.token = Token.objects.get(user=self.user1)
 
+class PaymentTests(SeededTestCase):
+    user_count = 1
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user1 = User.objects.filter(store=None).first()
+        cls.token = Token.objects.get(user=cls.user1)
+
+    def setUp(self):
+        super().setUp()
         self.client.credentials(
             HTTP_AUTHORIZATION=f'Token {self.token.key}')
 
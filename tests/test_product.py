@@ -1,25 +1,33 @@
+import io
 import random
+import tempfile
+from concurrent.futures import Future
 import faker_commerce
+from PIL import Image
 from faker import Faker
 from rest_framework import status
-from rest_framework.test import APITestCase
 from rest_framework.authtoken.models import Token
-from django.core.management import call_command
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from bangazon_api import task_queue, thumbnails
 from bangazon_api.helpers import STATE_NAMES
-from bangazon_api.models import Category
+from bangazon_api.tasks import refresh_rating_totals
+from bangazon_api.models import Category, Favorite, Rating, Recommendation, Task
 from bangazon_api.models.product import Product
+from tests.base import SeededTestCase
 
 
-class ProductTests(APITestCase):
-    def setUp(self):
-        """
-
-        """
-        call_command('seed_db', user_count=2)
-        self.user1 = User.objects.filter(store__isnull=False).first()
-        self.token = Token.objects.get(user=self.user1)
+class ProductTests(SeededTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user1 = User.objects.filter(store__isnull=False).first()
+        cls.token = Token.objects.get(user=cls.user1)
 
+    def setUp(self):
+        super().setUp()
         self.client.credentials(
             HTTP_AUTHORIZATION=f'Token {self.token.key}')
 
@@ -75,3 +83,273 @@ class ProductTests(APITestCase):
         response = self.client.get('/api/products')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), Product.objects.count())
+
+    def test_create_product_with_image(self):
+        """
+        Ensure an uploaded image is stored and its variants are rendered.
+        """
+        category = Category.objects.first()
+        buffer = io.BytesIO()
+        Image.new('RGB', (1600, 1200), 'red').save(buffer, 'PNG')
+
+        data = {
+            "name": self.faker.ecommerce_name(),
+            "price": random.randint(50, 1000),
+            "description": self.faker.paragraph(),
+            "quantity": random.randint(2, 20),
+            "location": random.choice(STATE_NAMES),
+            "categoryId": category.id,
+            "image": SimpleUploadedFile('shoe.png', buffer.getvalue(), 'image/png')
+        }
+        with tempfile.TemporaryDirectory() as media_root, override_settings(
+                MEDIA_ROOT=media_root, THUMBNAIL_WORKERS=0):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post('/api/products', data, format='multipart')
+
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            variants = response.data['image_variants']
+            self.assertEqual(set(variants), {'original', 'thumbnail', 'web'})
+
+            thumbnail = self.client.get(variants['thumbnail'])
+            self.assertEqual(thumbnail.status_code, status.HTTP_200_OK)
+            self.assertIn('immutable', thumbnail['Cache-Control'])
+            original = self.client.get(variants['original'])
+            self.assertNotIn('immutable', original['Cache-Control'])
+            with Image.open(io.BytesIO(b''.join(thumbnail.streaming_content))) as image:
+                self.assertLessEqual(max(image.size), 150)
+
+    def test_failed_render_is_logged(self):
+        """
+        Ensure a render that fails in the pool is logged instead of lost with its future.
+        """
+        future = Future()
+        future.set_exception(OSError('cannot identify image file'))
+        with self.assertLogs('bangazon_api.thumbnails', level='ERROR'):
+            thumbnails.log_failure('products/shoe.png', future)
+
+    def test_import_products(self):
+        """
+        Ensure a csv upload creates new products and updates existing ones by sku.
+        """
+        category = Category.objects.first()
+        product = Product.objects.filter(store__seller=self.user1).first()
+        product.sku = 'EXISTING'
+        product.save()
+
+        rows = [
+            'sku,name,price,description,quantity,location,category',
+            f'EXISTING,Renamed,10,Updated,3,Texas,{category.name}',
+            f'NEW-1,New product,20,Brand new,5,Ohio,{category.name}',
+            'NEW-2,Bad price,abc,Broken,5,Ohio,Nope',
+        ]
+        upload = SimpleUploadedFile('catalog.csv', '\n'.join(rows).encode(), 'text/csv')
+        response = self.client.post('/api/products/import', {'file': upload}, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(response.data['updated'], 1)
+        self.assertEqual(response.data['errors'][0]['row'], 4)
+        self.assertEqual(Product.objects.get(pk=product.id).name, 'Renamed')
+        new = Product.objects.get(store__seller=self.user1, sku='NEW-1')
+        # The new product reaches the followers' feeds like one created through the API
+        self.assertEqual(
+            Task.objects.get(name='feed.fan_out', key=f'feed-fan-out:{new.id}').payload,
+            {'product_id': new.id, 'store_id': self.user1.store.id})
+
+    def test_import_rejects_bad_requests_and_rows(self):
+        """
+        Ensure an unknown format is a 400, non-finite prices fail their row and errors are capped.
+        """
+        category = Category.objects.first()
+        upload = SimpleUploadedFile('catalog.xml', b'<products/>', 'text/xml')
+        response = self.client.post(
+            '/api/products/import', {'file': upload, 'format': 'xml'}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        rows = ['sku,name,price,description,quantity,location,category']
+        rows += [f'NAN-{n},Bad,{price},Broken,5,Ohio,{category.name}'
+                 for n, price in enumerate(['nan', 'inf', '-inf'])]
+        upload = SimpleUploadedFile('catalog.csv', '\n'.join(rows).encode(), 'text/csv')
+        with override_settings(PRODUCT_IMPORT_MAX_ERRORS=2):
+            response = self.client.post(
+                '/api/products/import', {'file': upload}, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['created'], 0)
+        self.assertEqual(response.data['failed'], 3)
+        self.assertEqual([error['row'] for error in response.data['errors']], [2, 3])
+
+    def create_followed_product(self):
+        """Have a new customer favorite user1's store, then add a product to it"""
+        follower = User.objects.create_user(username='follower', password='PassWord1')
+        Favorite.objects.create(customer=follower, store=self.user1.store)
+        data = {
+            "name": self.faker.ecommerce_name(),
+            "price": random.randint(50, 1000),
+            "description": self.faker.paragraph(),
+            "quantity": random.randint(2, 20),
+            "location": random.choice(STATE_NAMES),
+            "categoryId": Category.objects.first().id
+        }
+        response = self.client.post('/api/products', data, format='json')
+        task_queue.run_pending()
+
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=follower).key}')
+        return response.data['id']
+
+    def test_feed(self):
+        """
+        Ensure a new product shows up in the feed of its store's followers.
+        """
+        product_id = self.create_followed_product()
+
+        response = self.client.get('/api/products/feed')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([p['id'] for p in response.data['results']], [product_id])
+        self.assertIsNone(response.data['next_cursor'])
+
+    @override_settings(FEED_FANOUT_LIMIT=0)
+    def test_feed_popular_store(self):
+        """
+        Ensure products of stores over the fan out limit are read on demand.
+        """
+        product_id = self.create_followed_product()
+
+        response = self.client.get('/api/products/feed', {'limit': 1})
+        self.assertEqual(response.data['results'][0]['id'], product_id)
+        self.assertIsNotNone(response.data['next_cursor'])
+
+    def test_recommend_is_idempotent(self):
+        """
+        Ensure repeating a recommendation doesn't duplicate it and it can still be deleted.
+        """
+        product = Product.objects.first()
+        customer = User.objects.exclude(pk=self.user1.pk).first()
+        url = f'/api/products/{product.id}/recommend'
+
+        for _ in range(2):
+            response = self.client.post(url, {'username': customer.username}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Recommendation.objects.filter(customer=customer).count(), 1)
+
+        response = self.client.delete(url, {'username': customer.username}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Recommendation.objects.filter(customer=customer).exists())
+
+    def test_recommend_to_many_and_read_inbox(self):
+        """
+        Ensure a product can be recommended to several users and shows up in their inbox.
+        """
+        customer = User.objects.exclude(pk=self.user1.pk).first()
+        products = list(Product.objects.all()[:2])
+        for product in products:
+            response = self.client.post(
+                f'/api/products/{product.id}/recommend',
+                {'usernames': [customer.username, 'nobody']}, format='json')
+            self.assertEqual(response.data['not_found'], ['nobody'])
+
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {Token.objects.get(user=customer).key}')
+        response = self.client.get('/api/profile/recommendations', {'limit': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['product']['id'], products[1].id)
+        self.assertEqual(response.data['results'][0]['recommender']['username'], self.user1.username)
+
+        response = self.client.get(
+            '/api/profile/recommendations', {'cursor': response.data['next_cursor']})
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertIsNone(response.data['next_cursor'])
+
+    def test_recommend_validates_usernames(self):
+        """
+        Ensure usernames that aren't a list of names are rejected with a 400.
+        """
+        url = f'/api/products/{Product.objects.first().id}/recommend'
+        for data in ({}, {'usernames': 'abc'}, {'usernames': [['abc']]}, {'usernames': []},
+                     {'usernames': ['user'] * (settings.RECOMMEND_MAX_USERNAMES + 1)}):
+            response = self.client.post(url, data, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, data)
+        self.assertFalse(Recommendation.objects.filter(recommender=self.user1).exists())
+
+    def test_rating_histogram(self):
+        """
+        Ensure rating a product and changing the rating keeps its histogram up to date,
+        and a score that isn't 1 to 5 is a 400.
+        """
+        product = Product.objects.first()
+        Rating.objects.filter(product=product).delete()
+        refresh_rating_totals(Product.objects.filter(pk=product.pk))
+        url = f'/api/products/{product.id}/rate-product'
+
+        self.client.post(url, {'score': 4, 'review': 'Nice'}, format='json')
+        self.client.post(url, {'score': 2, 'review': 'Broke'}, format='json')
+        for score in (9, None, [4], {'score': 4}):
+            response = self.client.post(url, {'score': score, 'review': 'Bad'}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get(f'/api/products/{product.id}')
+        self.assertEqual(response.data['rating_histogram'], {1: 0, 2: 1, 3: 0, 4: 0, 5: 0})
+        self.assertEqual(response.data['rating_count'], 1)
+        self.assertEqual(response.data['average_rating'], 2)
+        self.assertNotIn('ratings', response.data)
+
+    def test_reviews_by_score(self):
+        """
+        Ensure reviews page highest score first, newest first within a score.
+        """
+        product = Product.objects.first()
+        Rating.objects.filter(product=product).delete()
+        customers = [User.objects.create_user(username=f'reviewer{n}') for n in range(3)]
+        ratings = [
+            Rating.objects.create(customer=customer, product=product, score=score, review='ok')
+            for customer, score in zip(customers, (5, 3, 5))
+        ]
+
+        url = f'/api/products/{product.id}/reviews'
+        response = self.client.get(url, {'sort': 'score', 'limit': 2})
+        self.assertEqual([r['id'] for r in response.data['results']], [ratings[2].id, ratings[0].id])
+
+        response = self.client.get(url, {'sort': 'score', 'cursor': response.data['next_cursor']})
+        self.assertEqual([r['id'] for r in response.data['results']], [ratings[1].id])
+        self.assertIsNone(response.data['next_cursor'])
+
+        response = self.client.get(url)
+        self.assertEqual([r['id'] for r in response.data['results']], [r.id for r in reversed(ratings)])
+        self.assertEqual(self.client.get(url, {'sort': 'worst'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_autocomplete(self):
+        """
+        Ensure autocomplete matches word prefixes, best seller first, and sees saved products.
+        """
+        Product.objects.filter(name__icontains='zebr').update(name='Plain')
+        category = Category.objects.first()
+        store = self.user1.store
+        fields = {'price': 1, 'description': 'x', 'quantity': 1, 'location': 'x', 'category': category}
+        crepe = Product.objects.create(
+            store=store, name='Crêpe Zebra Pan', purchase_count=1, **fields)
+        zebra = Product.objects.create(
+            store=store, name='Zebra Striped Mug', purchase_count=5, **fields)
+
+        url = '/api/products/autocomplete'
+        response = self.client.get(url, {'q': 'zeb'})
+        self.assertEqual(response.data, [
+            {'id': zebra.id, 'name': 'Zebra Striped Mug'},
+            {'id': crepe.id, 'name': 'Crêpe Zebra Pan'},
+        ])
+        response = self.client.get(url, {'q': 'ZEBRA crep'})
+        self.assertEqual([p['id'] for p in response.data], [crepe.id])
+
+        zebra.name = 'Striped Mug'
+        zebra.save()
+        crepe.delete()
+        with self.assertNumQueries(2):
+            # Reading the change log and reloading the changed products
+            response = self.client.get(url, {'q': 'zeb'})
+        self.assertEqual(response.data, [])
+        with self.assertNumQueries(1):
+            self.client.get(url, {'q': 'str'})
+
+        self.assertEqual(self.client.get(url, {'q': 'mug', 'sort': 'cheap'}).status_code,
+                         status.HTTP_400_BAD_REQUEST)
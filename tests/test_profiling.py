@@ -0,0 +1,68 @@
+import json
+import tempfile
+from pathlib import Path
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from django.contrib.auth.models import User
+from django.test import override_settings
+
+from tests.base import SeededTestCase
+
+
+class ProfilingTests(SeededTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user1 = User.objects.first()
+        cls.token = Token.objects.get(user=cls.user1)
+
+    def setUp(self):
+        super().setUp()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.profile_dir = Path(temp_dir.name)
+        settings_override = override_settings(PROFILING_DIR=self.profile_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_staff_request_is_profiled(self):
+        """A staff token with the X-Profile header writes a profile tagged with the action"""
+        self.user1.is_staff = True
+        self.user1.save()
+
+        response = self.client.get('/api/products', HTTP_X_PROFILE='1')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        name = response['X-Profile']
+        self.assertIn('ProductView.list', name)
+        for extension in ('collapsed', 'json'):
+            self.assertTrue((self.profile_dir / f'{name}.{extension}').exists())
+        self.assertFalse((self.profile_dir / f'{name}.pstats').exists())
+
+        summary = json.loads((self.profile_dir / f'{name}.json').read_text())
+        self.assertEqual(summary['view'], 'ProductView.list')
+        self.assertEqual(summary['profiler'], 'sampler')
+        self.assertGreater(summary['queries'], 0)
+
+    def test_cprofile_on_request(self):
+        """X-Profile: cprofile runs cProfile alone"""
+        self.user1.is_staff = True
+        self.user1.save()
+
+        response = self.client.get('/api/products', HTTP_X_PROFILE='cprofile')
+
+        name = response['X-Profile']
+        self.assertTrue((self.profile_dir / f'{name}.pstats').exists())
+        self.assertFalse((self.profile_dir / f'{name}.collapsed').exists())
+
+    def test_customer_request_is_not_profiled(self):
+        self.user1.is_staff = False
+        self.user1.save()
+
+        response = self.client.get('/api/products', HTTP_X_PROFILE='1')
+
+        self.assertFalse(response.has_header('X-Profile'))
+        self.assertEqual(list(self.profile_dir.iterdir()), [])
@@ -0,0 +1,53 @@
+import tempfile
+from unittest import skipUnless
+from django.conf import settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.test import override_settings
+
+from bangazon import schema
+
+
+@skipUnless(settings.API_DOCS_ENABLED, 'The api docs are disabled')
+class SchemaTests(APITestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.settings = override_settings(SCHEMA_CACHE_DIR=self.cache_dir.name)
+        self.settings.enable()
+        schema._documents.clear()
+
+    def tearDown(self):
+        self.settings.disable()
+        self.cache_dir.cleanup()
+        schema._documents.clear()
+
+    def test_schema_is_cached_with_etag(self):
+        """The document is written to disk once and revalidates with its ETag"""
+        response = self.client.get('/swagger.json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('/products', response.json()['paths'])
+        self.assertTrue(schema.cache_path(schema.code_version(), '.json').exists())
+
+        response = self.client.get('/swagger.json', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_compressed_etag_revalidates(self):
+        """The weak ETag of the compressed document, alone or in a list, gets a 304"""
+        response = self.client.get('/swagger.json', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('W/'))
+
+        for header in (etag, f'"other", {etag}'):
+            response = self.client.get(
+                '/swagger.json', HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=header)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = self.client.get('/swagger.json', HTTP_IF_NONE_MATCH='"other"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_new_code_version_rebuilds(self):
+        schema.build('old')
+        schema.build('new')
+        self.assertFalse(schema.cache_path('old', '.json').exists())
+        self.assertTrue(schema.cache_path('new', '.json').exists())
@@ -0,0 +1,62 @@
+from datetime import date
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from django.contrib.auth.models import User
+
+from bangazon_api.models import Order, PaymentType, Product
+from tests.base import SeededTestCase
+
+
+class StoreStatsTests(SeededTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.seller = User.objects.filter(store__isnull=False).first()
+        cls.store = cls.seller.store
+        cls.token = Token.objects.get(user=cls.seller)
+
+    def setUp(self):
+        super().setUp()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_stats_follow_sales(self):
+        """A completed order shows up in the cached stats straight away"""
+        url = f'/api/stores/{self.store.id}/stats'
+        before = self.client.get(url).data
+        self.assertEqual(before['product_count'], self.store.products.count())
+
+        product = self.store.products.first()
+        customer = User.objects.exclude(pk=self.seller.pk).first()
+        order = Order.objects.get(user=customer, completed_on=None)
+        order.products.set([product])
+        payment_type = PaymentType.objects.filter(customer=customer).first()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {Token.objects.get(user=customer).key}')
+        self.client.put(f'/api/orders/{order.id}/complete',
+                        {'paymentTypeId': payment_type.id}, format='json')
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        after = self.client.get(url).data
+        self.assertEqual(after['units_sold'], before['units_sold'] + 1)
+        self.assertAlmostEqual(after['revenue'], before['revenue'] + product.price, places=2)
+
+        response = self.client.get(url, {'start': '2000-01-01', 'end': '2000-12-31'})
+        self.assertEqual(response.data['units_sold'], 0)
+        self.assertEqual(response.data['end'], date(2000, 12, 31))
+
+    def test_stock_outs(self):
+        product = self.store.products.first()
+        Product.objects.filter(pk=product.pk).update(quantity=0)
+        response = self.client.get(f'/api/stores/{self.store.id}/stats')
+        self.assertEqual(response.data['out_of_stock'], 1)
+
+    def test_other_sellers_store(self):
+        other = User.objects.exclude(pk=self.seller.pk).filter(store__isnull=False).first()
+        store_id = other.store.id if other else 0
+        response = self.client.get(f'/api/stores/{store_id}/stats')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_bad_date(self):
+        response = self.client.get(f'/api/stores/{self.store.id}/stats', {'start': 'yesterday'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
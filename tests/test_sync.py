@@ -0,0 +1,131 @@
+from datetime import datetime, timedelta
+from django.db.models import Max
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from django.contrib.auth.models import User
+
+from bangazon_api import sync
+from bangazon_api.archive import archive_orders
+from bangazon_api.models import Category, Order, Product, Tombstone
+from tests.base import SeededTestCase
+
+
+class SyncTests(SeededTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user1 = User.objects.filter(store__isnull=False).first()
+        cls.token = Token.objects.get(user=cls.user1)
+
+    def setUp(self):
+        super().setUp()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def cursor(self):
+        return Product.objects.aggregate(last=Max('version'))['last']
+
+    def test_versions_follow_writes(self):
+        """Every kind of write gives the row a newer version, unchanged saves don't"""
+        cursor = self.cursor()
+        product = Product.objects.first()
+        product.save()
+        self.assertEqual(Product.objects.filter(version__gt=cursor).count(), 0)
+
+        Product.objects.filter(pk=product.pk).update(quantity=product.quantity + 1)
+        product.refresh_from_db()
+        self.assertGreater(product.version, cursor)
+        self.assertIsNotNone(product.updated_at)
+
+        category = Category.objects.create(name='Garden')
+        self.assertGreater(Category.objects.get(pk=category.pk).version, product.version)
+
+    def test_product_changes(self):
+        """A pull returns what changed after the cursor, then deletes, in pages"""
+        cursor = self.client.get('/api/products/changes', {'since': self.cursor()}).data['cursor']
+        first, second = Product.objects.all()[:2]
+        deleted_id = second.id
+        Product.objects.filter(pk=first.pk).update(name='Renamed')
+        second.delete()
+        third = Product.objects.get(pk=first.pk)
+        third.pk = None
+        third.save()
+
+        response = self.client.get('/api/products/changes', {'since': cursor, 'limit': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([p['id'] for p in response.data['results']], [first.id])
+        self.assertEqual(response.data['deleted'], [deleted_id])
+        self.assertTrue(response.data['more'])
+
+        response = self.client.get(
+            '/api/products/changes', {'since': response.data['cursor'], 'limit': 2})
+        self.assertEqual([p['id'] for p in response.data['results']], [third.id])
+        self.assertFalse(response.data['more'])
+
+        full = self.client.get('/api/products/changes', {'limit': 100}).data
+        self.assertEqual(full['deleted'], [])
+        self.assertEqual(len(full['results']), min(Product.objects.count(), 100))
+
+    def test_order_changes_are_per_user(self):
+        """Customers only see their own orders and deletes"""
+        since = Order.objects.aggregate(last=Max('version'))['last']
+        other = Order.objects.exclude(user=self.user1).first()
+        other.delete()
+        own = Order.objects.create(user=self.user1, completed_on='2021-01-01')
+
+        response = self.client.get('/api/orders/changes', {'since': since})
+        self.assertEqual([o['id'] for o in response.data['results']], [own.id])
+        self.assertEqual(response.data['deleted'], [])
+
+    def test_archived_orders_are_deleted(self):
+        """An archived order is a delete in the feed and stays in the history"""
+        order = Order.objects.filter(user=self.user1, completed_on__isnull=False).first()
+        Order.objects.filter(pk=order.pk).update(completed_on=datetime.now() - timedelta(days=400))
+        since = Order.objects.aggregate(last=Max('version'))['last']
+
+        self.assertGreaterEqual(archive_orders(365), 1)
+
+        response = self.client.get('/api/orders/changes', {'since': since})
+        self.assertIn(order.id, response.data['deleted'])
+        history = self.client.get('/api/orders/history', {'limit': 100}).data['results']
+        self.assertIn(order.id, [archived['id'] for archived in history])
+
+    def test_cart_changes_bump_the_order(self):
+        """Adding and removing a product shows the order in the feed again"""
+        first = Product.objects.first()
+        Product.objects.filter(pk=first.pk).update(quantity=10)
+        response = self.client.post(f'/api/products/{first.id}/add_to_order')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        order = Order.objects.get(user=self.user1, completed_on=None)
+        lines = order.products.count()
+        # A product that isn't in the seeded cart yet
+        second = Product.objects.get(pk=first.pk)
+        second.pk = None
+        second.save()
+
+        since = order.version
+        response = self.client.post(f'/api/products/{second.id}/add_to_order')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.get('/api/orders/changes', {'since': since})
+        self.assertEqual([o['id'] for o in response.data['results']], [order.id])
+        self.assertEqual(len(response.data['results'][0]['products']), lines + 1)
+
+        since = response.data['cursor']
+        response = self.client.delete(f'/api/products/{second.id}/remove_from_order')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        response = self.client.get('/api/orders/changes', {'since': since})
+        self.assertEqual([o['id'] for o in response.data['results']], [order.id])
+        self.assertEqual(len(response.data['results'][0]['products']), lines)
+
+    def test_pruned_cursor(self):
+        """A cursor older than the pruned tombstones has to sync from 0"""
+        since = self.cursor()
+        Product.objects.first().delete()
+        self.assertEqual(Tombstone.objects.filter(version__gt=since).count(), 1)
+
+        tombstones = Tombstone.objects.count()
+        self.assertEqual(sync.prune(-60), tombstones)
+        response = self.client.get('/api/products/changes', {'since': since})
+        self.assertEqual(response.status_code, status.HTTP_410_GONE)
+        response = self.client.get('/api/products/changes', {'since': 'yesterday'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,56 @@
+from django.test import TestCase, override_settings
+
+from bangazon_api import task_queue
+from bangazon_api.models import Task
+
+
+calls = []
+
+
+@task_queue.task('tests.record')
+def record(value):
+    calls.append(value)
+
+
+@task_queue.task('tests.broken')
+def broken():
+    raise ValueError('broken')
+
+
+@override_settings(TASK_MAX_ATTEMPTS=2, TASK_RETRY_BACKOFF=0)
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_pending_key_is_coalesced(self):
+        """Enqueuing a key that is already pending should not add a second task"""
+        first = task_queue.enqueue('tests.record', key='record:1', value=1)
+        second = task_queue.enqueue('tests.record', key='record:1', value=1)
+
+        self.assertEqual(first.id, second.id)
+        self.assertEqual(Task.objects.count(), 1)
+
+    def test_run_pending(self):
+        """Ready tasks are run and removed, delayed tasks wait"""
+        task_queue.enqueue('tests.record', value=1)
+        task_queue.enqueue('tests.record', value=2, delay=60)
+
+        self.assertEqual(task_queue.run_pending(), 1)
+        self.assertEqual(calls, [1])
+        self.assertEqual(Task.objects.count(), 1)
+
+    def test_failed_task_is_retried_then_marked_failed(self):
+        """A failing task is retried until TASK_MAX_ATTEMPTS, then kept as failed"""
+        task_queue.enqueue('tests.broken')
+
+        with self.assertLogs('bangazon_api.task_queue', 'ERROR'):
+            task_queue.run_pending(limit=1)
+        retried = Task.objects.get()
+        self.assertEqual(retried.status, Task.PENDING)
+        self.assertEqual(retried.attempts, 1)
+
+        with self.assertLogs('bangazon_api.task_queue', 'ERROR'):
+            task_queue.run_pending(limit=1)
+        failed = Task.objects.get()
+        self.assertEqual(failed.status, Task.FAILED)
+        self.assertIn('broken', failed.last_error)
@@ -0,0 +1,40 @@
+import json
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from django.contrib.auth.models import User
+
+from tests.base import SeededTestCase
+
+
+class TimingTests(SeededTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user1 = User.objects.first()
+        cls.token = Token.objects.get(user=cls.user1)
+
+    def setUp(self):
+        super().setUp()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_server_timing_header(self):
+        """The response lists the time of each phase in Server-Timing"""
+        response = self.client.get('/api/stores')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        phases = [metric.split(';')[0] for metric in response['Server-Timing'].split(', ')]
+        self.assertEqual(phases, ['auth', 'db', 'serialize', 'render', 'total'])
+
+    def test_access_log(self):
+        """Each request is logged as json with its route, query count and timings"""
+        with self.assertLogs('bangazon_api.access', level='INFO') as logs:
+            self.client.get(f'/api/products/{self.user1.id}')
+
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertEqual(entry['route'], 'api/products/(?P<pk>[^/.]+)$')
+        self.assertEqual(entry['view'], 'ProductView.retrieve')
+        self.assertEqual(entry['user'], self.user1.id)
+        self.assertGreater(entry['queries'], 0)
+        for phase in ('auth_ms', 'db_ms', 'serialize_ms', 'render_ms', 'total_ms'):
+            self.assertIn(phase, entry)
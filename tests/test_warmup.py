@@ -0,0 +1,64 @@
+import json
+import tempfile
+from pathlib import Path
+from django.test import override_settings
+
+from bangazon_api import catalog
+from bangazon_api.models import Product
+from bangazon_api.warmup import hot_product_ids, warm_up
+from tests.base import SeededTestCase
+
+
+class WarmUpTests(SeededTestCase):
+    def setUp(self):
+        super().setUp()
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.access_log = Path(temp_dir.name) / 'access.log'
+
+    def test_hot_products_from_access_log(self):
+        """The most requested products come first, then the best sellers"""
+        product_ids = list(Product.objects.values_list('id', flat=True)[:2])
+        entries = [
+            {'view': 'ProductView.retrieve', 'status': 200, 'path': f'/api/products/{product_ids[1]}'},
+            {'view': 'ProductView.retrieve', 'status': 200, 'path': f'/api/products/{product_ids[1]}'},
+            {'view': 'ProductView.retrieve', 'status': 200, 'path': f'/api/products/{product_ids[0]}'},
+            {'view': 'ProductView.list', 'status': 200, 'path': '/api/products'},
+        ]
+        self.access_log.write_text(''.join(json.dumps(entry) + '\n' for entry in entries))
+
+        with override_settings(ACCESS_LOG_PATH=self.access_log):
+            ids = hot_product_ids(Product.objects.count())
+
+        self.assertEqual(ids[:2], [str(product_ids[1]), str(product_ids[0])])
+        self.assertEqual(len(ids), Product.objects.count())
+
+    def test_warm_up_report(self):
+        """Warming fills the catalog caches and reports what it loaded"""
+        with override_settings(ACCESS_LOG_PATH=self.access_log):
+            report = warm_up(budget=60, product_limit=2)
+
+        self.assertEqual(report['products'], 2)
+        self.assertGreater(report['categories'], 0)
+        self.assertFalse(report['out_of_time'])
+        self.assertIsNotNone(catalog.category_lists.get('all'))
+
+    @override_settings(ACCESS_LOG_PATH=None)
+    def test_warm_up_without_access_log(self):
+        """With the access log on stdout the best sellers are warmed"""
+        self.assertEqual(len(hot_product_ids(2)), 2)
+        report = warm_up(budget=60, product_limit=2)
+
+        self.assertEqual(report['products'], 2)
+        self.assertEqual(report['failed'], 0)
+
+    def test_failed_step_is_logged(self):
+        """A step that fails is logged and the rest still run"""
+        # A directory can't be read as the log
+        with override_settings(ACCESS_LOG_PATH=self.access_log.parent), \
+                self.assertLogs('bangazon_api.warmup', level='ERROR'):
+            report = warm_up(budget=60, product_limit=2)
+
+        self.assertEqual(report['failed'], 1)
+        self.assertEqual(report['products'], 0)
+        self.assertGreater(report['stores'], 0)